@@ -0,0 +1,3 @@
+"""
+Benchmarks of the client... standalone scripts and the offline suite (python -m benchmarks.suite) running against in-process fake servers.
+"""
@@ -0,0 +1,58 @@
+"""
+Micro-benchmark of decoding data_model dataclasses: dataclasses_json from_dict vs. precompiled decoders
+
+usage: python benchmarks/decode_benchmark.py [--records 100000]
+"""
+import argparse
+import random
+import time
+import warnings
+from labelatorio import data_model
+from labelatorio._decoders import get_decoder
+
+
+def _text_document(i:int)->dict:
+    return {
+        "id":f"doc-{i}",
+        "key":str(i),
+        "text":f"this is text of document number {i}",
+        "labels":random.choice([None,["A"],["A","B"]]),
+        "predicted_labels":["A"],
+        "predicted_label_scores":{"A":random.random(),"B":random.random()},
+        "context_data":{"source":"benchmark"},
+        "_i":i,
+    }
+
+
+SAMPLES = {
+    data_model.TextDocument: _text_document,
+    data_model.ScoredDocumentResponse: lambda i: {"score":random.random(),"doc":_text_document(i)},
+    data_model.Topic: lambda i: {"topic_id":f"topic-{i}","topic_name":"name","topic_keywords":[{"word":"w","score":0.5}]*5,"size":i,"centroid":[random.random() for _ in range(32)]},
+    data_model.TaskStatus: lambda i: {"task_id":f"task-{i}","task_name":"train","state":"RUNNING","progress_current":i,"progress_total":i*2,"start_time":"2023-01-02T03:04:05","duration_sec":10},
+    data_model.ModelInfo: lambda i: {"id":f"model-{i}","project_id":"p","model_name":"m","task_type":"TextClassification","created_at":"2023-01-02T03:04:05.123Z","metrics":{"f1":"0.9"}},
+    data_model.NodeInfo: lambda i: {"node_name":f"node-{i}","deployment_type":"managed","status":"READY","last_heartbeat":"2023-01-02T03:04:05+00:00"},
+}
+
+
+def _measure(func, records)->float:
+    start = time.perf_counter()
+    for rec in records:
+        func(rec)
+    return time.perf_counter()-start
+
+
+def run(records_count:int):
+    print(f"{'class':<24}{'from_dict [s]':>15}{'compiled [s]':>15}{'speedup':>10}")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for cls, sample in SAMPLES.items():
+            records = [sample(i) for i in range(records_count)]
+            baseline = _measure(cls.from_dict, records)
+            compiled = _measure(get_decoder(cls), records)
+            print(f"{cls.__name__:<24}{baseline:>15.3f}{compiled:>15.3f}{baseline/compiled:>9.1f}x")
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100_000)
+    run(parser.parse_args().records)
@@ -0,0 +1,451 @@
+"""
+In-process stand-ins of Labelator.io API and of a serving node, for offline benchmarks and tests.
+
+Both run a threaded HTTP server on localhost (random port) and serve deterministic synthetic data: documents, vectors,
+similarity links, topics and tasks of a single project, predictions, answers and embeddings of the node.
+FakeConfig sets the size of the data and the behaviour of the server: latency (with jitter), bandwidth and injected errors.
+
+    with FakeLabelatorioServer(FakeConfig(documents=10_000, latency=0.005)) as api, FakeServingNode() as node:
+        client = labelatorio.Client("token", url=api.url, lazy=True)
+        node_client = labelatorio.NodeClient("token", url=node.url, lazy=True)
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+PROJECT_ID="00000000-0000-0000-0000-000000000001"
+
+_WORDS=("model","label","topic","text","vector","client","server","review","train","predict","answer","document","query","cluster","score")
+
+
+@dataclass
+class FakeConfig:
+    documents:int=10_000
+    """number of documents in the project"""
+    text_words:int=40
+    """words in document text"""
+    vector_dim:int=384
+    """dimension of document vectors, topic centroids and embeddings"""
+    labels:Tuple[str,...]=("A","B","C","D")
+    topics:int=50
+    links_per_document:int=2
+    latency:float=0.0
+    """seconds added to every response"""
+    latency_jitter:float=0.0
+    """random extra latency, uniform in [0, latency_jitter]"""
+    bandwidth:Optional[float]=None
+    """bytes per second of response bodies (None for unlimited)"""
+    error_rate:float=0.0
+    """fraction of requests answered by error_status"""
+    error_status:int=503
+    retry_after:Optional[float]=0
+    """Retry-After of error responses (None to omit)"""
+    task_duration:float=1.0
+    """seconds until a started task is finished"""
+    max_take:Optional[int]=None
+    """largest page returned by paged endpoints, whatever take is requested (None for no cap)"""
+    delete_sync_limit:int=10_000
+    """max documents deleted by one synchronous delete-by-query"""
+    seed:int=0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version="HTTP/1.1"
+    server:"_FakeHTTPServer"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self, method:str):
+        fake:_FakeServer = self.server.fake
+        url = urlsplit(self.path)
+        params = {key:values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding")=="gzip":
+            import gzip
+            raw_body = gzip.decompress(raw_body)
+        elif self.headers.get("Content-Encoding")=="deflate":
+            import zlib
+            raw_body = zlib.decompress(raw_body)
+        body = json.loads(raw_body) if raw_body else None
+
+        status, payload, headers = fake.handle(method, url.path.strip("/"), params, body)
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        fake.delay(len(content))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads=True
+    fake:"_FakeServer"
+
+
+class _FakeServer:
+    def __init__(self, config:Optional[FakeConfig]=None) -> None:
+        self.config=config or FakeConfig()
+        self.requests:Dict[str,int]={}
+        self.errors=0
+        self._routes:List[Tuple[str,re.Pattern,Callable]]=[]
+        self._lock=threading.Lock()
+        self._random=random.Random(self.config.seed)
+        self._server:Optional[_FakeHTTPServer]=None
+        self._thread:Optional[threading.Thread]=None
+
+    def route(self, method:str, pattern:str, handler:Callable):
+        self._routes.append((method, re.compile(pattern+"$"), handler))
+
+    @property
+    def url(self)->str:
+        return f"http://localhost:{self._server.server_address[1]}"
+
+    def start(self):
+        self._server = _FakeHTTPServer(("localhost", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server=None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def delay(self, size:int):
+        config = self.config
+        wait = config.latency
+        if config.latency_jitter:
+            with self._lock:
+                wait += self._random.uniform(0, config.latency_jitter)
+        if config.bandwidth:
+            wait += size/config.bandwidth
+        if wait>0:
+            time.sleep(wait)
+
+    def handle(self, method:str, path:str, params:dict, body) -> Tuple[int, object, dict]:
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path) if route_method==method else None
+            if match is None:
+                continue
+            with self._lock:
+                self.requests[pattern.pattern]=self.requests.get(pattern.pattern, 0)+1
+                failed = self.config.error_rate and self._random.random()<self.config.error_rate
+                if failed:
+                    self.errors+=1
+            if failed:
+                headers = {"Retry-After":str(self.config.retry_after)} if self.config.retry_after is not None else {}
+                return self.config.error_status, {"detail":"injected error"}, headers
+            result = handler(params, body, *match.groups())
+            if isinstance(result, tuple):
+                return result
+            return 200, result, {}
+        return 404, {"detail":f"{method} {path} not found"}, {}
+
+
+def _text(rng:random.Random, words:int)->str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _vector(rng:random.Random, dim:int)->List[float]:
+    return [round(rng.uniform(-1, 1), 6) for _ in range(dim)]
+
+
+class FakeLabelatorioServer(_FakeServer):
+    """
+    Labelator.io API stand-in with one project (PROJECT_ID) of config.documents documents
+    """
+
+    def __init__(self, config:Optional[FakeConfig]=None) -> None:
+        super().__init__(config)
+        self._documents:Dict[int,bytes]={}
+        self._ids:Dict[int,str]={}
+        self._deleted:Set[int]=set()
+        self._vectors_cache:Dict[str,bytes]={}
+        self._added:Dict[str,str]={}
+        self._tasks:Dict[str,dict]={}
+        self.labels:Dict[str,List[str]]={}
+        """labels set by PATCH doc/labels, by document id"""
+        project = r"projects/([^/]+)"
+        self.route("GET", r"login/status", lambda params, body: {"displayName":"benchmark", "email":"benchmark@localhost", "tennant_id":"fake"})
+        self.route("GET", project+r"/doc/count", self._count)
+        self.route("GET", project+r"/doc/search", self._search)
+        self.route("POST", project+r"/doc/query", self._query)
+        self.route("POST", project+r"/doc", self._add)
+        self.route("POST", project+r"/doc/delete-by-query", self._delete_by_query)
+        self.route("PUT", project+r"/doc/export-vectors", self._vectors)
+        self.route("PATCH", project+r"/doc/labels", self._set_labels)
+        self.route("POST", project+r"/doc/similar/links/([^/]+)/query", self._links)
+        self.route("GET", project+r"/topic/search", self._topics)
+        self.route("PUT", project+r"/models/([^/]+)/(apply-predict|apply-embeddings)", self._start_task)
+        self.route("PUT", project+r"/models/train", lambda params, body, project_id: self._start_task(params, body, project_id, "train", "train"))
+        self.route("POST", project+r"/topic/regenerate", lambda params, body, project_id: self._start_task(params, body, project_id, None, "regenerate-topics"))
+        self.route("GET", r"projects/tasks", self._latest_tasks)
+        self.route("GET", r"projects/tasks/([^/]+)", self._task)
+
+    def document(self, i:int)->bytes:
+        """JSON of i-th document (cached, so serialization doesn't burden the benchmarked client sharing the interpreter)"""
+        cached = self._documents.get(i)
+        if cached is None:
+            config = self.config
+            rng = random.Random(config.seed*1_000_003+i)
+            labels = [rng.choice(config.labels)] if rng.random()<0.5 else None
+            cached = self._documents[i] = json.dumps({
+                "id":str(uuid.UUID(int=rng.getrandbits(128))),
+                "key":f"key-{i}",
+                "text":_text(rng, config.text_words),
+                "labels":labels,
+                "predicted_labels":[rng.choice(config.labels)],
+                "predicted_label_scores":{label:round(rng.random(), 4) for label in config.labels},
+                "context_data":{"source":"benchmark"},
+                "_i":i,
+            }).encode()
+        return cached
+
+    def _documents_page(self, indices)->bytes:
+        return b"["+b",".join(self.document(i) for i in indices)+b"]"
+
+    def _count(self, params, body, project_id):
+        return self.config.documents-len(self._deleted)
+
+    def _search(self, params, body, project_id):
+        take = self._take(params)
+        if "after" in params:
+            start = int(params["after"])+1
+            end = min(int(params.get("before", start+take)), start+take)
+        else:
+            start = int(params.get("skip", 0))
+            end = start+take
+        return self._documents_page(i for i in range(max(0, start), min(end, self.config.documents)) if i not in self._deleted)
+
+    def _take(self, params, default:int=50)->int:
+        take = int(params.get("take") or default)
+        return min(take, self.config.max_take) if self.config.max_take else take
+
+    def document_id(self, i:int)->str:
+        doc_id = self._ids.get(i)
+        if doc_id is None:
+            doc_id = self._ids[i] = json.loads(self.document(i))["id"]
+        return doc_id
+
+    def _matches(self, i:int, branch:dict)->bool:
+        for field, value_of in (("id", self.document_id), ("key", lambda i: f"key-{i}")):
+            values = branch.get(field)
+            if values is not None and value_of(i) not in (values if isinstance(values, list) else [values]):
+                return False
+        return True
+
+    def _matching(self, body) -> Iterable[int]:
+        # only keyset condition on _i and id / key filters are evaluated, other filters match all documents
+        branches = body.get("Or") if isinstance(body, dict) and "Or" in body else [body or {}]
+        start = 0
+        for branch in branches:
+            condition = branch.get("_i") if isinstance(branch, dict) else None
+            if isinstance(condition, dict) and ">" in condition:
+                start = max(start, int(condition[">"])+1)
+        if not self._deleted and not any(isinstance(branch, dict) and ("id" in branch or "key" in branch) for branch in branches):
+            return range(start, self.config.documents)
+        return (i for i in range(start, self.config.documents) if i not in self._deleted and any(self._matches(i, branch) for branch in branches))
+
+    def _query(self, params, body, project_id):
+        skip, take = int(params.get("skip") or 0), self._take(params)
+        matching = self._matching(body)
+        if isinstance(matching, range):
+            return self._documents_page(matching[skip:skip+take])
+        return self._documents_page(itertools.islice(matching, skip, skip+take))
+
+    def _delete_by_query(self, params, body, project_id):
+        with self._lock:
+            matching = self._matching(body)
+            if params.get("wait_for_completion")=="True":
+                matching = itertools.islice(matching, self.config.delete_sync_limit)
+            self._deleted.update(list(matching))
+        return 204, b"", {}
+
+    def _add(self, params, body, project_id):
+        result=[]
+        with self._lock:
+            for record in body:
+                key = record.get("key")
+                doc_id = self._added.get(key) if key is not None and params.get("upsert")!="False" else None
+                if doc_id is None:
+                    doc_id = str(uuid.uuid4())
+                    if key is not None:
+                        self._added[key]=doc_id
+                result.append({"id":doc_id, "key":key})
+        return result
+
+    def _set_labels(self, params, body, project_id):
+        with self._lock:
+            for doc_id in body["doc_ids"]:
+                self.labels[doc_id]=body["labels"]
+        return 204, b"", {}
+
+    def vector(self, doc_id:str)->bytes:
+        """JSON of the document vector (cached like documents)"""
+        cached = self._vectors_cache.get(doc_id)
+        if cached is None:
+            cached = self._vectors_cache[doc_id] = json.dumps(_vector(random.Random(doc_id), self.config.vector_dim)).encode()
+        return cached
+
+    def _vectors(self, params, body, project_id):
+        return b"["+b",".join(b'{"id":'+json.dumps(doc_id).encode()+b',"vector":'+self.vector(doc_id)+b"}" for doc_id in body)+b"]"
+
+    def _links(self, params, body, project_id, link_type):
+        config = self.config
+        select = params.get("select")
+        fields = select.split(",") if select else None
+        skip, take = int(params.get("skip") or 0), self._take(params)
+        total = config.documents*config.links_per_document
+        links=[]
+        for n in range(skip, min(skip+take, total)):
+            left = n//config.links_per_document
+            right = random.Random(n).randrange(config.documents)
+            pair=[]
+            for i in (left, right):
+                doc = json.loads(self.document(i))
+                pair.append({key:doc[key] for key in fields if key in doc} if fields else doc)
+            links.append(pair)
+        return links
+
+    def _topics(self, params, body, project_id):
+        config = self.config
+        skip, take = int(params.get("skip") or 0), self._take(params)
+        topics=[]
+        for i in range(skip, min(skip+take, config.topics)):
+            rng = random.Random(f"topic-{i}")
+            topics.append({
+                "topic_id":f"topic-{i}",
+                "topic_name":_text(rng, 3),
+                "topic_keywords":[{"word":word, "score":round(rng.random(), 4)} for word in rng.sample(_WORDS, 5)],
+                "size":rng.randrange(1, config.documents+1),
+                "centroid":_vector(rng, config.vector_dim),
+            })
+        return topics
+
+    def _start_task(self, params, body, project_id, model, kind):
+        task_id = str(uuid.uuid4())
+        with self._lock:
+            self._tasks[task_id] = {"task_id":task_id, "task_name":f"{kind} {model or ''}".strip(), "project_id":project_id, "started":time.time()}
+        return {"task_id":task_id}
+
+    def _task_status(self, task:dict)->dict:
+        duration = self.config.task_duration
+        elapsed = time.time()-task["started"]
+        finished = elapsed>=duration
+        return {
+            "task_id":task["task_id"],
+            "task_name":task["task_name"],
+            "project_id":task["project_id"],
+            "tennant_id":"fake",
+            "state":"FINISHED" if finished else "RUNNING",
+            "progress_current":100 if finished else max(1, int(100*elapsed/duration)),
+            "progress_total":100,
+            "duration_sec":int(elapsed),
+        }
+
+    def _latest_tasks(self, params, body):
+        with self._lock:
+            tasks = [task for task in self._tasks.values() if not params.get("project_id") or task["project_id"]==params["project_id"]]
+        return [self._task_status(task) for task in tasks[-100:]]
+
+    def _task(self, params, body, task_id):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return 404, {"detail":"task not found"}, {}
+        return self._task_status(task)
+
+
+class FakeServingNode(_FakeServer):
+    """
+    Serving node stand-in... predictions, answers and embeddings are derived from the texts deterministically
+    """
+
+    def __init__(self, config:Optional[FakeConfig]=None, per_item_latency:float=0.0) -> None:
+        """
+        Args:
+            config (FakeConfig, optional): latency, bandwidth and error injection. Defaults to FakeConfig().
+            per_item_latency (float, optional): seconds of "inference" per text of a request, on top of config.latency. Defaults to 0.
+        """
+        super().__init__(config)
+        self.per_item_latency=per_item_latency
+        self._embeddings_cache:Dict[str,bytes]={}
+        self.route("GET", r"", lambda params, body: {"status":"ok"})
+        self.route("POST", r"predict", self._predict)
+        self.route("POST", r"get-answer", self._answer)
+        self.route("POST", r"embeddings", self._embeddings)
+        self.route("POST", r"refresh", lambda params, body: {})
+
+    def _infer(self, texts:list):
+        if self.per_item_latency:
+            time.sleep(self.per_item_latency*len(texts))
+
+    def _predict(self, params, body):
+        texts = body["texts"]
+        self._infer(texts)
+        predictions=[]
+        for text in texts:
+            key = text.get("key") if isinstance(text, dict) else None
+            rng = random.Random(text.get("text") if isinstance(text, dict) else text)
+            label = rng.choice(self.config.labels)
+            predictions.append({"predicted":[{"label":label, "score":round(rng.uniform(0.5, 1), 4)}], "handling":"model-auto", "key":key})
+        return {"predictions":predictions}
+
+    def _answer(self, params, body):
+        texts = body["texts"]
+        self._infer(texts)
+        predictions=[]
+        for text in texts:
+            question = text.get("question") if isinstance(text, dict) else text
+            key = text.get("key") if isinstance(text, dict) else None
+            predictions.append({"predicted":[{"answer":f"answer to {question}", "score":0.9}], "handling":"model-auto", "key":key})
+        return {"predictions":predictions}
+
+    def _embeddings(self, params, body):
+        texts = body["texts"]
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        self._infer(texts)
+        embeddings = [self._embedding(text) for text in texts]
+        return b'{"embeddings":'+(embeddings[0] if single else b"["+b",".join(embeddings)+b"]")+b"}"
+
+    def _embedding(self, text:str)->bytes:
+        cached = self._embeddings_cache.get(text)
+        if cached is None:
+            cached = self._embeddings_cache[text] = json.dumps(_vector(random.Random(text), self.config.vector_dim)).encode()
+        return cached
@@ -0,0 +1,51 @@
+"""
+Memory benchmark of holding documents: list of TextDocument dataclasses vs. DocumentBatch
+
+usage: python benchmarks/memory_benchmark.py [--records 200000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from labelatorio import data_model
+from labelatorio._decoders import get_decoder
+
+
+def _records(count:int):
+    labels = [None, ["A"], ["B"], ["A","B"]]
+    for i in range(count):
+        yield {
+            "id":f"{i:08d}-0000-0000-0000-000000000000",
+            "key":str(i),
+            "text":f"document {i}",
+            "labels":random.choice(labels),
+            "predicted_labels":["A"],
+            "predicted_label_scores":{"A":random.random(),"B":random.random()},
+            "_i":i,
+        }
+
+
+def _measure(build)->int:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(records_count:int):
+    records = list(_records(records_count))
+    decoder = get_decoder(data_model.TextDocument)
+    # strings (ids, texts) are shared by both representations, so only container overhead is measured
+    as_list = _measure(lambda: [decoder(rec) for rec in records])
+    as_batch = _measure(lambda: data_model.DocumentBatch.from_records(records))
+    print(f"List[TextDocument]: {as_list/2**20:8.1f} MB")
+    print(f"DocumentBatch:      {as_batch/2**20:8.1f} MB  ({as_list/as_batch:.1f}x less)")
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    run(parser.parse_args().records)
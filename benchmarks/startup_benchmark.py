@@ -0,0 +1,46 @@
+"""
+Start-up benchmark: time of "import labelatorio" and of lazy Client / NodeClient construction
+Each measurement runs in a fresh interpreter, so module caches don't skew the results.
+
+usage: python benchmarks/startup_benchmark.py [--repeat 7]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "import labelatorio": "import labelatorio",
+    "import labelatorio.client": "import labelatorio.client",
+    "Client(lazy=True)": "import labelatorio; labelatorio.Client('token', url='http://localhost:1', lazy=True)",
+    "NodeClient(lazy=True)": "import labelatorio; labelatorio.NodeClient('token', url='http://localhost:1', lazy=True)",
+}
+
+_TIMER = """
+import time
+_start = time.perf_counter()
+{code}
+print(time.perf_counter()-_start)
+"""
+
+
+def _measure(code:str, repeat:int)->float:
+    times=[]
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _TIMER.format(code=code)], check=True, capture_output=True, text=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<28}{'median ms':>12}")
+    for name, code in SNIPPETS.items():
+        print(f"{name:<28}{_measure(code, args.repeat)*1000:>12.1f}")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Offline benchmark suite... runs the client against in-process FakeLabelatorioServer / FakeServingNode (see fake_server.py),
+so results don't depend on a live API, its data or the network.
+
+Benchmarks: export (export_to_dataframe, query_iter), import (add_documents), vectors (get_vectors), links (similarity links),
+topics (get_all), tasks (wait_all), predict (NodeClient.predict at several batch sizes), embeddings and decode (decoding of
+a page of documents without network). Each benchmark is repeated and its median / min time reported. Results can be saved
+as JSON (with the git commit they were measured at) and compared with results saved earlier, i.e. on another commit.
+
+usage: python -m benchmarks.suite [--only export,vectors] [--documents 20000] [--latency 0.002] [--error-rate 0.01]
+                                  [--repeat 5] [--warmup 1] [--save results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from typing import Callable, Dict, List, Optional
+
+import labelatorio
+from benchmarks.fake_server import FakeConfig, FakeLabelatorioServer, FakeServingNode, PROJECT_ID
+
+BENCHMARKS:Dict[str,Callable[["BenchmarkContext"],int]]={}
+
+
+def benchmark(name:str):
+    """registers benchmark function... it gets BenchmarkContext and returns number of processed items"""
+    def decorator(fn:Callable[["BenchmarkContext"],int]):
+        BENCHMARKS[name]=fn
+        return fn
+    return decorator
+
+
+class BenchmarkContext:
+    def __init__(self, api:FakeLabelatorioServer, node:FakeServingNode) -> None:
+        self.api=api
+        self.node=node
+        self.config=api.config
+
+    def client(self, **kwargs)->labelatorio.Client:
+        return labelatorio.Client("token", url=self.api.url, lazy=True, **kwargs)
+
+    def node_client(self, **kwargs)->labelatorio.NodeClient:
+        return labelatorio.NodeClient("token", url=self.node.url, lazy=True, circuit_breaker=False, **kwargs)
+
+
+@benchmark("export.dataframe")
+def _export_dataframe(context:BenchmarkContext)->int:
+    return len(context.client().documents.export_to_dataframe(PROJECT_ID))
+
+
+@benchmark("export.query_iter")
+def _export_query_iter(context:BenchmarkContext)->int:
+    return sum(1 for _ in context.client().documents.query_iter(PROJECT_ID, {}, page_size=1000))
+
+
+@benchmark("import.add_documents")
+def _import(context:BenchmarkContext)->int:
+    documents = [{"key":f"import-{i}", "text":f"imported document {i}", "labels":["A"]} for i in range(context.config.documents)]
+    return len(context.client().documents.add_documents(PROJECT_ID, documents, batch_size=500))
+
+
+@benchmark("vectors.get_vectors")
+def _vectors(context:BenchmarkContext)->int:
+    ids = [f"doc-{i}" for i in range(min(context.config.documents, 5_000))]
+    return len(context.client().documents.get_vectors(PROJECT_ID, ids))
+
+
+@benchmark("links.query_iter")
+def _links(context:BenchmarkContext)->int:
+    return sum(1 for _ in context.client().similarity_links.query_iter(PROJECT_ID, "SIMILAR", select=["id","key"], page_size=1000))
+
+
+@benchmark("topics.get_all")
+def _topics(context:BenchmarkContext)->int:
+    return len(context.client().topics.get_all(PROJECT_ID, page_size=20))
+
+
+@benchmark("tasks.wait_all")
+def _tasks(context:BenchmarkContext)->int:
+    client = context.client()
+    handles = [client.models.apply_predictions(PROJECT_ID, f"model-{i}") for i in range(20)]
+    done, _ = client.tasks.wait_all(handles)
+    return len(done)
+
+
+def _predict_batched(context:BenchmarkContext, batch_size:int)->int:
+    node_client = context.node_client()
+    texts = [f"text to predict number {i}" for i in range(1_000)]
+    predicted = 0
+    for start in range(0, len(texts), batch_size):
+        predicted += len(node_client.predict(texts[start:start+batch_size]).predictions)
+    return predicted
+
+
+for _batch_size in (1, 16, 128):
+    benchmark(f"predict.batch_{_batch_size}")(lambda context, batch_size=_batch_size: _predict_batched(context, batch_size))
+
+
+@benchmark("predict.get_answers")
+def _answers(context:BenchmarkContext)->int:
+    node_client = context.node_client()
+    questions = [f"question number {i}?" for i in range(500)]
+    return sum(len(node_client.get_answers(questions[start:start+50])) for start in range(0, len(questions), 50))
+
+
+@benchmark("embeddings")
+def _embeddings(context:BenchmarkContext)->int:
+    node_client = context.node_client()
+    texts = [f"text to embed number {i}" for i in range(1_000)]
+    return sum(len(node_client.get_embeddings(texts[start:start+100])) for start in range(0, len(texts), 100))
+
+
+@benchmark("decode.documents")
+def _decode(context:BenchmarkContext)->int:
+    from labelatorio import data_model
+    from labelatorio._decoders import get_decoder
+    from labelatorio._codec import get_codec
+    count = min(context.config.documents, 10_000)
+    payload = context.api._documents_page(range(count))
+    decoder = get_decoder(data_model.TextDocument)
+    return len([decoder(item) for item in get_codec().loads(payload)])
+
+
+def _git_commit()->Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names:List[str], config:FakeConfig, repeat:int=3, warmup:int=1, per_item_latency:float=0.0)->dict:
+    """
+    runs the benchmarks and returns results (as saved by --save)... warmup runs (not measured) fill caches of the fake servers
+    """
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}, available: {', '.join(BENCHMARKS)}")
+    results={}
+    with warnings.catch_warnings(), FakeLabelatorioServer(config) as api, FakeServingNode(config, per_item_latency=per_item_latency) as node:
+        warnings.simplefilter("ignore")
+        context = BenchmarkContext(api, node)
+        for name in names:
+            for _ in range(warmup):
+                BENCHMARKS[name](context)
+            times=[]
+            items=0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                items = BENCHMARKS[name](context)
+                times.append(time.perf_counter()-start)
+            median = statistics.median(times)
+            results[name]={
+                "median":median,
+                "min":min(times),
+                "runs":times,
+                "items":items,
+                "items_per_sec":items/median if median else None,
+            }
+    return {
+        "commit":_git_commit(),
+        "timestamp":time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python":platform.python_version(),
+        "labelatorio":labelatorio.__version__,
+        # through JSON, so it compares equal to config of saved results
+        "config":json.loads(json.dumps(vars(config))),
+        "repeat":repeat,
+        "results":results,
+    }
+
+
+def format_results(results:dict, baseline:Optional[dict]=None)->str:
+    lines=[f"commit {results.get('commit')}"+(f" vs. baseline {baseline.get('commit')}" if baseline else "")]
+    header=f"{'benchmark':<24}{'median [s]':>12}{'min [s]':>12}{'items/s':>12}"
+    if baseline:
+        header+=f"{'baseline [s]':>14}{'change':>9}"
+    lines.append(header)
+    for name, result in results["results"].items():
+        line=f"{name:<24}{result['median']:>12.4f}{result['min']:>12.4f}{(result['items_per_sec'] or 0):>12.0f}"
+        previous = baseline["results"].get(name) if baseline else None
+        if previous:
+            change = result["median"]/previous["median"]-1 if previous["median"] else 0
+            line+=f"{previous['median']:>14.4f}{change:>+8.1%}"
+        lines.append(line)
+    if baseline and baseline.get("config")!=results.get("config"):
+        lines.append("warning: baseline was measured with different configuration")
+    return "\n".join(lines)
+
+
+def main(argv:Optional[List[str]]=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", help=f"comma separated benchmarks (or prefixes), available: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--documents", type=int, default=FakeConfig.documents)
+    parser.add_argument("--vector-dim", type=int, default=FakeConfig.vector_dim)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes per second of responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--per-item-latency", type=float, default=0.0, help="seconds of node inference per text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs of each benchmark")
+    parser.add_argument("--save", help="save results to JSON file")
+    parser.add_argument("--compare", help="compare with results saved by --save")
+    args = parser.parse_args(argv)
+
+    names = list(BENCHMARKS)
+    if args.only:
+        prefixes = [prefix.strip() for prefix in args.only.split(",") if prefix.strip()]
+        names = [name for name in names if any(name==prefix or name.startswith(prefix+".") or name.startswith(prefix+"_") for prefix in prefixes)]
+        if not names:
+            parser.error(f"no benchmark matches {args.only}")
+    config = FakeConfig(
+        documents=args.documents,
+        vector_dim=args.vector_dim,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        task_duration=0.5,
+    )
+    results = run(names, config, repeat=args.repeat, warmup=args.warmup, per_item_latency=args.per_item_latency)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "rt") as baseline_file:
+            baseline = json.load(baseline_file)
+    print(format_results(results, baseline))
+    if args.save:
+        with open(args.save, "wt") as results_file:
+            json.dump(results, results_file, indent=2)
+
+
+if __name__=="__main__":
+    sys.exit(main())
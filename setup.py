@@ -30,5 +30,8 @@ setuptools.setup(name='labelatorio',
                     "tqdm",
                     "pydantic",
                     "aiohttp"
-                ]
+                ],
+                extras_require={
+                    "fast":["orjson"],
+                }
                 )
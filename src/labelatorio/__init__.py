@@ -1,6 +1,53 @@
-from .client import Client
-from .serving import *
-from .query_model import DocumentQueryFilter
-
+import importlib
 
 __version__="0.4.1"
+
+# public names are imported lazily on first access, so "import labelatorio" doesn't pull in pandas, aiohttp, pydantic etc.
+_LAZY_EXPORTS={
+    "Client":".client",
+    "ResponseCache":"._cache",
+    "Compression":"._compression",
+    "RetryPolicy":"._retry",
+    "Throttle":"._throttle",
+    "CircuitBreaker":"._circuit",
+    "CircuitOpenError":"._circuit",
+    "Metrics":"._metrics",
+    "OpenTelemetryExporter":"._metrics",
+    "Profile":"._profile",
+    "DocumentQueryFilter":".query_model",
+    "TopicIndex":".topic_index",
+    "ModelCache":"._model_cache",
+    "wait_all":"._tasks",
+    "as_completed":"._tasks",
+    "TaskWatcher":"._tasks",
+    "NodeClient":".serving",
+    "PredictionRequestRecord":".serving",
+    "Prediction":".serving",
+    "Answer":".serving",
+    "PredictedItem":".serving",
+    "PredictResponse":".serving",
+    "AnswerSource":".serving",
+    "AnsweredQuestion":".serving",
+    "AskQuestionRecord":".serving",
+}
+
+__all__=list(_LAZY_EXPORTS)
+
+
+def __getattr__(name:str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        try:
+            # submodules, i.e. labelatorio.serving
+            return importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as ex:
+            if ex.name!=f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name]=value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals())+list(_LAZY_EXPORTS))
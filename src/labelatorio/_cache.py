@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, Union
+from labelatorio._codec import get_codec
+
+
+class CachedResponse:
+    """
+    minimal stand-in for requests.Response served from cache
+    """
+    def __init__(self, status_code:int, content:bytes, headers:dict) -> None:
+        self.status_code=status_code
+        self.content=content
+        self.headers=headers
+
+    @property
+    def text(self)->str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return get_codec().loads(self.content)
+
+
+class _CacheEntry:
+    __slots__=("group","content","headers","etag","expires_at")
+
+    def __init__(self, group:str, content:bytes, headers:dict, etag:Optional[str], expires_at:float) -> None:
+        self.group=group
+        self.content=content
+        self.headers=headers
+        self.etag=etag
+        self.expires_at=expires_at
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of GET responses with TTL per endpoint group.
+
+    Expired entries that came with an ETag are revalidated by conditional request (If-None-Match),
+    so unchanged data are not downloaded again (server responds 304).
+    Only endpoints returning rarely changing metadata are cached (projects.get, models.get_info, serving_nodes.get_node_settings, topics.get_topic),
+    any write (POST, PUT, PATCH, DELETE) call through their endpoint group invalidates all cached entries of that group.
+    """
+
+    DEFAULT_TTL_SEC={
+        "projects":60,
+        "models":300,
+        "serving_nodes":10,
+        "topics":120,
+    }
+
+    def __init__(self, max_entries:int=1024, ttl_sec:Union[float,Dict[str,float],None]=None) -> None:
+        """
+        Args:
+            max_entries (int, optional): max number of cached responses. Least recently used are evicted first. Defaults to 1024.
+            ttl_sec (Union[float,Dict[str,float]], optional): time to live for all groups, or per endpoint group (projects, models, serving_nodes, topics). Defaults to DEFAULT_TTL_SEC.
+        """
+        self.max_entries=max_entries
+        if isinstance(ttl_sec, dict):
+            self.ttl_sec={**ResponseCache.DEFAULT_TTL_SEC, **ttl_sec}
+        elif ttl_sec is not None:
+            self.ttl_sec={group:ttl_sec for group in ResponseCache.DEFAULT_TTL_SEC}
+        else:
+            self.ttl_sec=dict(ResponseCache.DEFAULT_TTL_SEC)
+        self._entries:"OrderedDict[Tuple,_CacheEntry]"=OrderedDict()
+        self._lock=threading.Lock()
+        self.hits=0
+        self.misses=0
+        self.revalidated=0
+
+    def is_cached_group(self, group:Optional[str])->bool:
+        return group is not None and self.ttl_sec.get(group,0)>0
+
+    def make_key(self, url:str, query_params:Optional[dict], auth:Optional[str]=None)->Tuple:
+        """
+        key of the request... includes hash of the auth header, so one cache can be shared by clients with different tokens
+        """
+        params = tuple(sorted((k, str(v)) for k, v in query_params.items() if v is not None)) if query_params else ()
+        return (url, params, hashlib.sha256(auth.encode()).hexdigest() if auth else None)
+
+    def fetch(self, group:str, key:Tuple, send:Callable[[Optional[dict]],object]):
+        """
+        returns fresh cached response or calls send(extra_headers) and caches the result
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.expires_at>time.monotonic():
+                    self.hits+=1
+                    return CachedResponse(200, entry.content, entry.headers)
+
+        response = send({"If-None-Match":entry.etag} if entry is not None and entry.etag else None)
+
+        with self._lock:
+            if response.status_code==304 and entry is not None:
+                self.revalidated+=1
+                entry.expires_at=time.monotonic()+self.ttl_sec[group]
+                self._store(key, entry)
+                return CachedResponse(200, entry.content, entry.headers)
+            self.misses+=1
+            if response.status_code==200:
+                self._store(key, _CacheEntry(group, response.content, dict(response.headers), response.headers.get("ETag"), time.monotonic()+self.ttl_sec[group]))
+        return response
+
+    def _store(self, key:Tuple, entry:_CacheEntry):
+        self._entries[key]=entry
+        self._entries.move_to_end(key)
+        while len(self._entries)>self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, group:Optional[str]=None):
+        """
+        drops cached entries of the endpoint group (or all entries if group is not set)
+        """
+        with self._lock:
+            if group is None:
+                self._entries.clear()
+            else:
+                for key in [key for key, entry in self._entries.items() if entry.group==group]:
+                    del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self._entries)
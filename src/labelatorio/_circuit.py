@@ -0,0 +1,148 @@
+"""
+Circuit breaker for serving node calls.
+
+After failure_threshold consecutive failures (connection errors, timeouts or 5xx responses) the circuit opens
+and calls fail immediately with CircuitOpenError, instead of waiting for the node timeout.
+After recovery_timeout the circuit is half-open: a probe (if set) or a single trial call decides whether it closes again.
+"""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+CLOSED="closed"
+OPEN="open"
+HALF_OPEN="half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_failure_status(status_code:int)->bool:
+    # 4xx are caller errors, node is working
+    return status_code>=500
+
+
+class CircuitBreaker:
+    """
+    Args:
+        failure_threshold (int, optional): consecutive failures to open the circuit. Defaults to 5.
+        recovery_timeout (float, optional): seconds in open state before trying the node again. Defaults to 30.
+        probe (Callable[[],bool], optional): health check called in half-open state before letting a real call through. Defaults to None.
+        name (str, optional): name used in error messages (i.e. node url)
+    """
+    def __init__(self, failure_threshold:int=5, recovery_timeout:float=30, probe:Optional[Callable[[],bool]]=None, name:str=None) -> None:
+        self.failure_threshold=failure_threshold
+        self.recovery_timeout=recovery_timeout
+        self.probe=probe
+        self.name=name
+        self._state=CLOSED
+        self._opened_at=0.0
+        self._trial_running=False
+        self._lock=threading.Lock()
+        self.consecutive_failures=0
+        self.times_opened=0
+        self.rejected=0
+
+    @property
+    def state(self)->str:
+        with self._lock:
+            if self._state==OPEN and time.monotonic()-self._opened_at>=self.recovery_timeout:
+                self._state=HALF_OPEN
+                self._trial_running=False
+            return self._state
+
+    def _reject(self):
+        with self._lock:
+            self.rejected+=1
+        raise CircuitOpenError(f"Circuit of {self.name or 'node'} is open after {self.consecutive_failures} consecutive failures")
+
+    def before_call(self, run_probe:bool=True):
+        """
+        raises CircuitOpenError if the call is not allowed
+        """
+        state=self.state
+        if state==CLOSED:
+            return
+        if state==OPEN:
+            self._reject()
+        with self._lock:
+            # half open... only one trial at a time, the others are rejected until it resolves
+            if self._trial_running:
+                trial=False
+            else:
+                self._trial_running=trial=True
+        if not trial:
+            self._reject()
+        if run_probe and self.probe is not None:
+            try:
+                healthy=self.probe()
+            except Exception:
+                healthy=False
+            if not healthy:
+                self.record_failure()
+                self._reject()
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures=0
+            self._state=CLOSED
+            self._trial_running=False
+
+    def release_trial(self):
+        """lets another trial call through in half-open state, when the trial ended without result"""
+        with self._lock:
+            self._trial_running=False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures+=1
+            if self._state==HALF_OPEN or self.consecutive_failures>=self.failure_threshold:
+                if self._state!=OPEN:
+                    self.times_opened+=1
+                self._state=OPEN
+                self._opened_at=time.monotonic()
+                self._trial_running=False
+
+    def call(self, send:Callable[[],object]):
+        """
+        calls send() (returning object with status_code) through the breaker
+        """
+        self.before_call()
+        try:
+            response=send()
+        except Exception:
+            self.record_failure()
+            raise
+        if is_failure_status(response.status_code):
+            self.record_failure()
+        else:
+            self.record_success()
+        return response
+
+    async def acall(self, send:Callable[[],Awaitable]):
+        # probe is blocking, the trial call itself checks the node in async mode
+        self.before_call(run_probe=False)
+        try:
+            response=await send()
+        except asyncio.CancelledError:
+            # cancelled by the caller, says nothing about the node
+            self.release_trial()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        if is_failure_status(response.status_code):
+            self.record_failure()
+        else:
+            self.record_success()
+        return response
+
+    def stats(self)->dict:
+        return {
+            "state":self.state,
+            "consecutive_failures":self.consecutive_failures,
+            "times_opened":self.times_opened,
+            "rejected":self.rejected,
+        }
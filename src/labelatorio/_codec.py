@@ -0,0 +1,98 @@
+"""
+JSON codec used for request bodies and response parsing.
+
+orjson is used if installed (serializes numpy arrays and scalars natively), otherwise falls back to stdlib json.
+Codec can be forced by set_codec("json"|"orjson") or by passing custom JsonCodec instance.
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Union
+
+
+class JsonCodec(ABC):
+    """
+    base of codecs... subclasses implement dumps and loads
+    """
+    name:str = None
+
+    @abstractmethod
+    def dumps(self, obj:Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def loads(self, data:Union[bytes,str]) -> Any:
+        pass
+
+
+def _default(obj:Any) -> Any:
+    # numpy arrays / scalars (and anything else that can convert itself to python types)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibJsonCodec(JsonCodec):
+    name="json"
+
+    def dumps(self, obj:Any) -> bytes:
+        return json.dumps(obj, default=_default, allow_nan=False).encode("utf-8")
+
+    def loads(self, data:Union[bytes,str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name="orjson"
+
+    def __init__(self) -> None:
+        import orjson
+        self._orjson=orjson
+        self._options=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj:Any) -> bytes:
+        return self._orjson.dumps(obj, default=_default, option=self._options)
+
+    def loads(self, data:Union[bytes,str]) -> Any:
+        return self._orjson.loads(data)
+
+
+def _create_default_codec() -> JsonCodec:
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return StdlibJsonCodec()
+
+
+_codec:JsonCodec = None
+
+
+def get_codec() -> JsonCodec:
+    global _codec
+    if _codec is None:
+        _codec = _create_default_codec()
+    return _codec
+
+
+def set_codec(codec:Union[str,JsonCodec,None]) -> JsonCodec:
+    """
+    sets the codec used by all clients... "json", "orjson", JsonCodec instance or None (auto select)
+    """
+    global _codec
+    if codec is None:
+        _codec = _create_default_codec()
+    elif codec==StdlibJsonCodec.name:
+        _codec = StdlibJsonCodec()
+    elif codec==OrjsonCodec.name:
+        _codec = OrjsonCodec()
+    elif isinstance(codec, JsonCodec):
+        _codec = codec
+    else:
+        raise ValueError(f"Unknown json codec: {codec}")
+    return _codec
+
+
+JSON_HEADERS={"Content-Type":"application/json"}
@@ -0,0 +1,94 @@
+"""
+HTTP body compression.
+
+Request bodies above min_size are compressed (gzip or deflate) and sent with Content-Encoding header.
+Responses are requested with explicit Accept-Encoding and decompressed by urllib3 incrementally while they are read.
+Sizes of both directions are counted, so the effective compression ratio can be checked in client.compression.stats()
+"""
+import gzip
+import threading
+import zlib
+from typing import Optional, Tuple
+
+ACCEPT_ENCODING="gzip, deflate"
+
+ENCODINGS=("gzip","deflate")
+
+
+class Compression:
+    """
+    Compression settings and transfer statistics of a client
+
+    Args:
+        encoding (str, optional): "gzip", "deflate" or None (request bodies are not compressed). Defaults to "gzip".
+        min_size (int, optional): compress only bodies of at least this many bytes... small bodies don't pay off the CPU time. Defaults to 8kB.
+        level (int, optional): compression level 1 (fastest) - 9 (smallest). Defaults to 6.
+    """
+
+    def __init__(self, encoding:Optional[str]="gzip", min_size:int=8*1024, level:int=6) -> None:
+        if encoding is not None and encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding {encoding}, supported: {ENCODINGS}")
+        self.encoding=encoding
+        self.min_size=min_size
+        self.level=level
+        self._lock=threading.Lock()
+        self.requests_compressed=0
+        self.request_bytes_raw=0
+        self.request_bytes_sent=0
+        self.response_bytes_received=0
+        self.response_bytes_decoded=0
+
+    def compress(self, data:bytes) -> Tuple[bytes,Optional[str]]:
+        """
+        returns body to send and its content encoding (None if body was left uncompressed)
+        """
+        encoding = None
+        sent = data
+        if self.encoding is not None and len(data)>=self.min_size:
+            if self.encoding=="gzip":
+                compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+            else:
+                compressed = zlib.compress(data, self.level)
+            # incompressible payloads (i.e. already packed vectors) are sent as they are
+            if len(compressed)<len(data):
+                sent, encoding = compressed, self.encoding
+        with self._lock:
+            self.request_bytes_raw+=len(data)
+            self.request_bytes_sent+=len(sent)
+            if encoding is not None:
+                self.requests_compressed+=1
+        return sent, encoding
+
+    def record_response(self, response) -> None:
+        """
+        counts wire and decoded size of (already read) requests.Response
+        """
+        raw = getattr(response, "raw", None)
+        received = raw.tell() if raw is not None and hasattr(raw, "tell") else None
+        decoded = len(response.content or b"")
+        with self._lock:
+            self.response_bytes_received+= received if received else decoded
+            self.response_bytes_decoded+=decoded
+
+    @property
+    def request_ratio(self) -> Optional[float]:
+        """raw / sent bytes of request bodies (2.0 means bodies were sent at half the size)"""
+        return self.request_bytes_raw/self.request_bytes_sent if self.request_bytes_sent else None
+
+    @property
+    def response_ratio(self) -> Optional[float]:
+        """decoded / received bytes of response bodies"""
+        return self.response_bytes_decoded/self.response_bytes_received if self.response_bytes_received else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "encoding":self.encoding,
+                "requests_compressed":self.requests_compressed,
+                "request_bytes_raw":self.request_bytes_raw,
+                "request_bytes_sent":self.request_bytes_sent,
+                "request_ratio":self.request_ratio,
+                "response_bytes_received":self.response_bytes_received,
+                "response_bytes_decoded":self.response_bytes_decoded,
+                "response_ratio":self.response_ratio,
+            }
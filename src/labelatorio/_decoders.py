@@ -0,0 +1,172 @@
+"""
+Precompiled decoders for data_model dataclasses.
+
+dataclasses_json's from_dict resolves type hints and walks the generic type machinery for every record.
+Here the same decoding rules are compiled once per class into a plain python function
+(generated source, with converters resolved upfront), so decoding of a record does only the necessary work.
+Decoded objects are equal to those created by from_dict.
+"""
+import dataclasses
+import threading
+import typing
+from typing import Any, Callable, Dict, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()
+_PRIMITIVES = (str, int, float, bool)
+
+_decoders:Dict[type,Callable[[dict],Any]] = {}
+_lock = threading.RLock()
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def get_decoder(cls:Type[T]) -> Callable[[dict],T]:
+    """
+    returns compiled decoder function for the dataclass (compiled on first use)
+    if the class uses field types the compiler doesn't support, cls.from_dict is returned
+    """
+    decoder = _decoders.get(cls)
+    if decoder is None:
+        with _lock:
+            decoder = _decoders.get(cls)
+            if decoder is None:
+                try:
+                    decoder = _compile_dataclass(cls)
+                except _Unsupported:
+                    decoder = cls.from_dict
+                _decoders[cls] = decoder
+    return decoder
+
+
+def decode(cls:Type[T], data:Any) -> Any:
+    """
+    decodes dict (or list of dicts) into the dataclass instance(s)
+    """
+    decoder = get_decoder(cls)
+    if isinstance(data, list):
+        return [decoder(rec) for rec in data]
+    return decoder(data)
+
+
+def _primitive_converter(tp:type) -> Callable[[Any],Any]:
+    def convert(value):
+        return value if isinstance(value, tp) else tp(value)
+    return convert
+
+
+def _converter(tp:Any) -> Optional[Callable[[Any],Any]]:
+    """
+    returns function converting json value into type tp, or None if value can be used as is
+    mirrors dataclasses_json rules for non-None values
+    """
+    if tp is Any or tp is type(None):
+        return None
+    if tp in _PRIMITIVES:
+        return _primitive_converter(tp)
+    if dataclasses.is_dataclass(tp):
+        # resolved lazily, to support recursive / not yet compiled classes
+        def convert_dataclass(value, tp=tp):
+            return get_decoder(tp)(value)
+        return convert_dataclass
+
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    if origin is typing.Union:
+        non_none = [arg for arg in args if arg is not type(None)]
+        if len(args)==2 and len(non_none)==1:
+            return _converter(non_none[0])
+        raise _Unsupported(tp)
+    if origin in (list, typing.List):
+        item_type = args[0] if args else Any
+        if item_type in _PRIMITIVES:
+            def convert_primitive_list(value, t=item_type):
+                return [item if isinstance(item, t) else t(item) for item in value]
+            return convert_primitive_list
+        item_converter = _optional_item_converter(item_type)
+        if item_converter is None:
+            return list
+        def convert_list(value):
+            return [item_converter(item) for item in value]
+        return convert_list
+    if origin in (dict, typing.Dict):
+        key_type, value_type = args if args else (Any, Any)
+        key_converter = _optional_item_converter(key_type)
+        value_converter = _optional_item_converter(value_type)
+        if key_converter is None and value_converter is None:
+            return dict
+        key_converter = key_converter or (lambda key: key)
+        value_converter = value_converter or (lambda val: val)
+        def convert_dict(value):
+            return {key_converter(key):value_converter(val) for key, val in value.items()}
+        return convert_dict
+    raise _Unsupported(tp)
+
+
+def _optional_item_converter(tp:Any) -> Optional[Callable[[Any],Any]]:
+    converter = _converter(tp)
+    if converter is None:
+        return None
+    if typing.get_origin(tp) is typing.Union:
+        return lambda value: None if value is None else converter(value)
+    return converter
+
+
+def _unwrap_optional(tp:Any) -> Any:
+    if typing.get_origin(tp) is typing.Union:
+        non_none = [arg for arg in typing.get_args(tp) if arg is not type(None)]
+        if len(non_none)==1:
+            return non_none[0]
+    return tp
+
+
+def _compile_dataclass(cls:type) -> Callable[[dict],Any]:
+    type_hints = typing.get_type_hints(cls)
+    namespace = {"_cls":cls, "_MISSING":_MISSING}
+    lines = [
+        "def decode(kvs):",
+        "    if isinstance(kvs, _cls):",
+        "        return kvs",
+        "    get = kvs.get",
+    ]
+    init_args = []
+    for i, field in enumerate(dataclasses.fields(cls)):
+        if not field.init:
+            continue
+        var = f"f{i}"
+        name = repr(field.name)
+        if field.default is not dataclasses.MISSING:
+            namespace[f"_default{i}"] = field.default
+            lines.append(f"    {var} = get({name}, _default{i})")
+        elif field.default_factory is not dataclasses.MISSING:
+            namespace[f"_factory{i}"] = field.default_factory
+            lines.append(f"    {var} = get({name}, _MISSING)")
+            lines.append(f"    if {var} is _MISSING: {var} = _factory{i}()")
+        else:
+            lines.append(f"    {var} = kvs[{name}]")
+
+        field_type = type_hints[field.name]
+        field_type = _unwrap_optional(field_type)
+        custom_decoder = (field.metadata or {}).get("dataclasses_json",{}).get("decoder")
+        if custom_decoder is not None:
+            namespace[f"_decoder{i}"] = custom_decoder
+            namespace[f"_type{i}"] = field_type
+            lines.append(f"    if {var} is not None and type({var}) is not _type{i}: {var} = _decoder{i}({var})")
+        elif field_type in _PRIMITIVES:
+            namespace[f"_type{i}"] = field_type
+            lines.append(f"    if {var} is not None and not isinstance({var}, _type{i}): {var} = _type{i}({var})")
+        else:
+            converter = _converter(field_type)
+            if converter is not None:
+                namespace[f"_convert{i}"] = converter
+                lines.append(f"    if {var} is not None: {var} = _convert{i}({var})")
+        init_args.append(f"{field.name}={var}")
+
+    lines.append(f"    return _cls({', '.join(init_args)})")
+    exec("\n".join(lines), namespace)
+    decoder = namespace["decode"]
+    decoder.__name__ = f"decode_{cls.__name__}"
+    return decoder
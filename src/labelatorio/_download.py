@@ -0,0 +1,354 @@
+"""
+Parallel, resumable downloads of model files.
+
+Files are probed by a one byte Range request (works with presigned GET urls, unlike HEAD). Large files of servers supporting ranges
+are split into parts downloaded concurrently into one preallocated "<file>.part" file. Downloaded bytes of each part are recorded
+in "<file>.part.json", so an interrupted download continues from where it stopped (if the remote file didn't change).
+Completed files are checked against the expected size and checksum (md5 / sha256 from the file listing or storage headers)
+before they are moved to their final path.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from labelatorio._retry import RetryPolicy, NO_RETRY
+
+CHUNK_SIZE=1024*1024
+PART_SIZE=64*1024*1024
+
+# how often (in chunks) the progress of a part is persisted
+_SAVE_STATE_EVERY=16
+
+
+class DownloadError(Exception):
+    pass
+
+
+class FileSpec:
+    """
+    Args:
+        url (str): url to download
+        path (str): target path
+        size (int, optional): expected size in bytes
+        md5 (str, optional): expected md5 (hex)
+        sha256 (str, optional): expected sha256 (hex)
+    """
+    def __init__(self, url:str, path:str, size:Optional[int]=None, md5:Optional[str]=None, sha256:Optional[str]=None) -> None:
+        self.url=url
+        self.path=path
+        self.size=size
+        self.md5=md5
+        self.sha256=sha256
+        self.etag:Optional[str]=None
+        self.supports_ranges=False
+
+
+class _Part:
+    __slots__=("spec","start","end","done")
+
+    def __init__(self, spec:FileSpec, start:int, end:Optional[int], done:int=0) -> None:
+        self.spec=spec
+        self.start=start
+        # inclusive, None if size is unknown
+        self.end=end
+        self.done=done
+
+    @property
+    def length(self)->Optional[int]:
+        return self.end-self.start+1 if self.end is not None else None
+
+    @property
+    def is_complete(self)->bool:
+        return self.length is not None and self.done>=self.length
+
+
+def _checksums_from_headers(headers)->Dict[str,str]:
+    """full object checksums announced by storage (GCS, Azure)"""
+    checksums={}
+    for item in (headers.get("x-goog-hash") or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name=="md5" and value:
+            checksums["md5"]=base64.b64decode(value+"=="[:(4-len(value)%4)%4]).hex()
+    azure_md5 = headers.get("x-ms-blob-content-md5")
+    if azure_md5:
+        checksums["md5"]=base64.b64decode(azure_md5).hex()
+    amz_sha256 = headers.get("x-amz-checksum-sha256")
+    if amz_sha256 and "-" not in amz_sha256:
+        checksums["sha256"]=base64.b64decode(amz_sha256).hex()
+    return checksums
+
+
+class Downloader:
+    """
+    Args:
+        max_workers (int, optional): parallel requests (files and parts). Defaults to 4.
+        part_size (int, optional): files larger than this are downloaded in parallel parts. Defaults to 64MB.
+        retry_policy (RetryPolicy, optional): retries of interrupted parts (continue from the last received byte). Defaults to no retry.
+        progress (bool, optional): show byte based progress bar of all files. Defaults to True.
+    """
+    def __init__(self, max_workers:int=4, part_size:int=PART_SIZE, retry_policy:Optional[RetryPolicy]=None, progress:bool=True) -> None:
+        self.max_workers=max(1,max_workers)
+        self.part_size=part_size
+        self.retry_policy=retry_policy or NO_RETRY
+        self.progress=progress
+        self._state_lock=threading.Lock()
+        self._cancelled=threading.Event()
+        self._session=None
+        self.on_file_complete:Optional[Callable[[FileSpec],None]]=None
+
+    def _get_session(self)->requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session=None
+
+    def probe(self, spec:FileSpec):
+        """
+        reads size, range support, etag and checksums of the remote file
+        """
+        with self._get_session().get(spec.url, headers={"Range":"bytes=0-0"}, stream=True, timeout=60) as response:
+            if response.status_code==416:
+                # range not satisfiable... empty file
+                spec.size=0
+                return
+            if response.status_code>=300:
+                raise DownloadError(f"Unable to download {spec.url}: {response.status_code} {response.reason}")
+            headers = response.headers
+            content_range = headers.get("Content-Range")
+            if response.status_code==206 and content_range and "/" in content_range:
+                total = content_range.rsplit("/",1)[1]
+                spec.supports_ranges = total!="*"
+                if spec.supports_ranges:
+                    spec.size = int(total)
+            elif headers.get("Content-Length") and headers.get("Content-Encoding") in (None,"identity"):
+                spec.size = spec.size or int(headers["Content-Length"])
+            spec.etag = headers.get("ETag")
+            checksums = _checksums_from_headers(headers)
+            if response.status_code==200 and headers.get("Content-MD5"):
+                checksums["md5"]=base64.b64decode(headers["Content-MD5"]).hex()
+            spec.md5 = spec.md5 or checksums.get("md5")
+            spec.sha256 = spec.sha256 or checksums.get("sha256")
+
+    def _state_path(self, spec:FileSpec)->str:
+        return spec.path+".part.json"
+
+    def _plan_parts(self, spec:FileSpec)->List[_Part]:
+        """
+        splits the file into parts, restoring progress of previous interrupted download of the same remote file
+        """
+        part_path = spec.path+".part"
+        previous = {}
+        if spec.supports_ranges and os.path.exists(part_path) and os.path.exists(self._state_path(spec)):
+            try:
+                with open(self._state_path(spec),"rt") as state_file:
+                    state = json.load(state_file)
+                if state.get("size")==spec.size and state.get("etag")==spec.etag and state.get("part_size")==self.part_size:
+                    previous = {int(start):done for start, done in state.get("done",{}).items()}
+            except (ValueError, OSError):
+                previous = {}
+
+        if not spec.supports_ranges or spec.size is None:
+            return [_Part(spec, 0, spec.size-1 if spec.size else None)]
+        if spec.size==0:
+            return [_Part(spec, 0, -1)]
+        return [_Part(spec, start, min(start+self.part_size, spec.size)-1, previous.get(start,0)) for start in range(0, spec.size, self.part_size)]
+
+    def _save_state(self, spec:FileSpec, parts:List[_Part]):
+        with self._state_lock:
+            tmp_path = self._state_path(spec)+".tmp"
+            with open(tmp_path,"wt") as state_file:
+                json.dump({"size":spec.size, "etag":spec.etag, "part_size":self.part_size, "done":{str(part.start):part.done for part in parts}}, state_file)
+            os.replace(tmp_path, self._state_path(spec))
+
+    def _download_part(self, part:_Part, parts:List[_Part], on_bytes:Callable[[int],None]):
+        spec = part.spec
+        attempt = 0
+        while not part.is_complete:
+            headers = {}
+            if spec.supports_ranges:
+                headers["Range"] = f"bytes={part.start+part.done}-{part.end}"
+            elif part.done:
+                # no range support... start over
+                on_bytes(-part.done)
+                part.done = 0
+            try:
+                with self._get_session().get(spec.url, headers=headers, stream=True, timeout=60) as response:
+                    if response.status_code not in (200,206) or (headers.get("Range") and response.status_code!=206):
+                        raise DownloadError(f"Unexpected response while downloading {spec.url}: {response.status_code} {response.reason}")
+                    received = 0
+                    with open(spec.path+".part","r+b") as handle:
+                        handle.seek(part.start+part.done)
+                        for i, chunk in enumerate(response.iter_content(chunk_size=CHUNK_SIZE)):
+                            if self._cancelled.is_set():
+                                raise DownloadError("Download cancelled")
+                            handle.write(chunk)
+                            part.done += len(chunk)
+                            received += len(chunk)
+                            on_bytes(len(chunk))
+                            if spec.supports_ranges and i%_SAVE_STATE_EVERY==_SAVE_STATE_EVERY-1:
+                                handle.flush()
+                                self._save_state(spec, parts)
+                if part.end is None:
+                    # unknown size... the stream has ended
+                    part.end = part.start+part.done-1
+                elif not part.is_complete and (received==0 or not spec.supports_ranges):
+                    raise DownloadError(f"Incomplete download of {spec.path}: {part.done} of {part.length} bytes received")
+            except (requests.exceptions.RequestException, DownloadError) as ex:
+                if spec.supports_ranges:
+                    self._save_state(spec, parts)
+                wait = self.retry_policy.next_delay(attempt) if isinstance(ex, requests.exceptions.RequestException) else None
+                if wait is None:
+                    raise
+                time.sleep(wait)
+                attempt += 1
+        if spec.supports_ranges:
+            self._save_state(spec, parts)
+
+    def _finalize(self, spec:FileSpec):
+        part_path = spec.path+".part"
+        actual_size = os.path.getsize(part_path)
+        if spec.size is not None and actual_size!=spec.size:
+            self._discard(spec)
+            raise DownloadError(f"Size of {spec.path} is {actual_size}, expected {spec.size}")
+        for name in ("sha256","md5"):
+            expected = getattr(spec, name)
+            if expected:
+                digest = hashlib.new(name)
+                with open(part_path,"rb") as handle:
+                    for block in iter(lambda: handle.read(CHUNK_SIZE), b""):
+                        digest.update(block)
+                if digest.hexdigest()!=expected.lower():
+                    self._discard(spec)
+                    raise DownloadError(f"Checksum ({name}) of {spec.path} doesn't match")
+                break
+        os.replace(part_path, spec.path)
+        if os.path.exists(self._state_path(spec)):
+            os.remove(self._state_path(spec))
+
+    def _discard(self, spec:FileSpec):
+        for path in (spec.path+".part", self._state_path(spec)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def download(self, specs:List[FileSpec], desc:str="Downloading")->List[str]:
+        """
+        downloads all files (in parallel) and returns their paths
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from tqdm import tqdm
+
+        self._cancelled.clear()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(self.probe, specs))
+
+                file_parts = {}
+                for spec in specs:
+                    os.makedirs(os.path.dirname(os.path.abspath(spec.path)), exist_ok=True)
+                    parts = self._plan_parts(spec)
+                    part_path = spec.path+".part"
+                    if not any(part.done for part in parts):
+                        with open(part_path,"wb") as handle:
+                            if spec.size:
+                                handle.truncate(spec.size)
+                    file_parts[spec.path] = parts
+
+                sizes = [spec.size for spec in specs]
+                total = sum(sizes) if all(size is not None for size in sizes) else None
+                initial = sum(part.done for parts in file_parts.values() for part in parts)
+                with tqdm(total=total, initial=initial, unit="B", unit_scale=True, unit_divisor=1024, desc=desc, disable=not self.progress) as progress_bar:
+                    lock = threading.Lock()
+                    def on_bytes(count:int):
+                        with lock:
+                            progress_bar.update(count)
+
+                    remaining = {spec.path:sum(1 for part in file_parts[spec.path] if not part.is_complete) for spec in specs}
+                    futures = {executor.submit(self._download_part, part, file_parts[spec.path], on_bytes):spec
+                                for spec in specs for part in file_parts[spec.path] if not part.is_complete}
+                    for spec in specs:
+                        if not remaining[spec.path]:
+                            self._complete(spec)
+                    try:
+                        for future in as_completed(futures):
+                            future.result()
+                            spec = futures[future]
+                            remaining[spec.path]-=1
+                            if not remaining[spec.path]:
+                                self._complete(spec)
+                    finally:
+                        # stop the parts still running if anything failed
+                        self._cancelled.set()
+                        for future in futures:
+                            future.cancel()
+        finally:
+            self.close()
+        return [spec.path for spec in specs]
+
+    def stream_extract(self, spec:FileSpec, target_dir:str, desc:str=None)->List[str]:
+        """
+        downloads zip archive and extracts its entries while it streams in (the archive itself is not stored)...
+        raises StreamingUnzipUnsupported if the archive can't be extracted from the stream, returns extracted paths
+
+        Entries are extracted into a staging directory next to target_dir and moved into it only after the checksum matches,
+        so a failed (or unsupported) archive leaves nothing behind.
+        """
+        import shutil
+        import tempfile
+        from tqdm import tqdm
+        from labelatorio._unzip import StreamingUnzipper
+
+        target_dir = os.path.abspath(target_dir)
+        os.makedirs(target_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(target_dir)}-", dir=os.path.dirname(target_dir))
+        unzipper = StreamingUnzipper(staging_dir)
+        try:
+            try:
+                with self._get_session().get(spec.url, stream=True, timeout=60) as response:
+                    if response.status_code!=200:
+                        raise DownloadError(f"Unable to download {spec.url}: {response.status_code} {response.reason}")
+                    total = int(response.headers["Content-Length"]) if response.headers.get("Content-Length") else spec.size
+                    digest = hashlib.new("sha256" if spec.sha256 else "md5") if (spec.sha256 or spec.md5) else None
+                    with tqdm(total=total, unit="B", unit_scale=True, unit_divisor=1024, desc=desc, disable=not self.progress) as progress_bar:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if digest is not None:
+                                digest.update(chunk)
+                            unzipper.feed(chunk)
+                            progress_bar.update(len(chunk))
+                    unzipper.close()
+            finally:
+                unzipper.abort()
+                self.close()
+            if digest is not None and digest.hexdigest()!=(spec.sha256 or spec.md5).lower():
+                raise DownloadError(f"Checksum of {spec.url} doesn't match")
+
+            extracted=[]
+            for directory, _, names in os.walk(staging_dir):
+                target = os.path.join(target_dir, os.path.relpath(directory, staging_dir))
+                os.makedirs(target, exist_ok=True)
+                for name in names:
+                    os.replace(os.path.join(directory, name), os.path.join(target, name))
+            for path in unzipper.extracted:
+                extracted.append(os.path.join(target_dir, os.path.relpath(path, staging_dir)))
+            return extracted
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _complete(self, spec:FileSpec):
+        self._finalize(spec)
+        if self.on_file_complete is not None:
+            self.on_file_complete(spec)
@@ -7,3 +7,119 @@ def batchify(iterable, chunk_size):
     l = len(iterable)
     for ndx in range(0, l, chunk_size):
         yield iterable[ndx:min(ndx + chunk_size, l)]
+
+
+def background_iter(iterable, buffer_size:int=2):
+    """
+    iterates over the iterable in a background thread, keeping up to buffer_size items ready ahead of the consumer...
+
+    Exceptions raised by the iterable are re-raised in the consuming thread. Closing the generator stops the background thread.
+    """
+    import threading
+    import queue
+
+    buffer = queue.Queue(maxsize=max(buffer_size,1))
+    stopped = threading.Event()
+    _DONE = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as ex:
+            put((_DONE, ex))
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def run_concurrently(func, items:list, max_workers:int=4, progress_desc:str=None, unit:str="batch", return_exceptions:bool=False)->list:
+    """
+    calls func on every item using a thread pool and returns results in the same order as items...
+
+    If return_exceptions is set, exceptions are returned in place of results instead of being raised (like asyncio.gather)
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from tqdm import tqdm
+
+    results = [None]*len(items)
+    with ThreadPoolExecutor(max_workers=max(1,min(max_workers,len(items) or 1))) as executor:
+        futures = {executor.submit(func, item):i for i, item in enumerate(items)}
+        try:
+            for future in tqdm(as_completed(futures), total=len(futures), desc=progress_desc, unit=unit, delay=2, disable=progress_desc is None):
+                error = future.exception()
+                if error is not None and not return_exceptions:
+                    raise error
+                results[futures[future]] = error if error is not None else future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    return results
+
+
+def iter_pages(fetch_page, page_size:int, max_workers:int=4):
+    """
+    yields pages of offset paged endpoint in order, fetching up to max_workers pages ahead concurrently...
+
+    fetch_page(skip, take) returns list of items. Paging stops at an empty page or a page shorter than the largest one seen so far.
+    A short page may just mean the server caps take, so page_size is lowered to it and the pages prefetched with the old offsets are refetched.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from collections import deque
+
+    max_workers = max(max_workers,1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        next_skip = 0
+        def submit_next():
+            nonlocal next_skip
+            pending.append((next_skip, executor.submit(fetch_page, next_skip, page_size)))
+            next_skip += page_size
+
+        for _ in range(max_workers):
+            submit_next()
+        largest_page = 0
+        try:
+            while pending:
+                skip, future = pending.popleft()
+                page = future.result()
+                if not page:
+                    return
+                yield page
+                if len(page)<largest_page:
+                    return
+                largest_page = len(page)
+                if len(page)<page_size:
+                    page_size = len(page)
+                    for _, future in pending:
+                        future.cancel()
+                    pending.clear()
+                    next_skip = skip+len(page)
+                    submit_next()
+                else:
+                    while len(pending)<max_workers:
+                        submit_next()
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,405 @@
+"""
+Instrumentation of API and serving node calls.
+
+Every call made by Client._call_endpoint or NodeClient is recorded as a CallRecord: endpoint template (ids replaced by
+placeholders, i.e. projects/{project_id}/doc/search), status code, attempts (1 + retries), request and response bytes on the wire,
+network time and decode time (JSON parsing and dataclass / model construction). Metrics aggregates records into per-endpoint
+histograms and counters, which can be read by stats() or rendered in Prometheus text format, and passes each record to exporters
+(any callable, i.e. OpenTelemetryExporter). Clients without metrics skip all of this.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger=logging.getLogger(__name__)
+
+LATENCY_BUCKETS=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DECODE_BUCKETS=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+# segments following these are ids, unless they are one of the fixed path words
+_ID_AFTER={
+    "projects":"{project_id}",
+    "tasks":"{task_id}",
+    "doc":"{doc_id}",
+    "models":"{model}",
+    "info":"{model}",
+    "topic":"{topic_id}",
+    "links":"{link_type}",
+    "nodes":"{node_name}",
+    "nodes-settings":"{node_name}",
+}
+_FIXED_SEGMENTS=frozenset((
+    "search","tasks","count","status","labels","query","delete-by-query","excluded","export-vectors","all","similar",
+    "doc","models","download-urls","train","info","topic","regenerate","stats","start","stop",
+))
+
+
+@lru_cache(maxsize=4096)
+def endpoint_template(path:str)->str:
+    """
+    path with ids replaced by placeholders, i.e. /projects/1234/doc/search -> projects/{project_id}/doc/search
+    """
+    segments = path.split("?",1)[0].strip("/").split("/")
+    for i in range(1, len(segments)):
+        if segments[i-1]=="info" and len(segments)-i==2:
+            # model name in {project_name}/{model_name} form
+            segments[i:]=["{project}","{model}"]
+            break
+        placeholder = _ID_AFTER.get(segments[i-1])
+        if placeholder is not None and segments[i] not in _FIXED_SEGMENTS:
+            segments[i]=placeholder
+    return "/".join(segments)
+
+
+class Histogram:
+    """
+    Cumulative bucket histogram (Prometheus style)... quantiles are interpolated within buckets
+    """
+    def __init__(self, buckets:Sequence[float]) -> None:
+        self.buckets=tuple(buckets)
+        self.counts=[0]*(len(self.buckets)+1)
+        self.count=0
+        self.sum=0.0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(self.buckets, value)]+=1
+        self.count+=1
+        self.sum+=value
+
+    def quantile(self, q:float)->Optional[float]:
+        if not self.count:
+            return None
+        rank = q*self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative+count>=rank:
+                lower = self.buckets[i-1] if i>0 else 0.0
+                upper = self.buckets[i] if i<len(self.buckets) else self.buckets[-1]
+                return lower+(upper-lower)*(rank-cumulative)/count
+            cumulative+=count
+        return self.buckets[-1]
+
+    def stats(self)->dict:
+        return {
+            "count":self.count,
+            "mean":self.sum/self.count if self.count else None,
+            "p50":self.quantile(0.5),
+            "p95":self.quantile(0.95),
+            "p99":self.quantile(0.99),
+        }
+
+
+_thread_state=threading.local()
+
+
+def thread_connect_time()->float:
+    """seconds spent by opening connections in this thread (counted only while connection timing is installed, see _profile)"""
+    return getattr(_thread_state, "connect_time", 0.0)
+
+
+class CallRecord:
+    """
+    One API / node call... created by Metrics.start, completed by received() and finish()
+
+    Network time is split into attempts (connect, waiting for the first byte, downloading the body) and waiting
+    (throttling, backoff between retries), decode time into JSON parsing and model construction.
+    """
+    __slots__=("metrics","service","method","endpoint","thread_id","start_ns","_start","_decode_start","network_time","decode_time","parse_time",
+        "connect_time","ttfb","download_time","status_code","attempts","request_bytes","response_bytes","error")
+
+    def __init__(self, metrics:"Metrics", service:str, method:str, endpoint:str) -> None:
+        self.metrics=metrics
+        self.service=service
+        self.method=method
+        self.endpoint=endpoint
+        self.thread_id=threading.get_ident()
+        self.start_ns=time.time_ns()
+        self._start=time.perf_counter()
+        self._decode_start:Optional[float]=None
+        self.network_time:Optional[float]=None
+        self.decode_time=0.0
+        self.parse_time:Optional[float]=None
+        self.connect_time=0.0
+        self.ttfb=0.0
+        self.download_time=0.0
+        self.status_code:Optional[int]=None
+        self.attempts=0
+        self.request_bytes=0
+        self.response_bytes=0
+        self.error:Optional[BaseException]=None
+
+    @property
+    def retries(self)->int:
+        return max(0, self.attempts-1)
+
+    @property
+    def duration(self)->float:
+        return (self.network_time or 0.0)+self.decode_time
+
+    @property
+    def wait_time(self)->float:
+        """network time outside of attempts... throttling and backoff before retries"""
+        return max(0.0, (self.network_time or 0.0)-self.connect_time-self.ttfb-self.download_time)
+
+    @property
+    def model_time(self)->float:
+        """decode time after JSON parsing... dataclass / model construction"""
+        return max(0.0, self.decode_time-(self.parse_time if self.parse_time is not None else self.decode_time))
+
+    def attempt(self, send:Callable[[],object], body:Optional[bytes]):
+        """
+        runs one attempt to send the request (called for each retry) and splits its time by response.elapsed
+        (time until headers were received) into connect, first byte and download
+        """
+        connect_before=thread_connect_time()
+        start=time.perf_counter()
+        try:
+            response=send()
+        except BaseException:
+            self.add_attempt(body, thread_connect_time()-connect_before, time.perf_counter()-start, 0.0)
+            raise
+        total=time.perf_counter()-start
+        connect=thread_connect_time()-connect_before
+        elapsed=getattr(response, "elapsed", None)
+        headers=min(total, elapsed.total_seconds()) if elapsed is not None else total
+        self.add_attempt(body, connect, max(0.0, headers-connect), total-headers)
+        return response
+
+    def add_attempt(self, body:Optional[bytes], connect:float, ttfb:float, download:float):
+        self.attempts+=1
+        if body:
+            self.request_bytes+=len(body)
+        self.connect_time+=connect
+        self.ttfb+=ttfb
+        self.download_time+=download
+
+    def received(self, response):
+        """response with its body read... ends the network part of the call"""
+        self.network_time=time.perf_counter()-self._start
+        self.status_code=getattr(response, "status_code", None)
+        self.response_bytes=_wire_size(response)
+
+    @contextmanager
+    def decoding(self):
+        """times decoding of the response, the record is finished on exit"""
+        self._decode_start=time.perf_counter()
+        try:
+            yield self
+        except BaseException as ex:
+            self.error=ex
+            raise
+        finally:
+            self.decode_time=time.perf_counter()-self._decode_start
+            self.finish()
+
+    def parsed(self):
+        """marks the end of JSON parsing while decoding"""
+        if self._decode_start is not None:
+            self.parse_time=time.perf_counter()-self._decode_start
+
+    def failed(self, error:BaseException):
+        """the call raised before a response was received"""
+        self.network_time=time.perf_counter()-self._start
+        self.error=error
+        self.finish()
+
+    def finish(self):
+        if self.network_time is None:
+            self.network_time=time.perf_counter()-self._start
+        self.metrics.record(self)
+
+    def to_dict(self)->dict:
+        return {
+            "service":self.service,
+            "method":self.method,
+            "endpoint":self.endpoint,
+            "status_code":self.status_code,
+            "network_time":self.network_time,
+            "wait_time":self.wait_time,
+            "connect_time":self.connect_time,
+            "ttfb":self.ttfb,
+            "download_time":self.download_time,
+            "decode_time":self.decode_time,
+            "parse_time":self.parse_time,
+            "model_time":self.model_time,
+            "attempts":self.attempts,
+            "request_bytes":self.request_bytes,
+            "response_bytes":self.response_bytes,
+            "error":repr(self.error) if self.error is not None else None,
+        }
+
+
+def _wire_size(response)->int:
+    raw = getattr(response, "raw", None)
+    received = raw.tell() if raw is not None and hasattr(raw, "tell") else None
+    return received or len(getattr(response, "content", None) or b"")
+
+
+class _EndpointMetrics:
+    __slots__=("latency","decode","status_codes","calls","errors","retries","request_bytes","response_bytes")
+
+    def __init__(self) -> None:
+        self.latency=Histogram(LATENCY_BUCKETS)
+        self.decode=Histogram(DECODE_BUCKETS)
+        self.status_codes:Dict[int,int]={}
+        self.calls=0
+        self.errors=0
+        self.retries=0
+        self.request_bytes=0
+        self.response_bytes=0
+
+
+class Metrics:
+    """
+    Collects per-endpoint metrics of calls... can be shared by Client and NodeClients
+
+    Args:
+        exporters (Iterable[Callable[[CallRecord],None]], optional): called with each finished call, i.e. OpenTelemetryExporter()
+            or a callback. Exceptions of exporters are logged and ignored.
+    """
+
+    def __init__(self, exporters:Optional[Iterable[Callable[[CallRecord],None]]]=None) -> None:
+        self.exporters:List[Callable[[CallRecord],None]]=list(exporters or [])
+        self._lock=threading.Lock()
+        self._endpoints:Dict[Tuple[str,str,str],_EndpointMetrics]={}
+
+    def add_exporter(self, exporter:Callable[[CallRecord],None]):
+        self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter:Callable[[CallRecord],None]):
+        self.exporters.remove(exporter)
+
+    def start(self, service:str, method:str, path:str)->CallRecord:
+        return CallRecord(self, service, method, endpoint_template(path))
+
+    def record(self, call:CallRecord):
+        key=(call.service, call.method, call.endpoint)
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = _EndpointMetrics()
+            endpoint.calls+=1
+            endpoint.latency.observe(call.network_time or 0.0)
+            endpoint.decode.observe(call.decode_time)
+            if call.status_code is not None:
+                endpoint.status_codes[call.status_code]=endpoint.status_codes.get(call.status_code,0)+1
+            if call.error is not None or (call.status_code or 0)>=400:
+                endpoint.errors+=1
+            endpoint.retries+=call.retries
+            endpoint.request_bytes+=call.request_bytes
+            endpoint.response_bytes+=call.response_bytes
+        for exporter in list(self.exporters):
+            try:
+                exporter(call)
+            except Exception:
+                logger.exception("Metrics exporter failed")
+
+    def reset(self):
+        with self._lock:
+            self._endpoints={}
+
+    def stats(self)->Dict[str,dict]:
+        """
+        metrics per "<service> <method> <endpoint template>"
+        """
+        with self._lock:
+            return {
+                f"{service} {method} {endpoint}":{
+                    "calls":metrics.calls,
+                    "errors":metrics.errors,
+                    "retries":metrics.retries,
+                    "status_codes":dict(metrics.status_codes),
+                    "request_bytes":metrics.request_bytes,
+                    "response_bytes":metrics.response_bytes,
+                    "latency":metrics.latency.stats(),
+                    "decode":metrics.decode.stats(),
+                }
+                for (service, method, endpoint), metrics in sorted(self._endpoints.items())
+            }
+
+    def to_prometheus(self, prefix:str="labelatorio")->str:
+        """
+        metrics in Prometheus text exposition format (i.e. to be served on /metrics)
+        """
+        lines=[]
+        with self._lock:
+            items = sorted(self._endpoints.items())
+            def histogram(name:str, help_text:str, get:Callable[[_EndpointMetrics],Histogram]):
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for key, metrics in items:
+                    hist = get(metrics)
+                    labels = _labels(key)
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative+=count
+                        lines.append(f"{prefix}_{name}_bucket{{{labels},le=\"{bound}\"}} {cumulative}")
+                    lines.append(f"{prefix}_{name}_bucket{{{labels},le=\"+Inf\"}} {hist.count}")
+                    lines.append(f"{prefix}_{name}_sum{{{labels}}} {hist.sum}")
+                    lines.append(f"{prefix}_{name}_count{{{labels}}} {hist.count}")
+            def counter(name:str, help_text:str, get:Callable[[_EndpointMetrics],int]):
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for key, metrics in items:
+                    lines.append(f"{prefix}_{name}{{{_labels(key)}}} {get(metrics)}")
+
+            histogram("request_duration_seconds", "Network time of calls (including retries).", lambda metrics: metrics.latency)
+            histogram("decode_duration_seconds", "Time to decode responses (JSON parsing and model construction).", lambda metrics: metrics.decode)
+            counter("request_bytes_total", "Bytes of request bodies sent.", lambda metrics: metrics.request_bytes)
+            counter("response_bytes_total", "Bytes of response bodies received.", lambda metrics: metrics.response_bytes)
+            counter("retries_total", "Retried attempts of calls.", lambda metrics: metrics.retries)
+            counter("errors_total", "Calls failed by exception or with error status.", lambda metrics: metrics.errors)
+            lines.append(f"# HELP {prefix}_responses_total Responses by status code.")
+            lines.append(f"# TYPE {prefix}_responses_total counter")
+            for key, metrics in items:
+                for status, count in sorted(metrics.status_codes.items()):
+                    lines.append(f"{prefix}_responses_total{{{_labels(key)},status=\"{status}\"}} {count}")
+        return "\n".join(lines)+"\n"
+
+
+def _labels(key:Tuple[str,str,str])->str:
+    service, method, endpoint = key
+    return f"service=\"{service}\",method=\"{method}\",endpoint=\"{endpoint}\""
+
+
+class OpenTelemetryExporter:
+    """
+    Exports calls as OpenTelemetry client spans (requires opentelemetry-api, spans go to the configured tracer provider)
+
+    Args:
+        tracer (opentelemetry.trace.Tracer, optional): Defaults to trace.get_tracer("labelatorio").
+    """
+
+    def __init__(self, tracer=None) -> None:
+        from opentelemetry import trace
+        self._trace=trace
+        self.tracer=tracer or trace.get_tracer("labelatorio")
+
+    def __call__(self, call:CallRecord):
+        trace=self._trace
+        span = self.tracer.start_span(
+            f"{call.method} {call.endpoint}",
+            kind=trace.SpanKind.CLIENT,
+            start_time=call.start_ns,
+            attributes={
+                "http.request.method":call.method,
+                "url.template":call.endpoint,
+                "labelatorio.service":call.service,
+                "labelatorio.attempts":call.attempts,
+                "labelatorio.request_bytes":call.request_bytes,
+                "labelatorio.response_bytes":call.response_bytes,
+                "labelatorio.network_time":call.network_time or 0.0,
+                "labelatorio.decode_time":call.decode_time,
+            },
+        )
+        if call.status_code is not None:
+            span.set_attribute("http.response.status_code", call.status_code)
+        if call.error is not None:
+            span.record_exception(call.error)
+        if call.error is not None or (call.status_code or 0)>=400:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end(end_time=call.start_ns+int(call.duration*1e9))
@@ -0,0 +1,234 @@
+"""
+Local cache of downloaded models, shared by processes of one machine.
+
+Models are keyed by model id and its created_at timestamp (a retrained model with the same name gets a new entry).
+Installed files are stored once by their content (blobs/<sha256>) and hard-linked into model directories (models/<key>),
+so files shared by several models (i.e. tokenizer, base weights) take the space only once.
+Models are installed atomically (prepared in tmp/ and renamed), downloads of the same model by concurrent processes are
+serialized by a lock file, and least recently used models are evicted when the cache grows over max_size_bytes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Union
+
+DEFAULT_MAX_SIZE=20*1024**3
+
+_INDEX_FILE="index.json"
+
+
+def default_cache_root()->str:
+    return os.environ.get("LABELATORIO_MODEL_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "labelatorio", "models")
+
+
+class _FileLock:
+    """
+    exclusive inter-process lock on a file (flock / msvcrt)
+    """
+    def __init__(self, path:str) -> None:
+        self.path=path
+        self._handle=None
+
+    def __enter__(self):
+        self._handle=open(self.path, "a+b")
+        if os.name=="nt":
+            import msvcrt
+            self._handle.seek(0)
+            while True:
+                try:
+                    # LK_LOCK retries for ~10s before raising
+                    msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            import fcntl
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        try:
+            if os.name=="nt":
+                import msvcrt
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._handle.close()
+            self._handle=None
+
+
+def _file_sha256(path:str)->str:
+    digest=hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024*1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    Args:
+        root (str, optional): cache directory. Defaults to $LABELATORIO_MODEL_CACHE or ~/.cache/labelatorio/models.
+        max_size_bytes (int, optional): least recently used models are evicted above this size. Defaults to 20GB.
+    """
+
+    def __init__(self, root:Optional[str]=None, max_size_bytes:int=DEFAULT_MAX_SIZE) -> None:
+        self.root=os.path.abspath(root or default_cache_root())
+        self.max_size_bytes=max_size_bytes
+        self.blobs_dir=os.path.join(self.root, "blobs")
+        self.models_dir=os.path.join(self.root, "models")
+        self.tmp_dir=os.path.join(self.root, "tmp")
+        self.locks_dir=os.path.join(self.root, "locks")
+        for directory in (self.blobs_dir, self.models_dir, self.tmp_dir, self.locks_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, model_id:str, created_at:Union[datetime,str,None])->str:
+        created = created_at.isoformat() if isinstance(created_at, datetime) else str(created_at or "")
+        return hashlib.sha256(f"{model_id}|{created}".encode("utf-8")).hexdigest()[:32]
+
+    def _lock(self):
+        return _FileLock(os.path.join(self.root, ".lock"))
+
+    def _read_index(self)->Dict[str,dict]:
+        try:
+            with open(os.path.join(self.root, _INDEX_FILE), "rt") as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index:Dict[str,dict]):
+        tmp_path=os.path.join(self.root, _INDEX_FILE+".tmp")
+        with open(tmp_path, "wt") as index_file:
+            json.dump(index, index_file)
+        os.replace(tmp_path, os.path.join(self.root, _INDEX_FILE))
+
+    def get(self, model_id:str, created_at:Union[datetime,str,None])->Optional[str]:
+        """
+        path of the cached model, or None if it is not in the cache
+        """
+        key=self.key(model_id, created_at)
+        path=os.path.join(self.models_dir, key)
+        if not os.path.isdir(path):
+            return None
+        with self._lock():
+            index=self._read_index()
+            if key in index:
+                index[key]["last_used"]=time.time()
+                self._write_index(index)
+        return path
+
+    def get_or_install(self, model_id:str, created_at:Union[datetime,str,None], populate:Callable[[str],None])->str:
+        """
+        returns path of the cached model, if it is not cached populate(directory) is called to download it first
+        (only one process downloads the same model at a time, the others wait for it and use its result)
+        """
+        path=self.get(model_id, created_at)
+        if path is not None:
+            return path
+        key=self.key(model_id, created_at)
+        with _FileLock(os.path.join(self.locks_dir, key+".lock")):
+            path=self.get(model_id, created_at)
+            if path is not None:
+                return path
+            tmp_dir=tempfile.mkdtemp(prefix=key+"-", dir=self.tmp_dir)
+            try:
+                populate(tmp_dir)
+                return self._install(key, model_id, created_at, tmp_dir)
+            finally:
+                if os.path.exists(tmp_dir):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _install(self, key:str, model_id:str, created_at, tmp_dir:str)->str:
+        # hashing is done before taking the lock, it may take a while for large models
+        files={}
+        for directory, _, names in os.walk(tmp_dir):
+            for name in names:
+                path=os.path.join(directory, name)
+                files[path]=_file_sha256(path)
+        size=sum(os.path.getsize(path) for path in files)
+
+        target=os.path.join(self.models_dir, key)
+        with self._lock():
+            for path, digest in files.items():
+                blob=os.path.join(self.blobs_dir, digest)
+                if os.path.exists(blob):
+                    os.remove(path)
+                else:
+                    os.replace(path, blob)
+                try:
+                    os.link(blob, path)
+                except OSError:
+                    # hard links not supported... keep a copy
+                    shutil.copy2(blob, path)
+            if not os.path.exists(target):
+                os.rename(tmp_dir, target)
+            index=self._read_index()
+            index[key]={"model_id":model_id, "created_at":str(created_at), "size":size, "last_used":time.time(), "blobs":sorted(set(files.values()))}
+            self._write_index(index)
+            self._evict(index, keep=key)
+        return target
+
+    def size(self)->int:
+        """
+        bytes used by the cache (hard linked files are counted once)
+        """
+        seen=set()
+        total=0
+        for top in (self.blobs_dir, self.models_dir):
+            for directory, _, files in os.walk(top):
+                for name in files:
+                    stat=os.stat(os.path.join(directory, name))
+                    if (stat.st_dev, stat.st_ino) not in seen:
+                        seen.add((stat.st_dev, stat.st_ino))
+                        total+=stat.st_size
+        return total
+
+    def _evict(self, index:Dict[str,dict], keep:Optional[str]=None):
+        # called under the lock
+        total=self.size()
+        for key in sorted(index, key=lambda key: index[key].get("last_used",0)):
+            if total<=self.max_size_bytes:
+                break
+            if key==keep:
+                continue
+            shutil.rmtree(os.path.join(self.models_dir, key), ignore_errors=True)
+            del index[key]
+            self._collect_blobs(index)
+            total=self.size()
+        self._write_index(index)
+
+    def _collect_blobs(self, index:Dict[str,dict]):
+        # blobs not referenced by any model... link count can't tell, models fall back to copies without hard links
+        referenced={digest for entry in index.values() for digest in entry.get("blobs", ())}
+        # entries written before blobs were tracked are referenced only by their links
+        legacy=any("blobs" not in entry for entry in index.values())
+        for name in os.listdir(self.blobs_dir):
+            path=os.path.join(self.blobs_dir, name)
+            if name not in referenced and not (legacy and os.stat(path).st_nlink>1):
+                os.remove(path)
+
+    def evict(self, model_id:str, created_at:Union[datetime,str,None]):
+        """
+        removes the model from the cache
+        """
+        key=self.key(model_id, created_at)
+        with self._lock():
+            index=self._read_index()
+            shutil.rmtree(os.path.join(self.models_dir, key), ignore_errors=True)
+            index.pop(key, None)
+            self._collect_blobs(index)
+            self._write_index(index)
+
+    def clear(self):
+        with self._lock():
+            for directory in (self.models_dir, self.blobs_dir):
+                shutil.rmtree(directory, ignore_errors=True)
+                os.makedirs(directory, exist_ok=True)
+            self._write_index({})
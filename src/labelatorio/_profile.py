@@ -0,0 +1,308 @@
+"""
+Profiling of client operations... with client.profile() as p: collects every call made by the client (and the NodeClients
+passed to it) inside the block, with network time split into waiting (throttling, backoff), connect, first byte and download,
+and decode time split into JSON parsing and model construction. Bulk operations (add_documents, export_to_dataframe, get_vectors,
+NodeClient predictions...) are recorded as operations enclosing their calls, so client-side work between calls shows up too.
+
+Connect time is measured by wrapping urllib3 connection setup while a profile is active (async NodeClient calls count it
+in first byte time). Results are in p.calls / p.operations, p.report() and p.save_chrome_trace(path) (chrome://tracing, Perfetto).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from labelatorio._metrics import CallRecord, Metrics, _thread_state
+
+_active_profiles:List["Profile"]=[]
+_active_lock=threading.Lock()
+
+COLUMNS=("calls","errors","retries","total","mean","max","wait","connect","ttfb","download","parse","decode","sent_bytes","received_bytes")
+
+
+class OperationRecord:
+    __slots__=("name","thread_id","start_ns","duration","error")
+
+    def __init__(self, name:str, thread_id:int, start_ns:int, duration:float, error:Optional[BaseException]) -> None:
+        self.name=name
+        self.thread_id=thread_id
+        self.start_ns=start_ns
+        self.duration=duration
+        self.error=error
+
+
+def operation(name:str):
+    """
+    decorator of client methods recorded as operations by active profiles (self.client or self is the profiled client)
+    """
+    def decorator(fn:Callable):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                if not _active_profiles:
+                    return await fn(self, *args, **kwargs)
+                profiles, start_ns, start = _operation_start(self)
+                error = None
+                try:
+                    return await fn(self, *args, **kwargs)
+                except BaseException as ex:
+                    error = ex
+                    raise
+                finally:
+                    _operation_end(profiles, name, start_ns, start, error)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            if not _active_profiles:
+                return fn(self, *args, **kwargs)
+            profiles, start_ns, start = _operation_start(self)
+            error = None
+            try:
+                return fn(self, *args, **kwargs)
+            except BaseException as ex:
+                error = ex
+                raise
+            finally:
+                _operation_end(profiles, name, start_ns, start, error)
+        return wrapper
+    return decorator
+
+
+def _operation_start(owner):
+    client = getattr(owner, "client", owner)
+    with _active_lock:
+        profiles = [profile for profile in _active_profiles if any(profiled is client for profiled in profile.clients)]
+    return profiles, time.time_ns(), time.perf_counter()
+
+
+def _operation_end(profiles:List["Profile"], name:str, start_ns:int, start:float, error:Optional[BaseException]):
+    if profiles:
+        record = OperationRecord(name, threading.get_ident(), start_ns, time.perf_counter()-start, error)
+        for profile in profiles:
+            profile._add_operation(record)
+
+
+_connect_timer_users=0
+_original_connects:Dict[type,Callable]={}
+
+
+def _timed_connect(original:Callable)->Callable:
+    @wraps(original)
+    def connect(self, *args, **kwargs):
+        depth = getattr(_thread_state, "connect_depth", 0)
+        _thread_state.connect_depth = depth+1
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _thread_state.connect_depth = depth
+            if depth==0:
+                _thread_state.connect_time = getattr(_thread_state, "connect_time", 0.0)+time.perf_counter()-start
+    return connect
+
+
+def _install_connect_timer():
+    global _connect_timer_users
+    with _active_lock:
+        _connect_timer_users+=1
+        if _connect_timer_users>1:
+            return
+        import urllib3.connection as connection
+        for cls in (connection.HTTPConnection, connection.HTTPSConnection):
+            original = cls.__dict__.get("connect")
+            if original is not None:
+                _original_connects[cls]=original
+                cls.connect=_timed_connect(original)
+
+
+def _uninstall_connect_timer():
+    global _connect_timer_users
+    with _active_lock:
+        _connect_timer_users-=1
+        if _connect_timer_users>0:
+            return
+        for cls, original in _original_connects.items():
+            cls.connect=original
+        _original_connects.clear()
+
+
+class Profile:
+    """
+    Context manager collecting calls and operations of the clients (Client and NodeClient instances) while it is active
+
+    Args:
+        clients: profiled clients
+        trace_file (str, optional): Chrome trace-event file written on exit. Defaults to None.
+    """
+
+    def __init__(self, *clients, trace_file:Optional[str]=None) -> None:
+        self.clients=clients
+        self.trace_file=trace_file
+        self.calls:List[CallRecord]=[]
+        self.operations:List[OperationRecord]=[]
+        self.start_ns:Optional[int]=None
+        self.duration:Optional[float]=None
+        self._start:Optional[float]=None
+        self._lock=threading.Lock()
+        self._previous_metrics:list=[]
+        self._hooked_metrics:List[Metrics]=[]
+
+    def __enter__(self) -> "Profile":
+        self.start_ns=time.time_ns()
+        self._start=time.perf_counter()
+        self._previous_metrics=[]
+        self._hooked_metrics=[]
+        for client in self.clients:
+            previous = client.metrics
+            self._previous_metrics.append(previous)
+            if previous is None:
+                client.metrics=Metrics(exporters=[self._add_call])
+            elif not any(previous is hooked for hooked in self._hooked_metrics):
+                # clients may share one Metrics instance... every call is exported once
+                previous.add_exporter(self._add_call)
+                self._hooked_metrics.append(previous)
+        _install_connect_timer()
+        with _active_lock:
+            _active_profiles.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        with _active_lock:
+            _active_profiles.remove(self)
+        _uninstall_connect_timer()
+        for client, previous in zip(self.clients, self._previous_metrics):
+            if previous is None:
+                client.metrics=None
+        for metrics in self._hooked_metrics:
+            metrics.remove_exporter(self._add_call)
+        self._hooked_metrics=[]
+        self.duration=time.perf_counter()-self._start
+        if self.trace_file:
+            self.save_chrome_trace(self.trace_file)
+
+    def _add_call(self, call:CallRecord):
+        with self._lock:
+            self.calls.append(call)
+
+    def _add_operation(self, record:OperationRecord):
+        with self._lock:
+            self.operations.append(record)
+
+    def rows(self, sort_by:str="total") -> List[dict]:
+        """
+        calls aggregated per "<service> <method> <endpoint template>" (times in seconds), sorted descending by the column
+        """
+        if sort_by not in COLUMNS and sort_by!="name":
+            raise ValueError(f"Unknown column {sort_by}, available: name, {', '.join(COLUMNS)}")
+        groups:Dict[str,dict]={}
+        with self._lock:
+            calls=list(self.calls)
+        for call in calls:
+            name=f"{call.service} {call.method} {call.endpoint}"
+            row=groups.get(name)
+            if row is None:
+                row=groups[name]={"name":name, **{column:0 for column in COLUMNS}}
+            row["calls"]+=1
+            row["errors"]+= 1 if call.error is not None or (call.status_code or 0)>=400 else 0
+            row["retries"]+=call.retries
+            row["total"]+=call.duration
+            row["max"]=max(row["max"], call.duration)
+            row["wait"]+=call.wait_time
+            row["connect"]+=call.connect_time
+            row["ttfb"]+=call.ttfb
+            row["download"]+=call.download_time
+            row["parse"]+=call.parse_time if call.parse_time is not None else call.decode_time
+            row["decode"]+=call.model_time
+            row["sent_bytes"]+=call.request_bytes
+            row["received_bytes"]+=call.response_bytes
+        for row in groups.values():
+            row["mean"]=row["total"]/row["calls"]
+        return sorted(groups.values(), key=lambda row: row[sort_by], reverse=sort_by!="name")
+
+    def operation_rows(self) -> List[dict]:
+        """operations aggregated by name, slowest first"""
+        groups:Dict[str,dict]={}
+        with self._lock:
+            operations=list(self.operations)
+        for record in operations:
+            row=groups.setdefault(record.name, {"name":record.name, "calls":0, "errors":0, "total":0.0, "max":0.0})
+            row["calls"]+=1
+            row["errors"]+= 1 if record.error is not None else 0
+            row["total"]+=record.duration
+            row["max"]=max(row["max"], record.duration)
+        return sorted(groups.values(), key=lambda row: row["total"], reverse=True)
+
+    def report(self, sort_by:str="total", top:Optional[int]=None) -> str:
+        """
+        text table of rows(sort_by) (times in ms) preceded by operations
+        """
+        lines=[]
+        if self.duration is not None:
+            lines.append(f"Profile: {self.duration*1000:.1f} ms, {len(self.calls)} calls (times in ms)")
+        operations=self.operation_rows()
+        if operations:
+            lines.append("")
+            lines.append(f"{'operation':<40} {'calls':>6} {'errors':>6} {'total ms':>11} {'max ms':>10}")
+            for row in operations:
+                lines.append(f"{row['name']:<40} {row['calls']:>6} {row['errors']:>6} {row['total']*1000:>11.1f} {row['max']*1000:>10.1f}")
+        rows=self.rows(sort_by)[:top]
+        if rows:
+            width=max(40, max(len(row["name"]) for row in rows))
+            lines.append("")
+            lines.append(f"{'call':<{width}} "+" ".join(f"{column:>{_width(column)}}" for column in COLUMNS))
+            for row in rows:
+                values=[]
+                for column in COLUMNS:
+                    value=row[column]
+                    if column in ("calls","errors","retries","sent_bytes","received_bytes"):
+                        values.append(f"{value:>{_width(column)}}")
+                    else:
+                        values.append(f"{value*1000:>{_width(column)}.1f}")
+                lines.append(f"{row['name']:<{width}} "+" ".join(values))
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """
+        trace events of operations and calls (with their phases laid out one after another, as the phases of retried calls interleave)
+        """
+        pid=os.getpid()
+        origin=self.start_ns or 0
+        events=[]
+        def event(name:str, category:str, thread_id:int, start_us:float, duration_us:float, args:Optional[dict]=None):
+            events.append({"name":name, "cat":category, "ph":"X", "pid":pid, "tid":thread_id, "ts":start_us, "dur":duration_us, "args":args or {}})
+
+        with self._lock:
+            operations=list(self.operations)
+            calls=list(self.calls)
+        for record in operations:
+            event(record.name, "operation", record.thread_id, (record.start_ns-origin)/1000, record.duration*1e6,
+                {"error":repr(record.error)} if record.error is not None else None)
+        for call in calls:
+            start=(call.start_ns-origin)/1000
+            event(f"{call.method} {call.endpoint}", call.service, call.thread_id, start, call.duration*1e6, call.to_dict())
+            phases=(
+                ("wait", call.wait_time),
+                ("connect", call.connect_time),
+                ("first byte", call.ttfb),
+                ("download", call.download_time),
+                ("parse", call.parse_time if call.parse_time is not None else call.decode_time),
+                ("decode", call.model_time),
+            )
+            for name, seconds in phases:
+                if seconds>0:
+                    event(name, "phase", call.thread_id, start, seconds*1e6)
+                    start+=seconds*1e6
+        return {"traceEvents":events, "displayTimeUnit":"ms"}
+
+    def save_chrome_trace(self, path:str):
+        """writes chrome_trace() as JSON (open in chrome://tracing or ui.perfetto.dev)"""
+        with open(path, "wt") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+def _width(column:str)->int:
+    return max(len(column), 9)
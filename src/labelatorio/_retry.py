@@ -0,0 +1,205 @@
+"""
+Retry policy of the transport layer.
+
+Failed requests are retried with exponential backoff and full jitter, Retry-After header of 429/503 responses is honoured.
+Whether a request can be retried depends on HTTP method: idempotent methods are retried on connection errors, timeouts and 429/502/503/504,
+other methods (POST, PATCH) only when the server surely didn't process the request (429, 503 or failed connect), unless the call is marked retry_safe.
+Retries are limited by a budget shared by all requests of a client, so a failing API is not flooded by retry storms.
+"""
+import asyncio
+import email.utils
+import random
+import sys
+import threading
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+import requests
+
+IDEMPOTENT_METHODS=frozenset(("GET","HEAD","OPTIONS","PUT","DELETE"))
+
+# responses meaning the request has not been processed... safe to retry with any method
+_NOT_PROCESSED_STATUSES=frozenset((429,503))
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of requests. Each request deposits ratio tokens (up to max_tokens), each retry withdraws one.
+    """
+    def __init__(self, ratio:float=0.2, initial_tokens:float=10, max_tokens:float=100) -> None:
+        self.ratio=ratio
+        self.max_tokens=max_tokens
+        self._tokens=float(initial_tokens)
+        self._lock=threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens=min(self.max_tokens, self._tokens+self.ratio)
+
+    def withdraw(self)->bool:
+        with self._lock:
+            if self._tokens>=1:
+                self._tokens-=1
+                return True
+            return False
+
+    @property
+    def tokens(self)->float:
+        return self._tokens
+
+
+class RetryPolicy:
+    """
+    Args:
+        max_retries (int, optional): max retries of a single request. Defaults to 3.
+        backoff_base (float, optional): base delay in seconds, doubled with each attempt. Defaults to 0.5.
+        backoff_max (float, optional): max delay of exponential backoff in seconds. Defaults to 30.
+        retry_statuses (Iterable[int], optional): status codes to retry. Defaults to 429, 502, 503, 504.
+        max_retry_after (float, optional): if server asks to wait longer than this (Retry-After), the response is returned without retry. Defaults to 120.
+        budget (RetryBudget, optional): shared retry budget. Defaults to RetryBudget().
+    """
+
+    def __init__(self,
+            max_retries:int=3,
+            backoff_base:float=0.5,
+            backoff_max:float=30,
+            retry_statuses:Iterable[int]=(429,502,503,504),
+            max_retry_after:float=120,
+            budget:Optional[RetryBudget]=None
+        ) -> None:
+        self.max_retries=max_retries
+        self.backoff_base=backoff_base
+        self.backoff_max=backoff_max
+        self.retry_statuses=frozenset(retry_statuses)
+        self.max_retry_after=max_retry_after
+        self.budget=budget or RetryBudget()
+        self._lock=threading.Lock()
+        self.retries=0
+        self.budget_exhausted=0
+
+    def is_retryable(self, method:str, status_code:Optional[int]=None, exception:Optional[BaseException]=None, retry_safe:Optional[bool]=None)->bool:
+        """
+        whether the request can be repeated... method is idempotent (or call is marked retry_safe), or server surely didn't process it
+        """
+        idempotent = retry_safe if retry_safe is not None else method.upper() in IDEMPOTENT_METHODS
+        if exception is not None:
+            if isinstance(exception, requests.exceptions.ConnectTimeout):
+                return True
+            return idempotent and _is_transient_error(exception)
+        if status_code not in self.retry_statuses:
+            return False
+        return idempotent or status_code in _NOT_PROCESSED_STATUSES
+
+    def backoff(self, attempt:int)->float:
+        """full jitter exponential backoff delay for n-th retry (0 based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base*(2**attempt)))
+
+    def delay(self, attempt:int, status_code:Optional[int]=None, headers=None)->Optional[float]:
+        """
+        returns seconds to wait before the retry, or None if the request should not be retried
+        """
+        if attempt>=self.max_retries:
+            return None
+        if status_code in _NOT_PROCESSED_STATUSES and headers is not None:
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after>self.max_retry_after:
+                    return None
+                # small jitter, so the clients throttled together don't come back at the same moment
+                return retry_after+random.uniform(0, self.backoff_base)
+        return self.backoff(attempt)
+
+    def next_delay(self, attempt:int, status_code:Optional[int]=None, headers=None)->Optional[float]:
+        """
+        delay before the next retry, or None if retries of the request (or the shared retry budget) are exhausted
+        """
+        wait = self.delay(attempt, status_code, headers)
+        if wait is None or not self._take_retry():
+            return None
+        return wait
+
+    def _take_retry(self)->bool:
+        if not self.budget.withdraw():
+            with self._lock:
+                self.budget_exhausted+=1
+            return False
+        with self._lock:
+            self.retries+=1
+        return True
+
+    def call(self, method:str, send:Callable[[],"requests.Response"], retry_safe:Optional[bool]=None):
+        """
+        calls send() and repeats it while the result is retryable
+        """
+        self.budget.deposit()
+        attempt=0
+        while True:
+            try:
+                response = send()
+            except Exception as ex:
+                if not self.is_retryable(method, exception=ex, retry_safe=retry_safe):
+                    raise
+                wait = self.next_delay(attempt)
+                if wait is None:
+                    raise
+            else:
+                if not self.is_retryable(method, response.status_code, retry_safe=retry_safe):
+                    return response
+                wait = self.next_delay(attempt, response.status_code, response.headers)
+                if wait is None:
+                    return response
+            time.sleep(wait)
+            attempt+=1
+
+    async def acall(self, method:str, send:Callable[[],Awaitable], retry_safe:Optional[bool]=None):
+        """
+        async variant of call... send is coroutine function returning object with status_code and headers
+        """
+        self.budget.deposit()
+        attempt=0
+        while True:
+            try:
+                response = await send()
+            except Exception as ex:
+                if not self.is_retryable(method, exception=ex, retry_safe=retry_safe):
+                    raise
+                wait = self.next_delay(attempt)
+                if wait is None:
+                    raise
+            else:
+                if not self.is_retryable(method, response.status_code, retry_safe=retry_safe):
+                    return response
+                wait = self.next_delay(attempt, response.status_code, response.headers)
+                if wait is None:
+                    return response
+            await asyncio.sleep(wait)
+            attempt+=1
+
+    def stats(self)->dict:
+        return {"retries":self.retries, "budget_exhausted":self.budget_exhausted, "budget_tokens":self.budget.tokens}
+
+
+NO_RETRY=RetryPolicy(max_retries=0)
+
+
+def _is_transient_error(exception:BaseException)->bool:
+    if isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    aiohttp = sys.modules.get("aiohttp")
+    return aiohttp is not None and isinstance(exception, aiohttp.ClientConnectionError)
+
+
+def parse_retry_after(value:Optional[str])->Optional[float]:
+    """
+    Retry-After header value in seconds (delta-seconds or HTTP date)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp()-time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def request_key(method:str, url:str, query_params:Optional[dict], headers:Optional[dict]) -> tuple:
+    """
+    identity of the request... requests with the same key are considered identical
+    """
+    params = tuple(sorted((k, str(v)) for k, v in query_params.items() if v is not None)) if query_params else ()
+    return (method, url, params, tuple(sorted(headers.items())) if headers else ())
+
+
+class _Call:
+    __slots__=("event","result","error")
+
+    def __init__(self) -> None:
+        self.event=threading.Event()
+        self.result=None
+        self.error=None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls... while one call for the key is in flight, other callers with the same key
+    wait for it and get the same result (or exception) instead of doing the call again.
+    """
+
+    def __init__(self) -> None:
+        self._lock=threading.Lock()
+        self._calls:Dict[Hashable,_Call]={}
+        self.calls=0
+        self.collapsed=0
+
+    def do(self, key:Hashable, func:Callable[[],Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.collapsed+=1
+                is_leader=False
+            else:
+                call = _Call()
+                self._calls[key]=call
+                self.calls+=1
+                is_leader=True
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> dict:
+        return {"calls":self.calls, "collapsed":self.collapsed}
+
+
+class _AsyncCall:
+    __slots__=("task","waiters")
+
+    def __init__(self, task:"asyncio.Future") -> None:
+        self.task=task
+        self.waiters=0
+
+
+class AsyncSingleFlight:
+    """
+    asyncio variant of SingleFlight... calls are coalesced only within the same event loop
+
+    The call runs as its own task, so a cancelled caller (even the one that started it) doesn't cancel the others...
+    the task is cancelled only when all its callers are.
+    """
+
+    def __init__(self) -> None:
+        self._calls:Dict[Hashable,_AsyncCall]={}
+        self.calls=0
+        self.collapsed=0
+
+    async def do(self, key:Hashable, coro_factory:Callable[[],Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        call = self._calls.get(loop_key)
+        if call is not None and not call.task.done():
+            self.collapsed+=1
+        else:
+            call = _AsyncCall(asyncio.ensure_future(coro_factory()))
+            self._calls[loop_key]=call
+            self.calls+=1
+            def forget(_, call=call):
+                if self._calls.get(loop_key) is call:
+                    del self._calls[loop_key]
+            call.task.add_done_callback(forget)
+
+        call.waiters+=1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters==1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters-=1
+
+    def stats(self) -> dict:
+        return {"calls":self.calls, "collapsed":self.collapsed}
@@ -0,0 +1,350 @@
+"""
+Waiting for many long running tasks (training, predictions, embeddings, topic regeneration) at once.
+
+Instead of polling each task by get_task_status, statuses of all waited tasks of a project are refreshed by one
+tasks.get_latest(project_id) call per polling cycle (tasks missing in that list are fetched one by one).
+Polling is adaptive... the interval is derived from progress_current/progress_total and duration_sec of the task
+closest to completion, so a task that is about to finish is picked up soon, while long tasks are polled rarely.
+TaskWatcher does the same from a background thread for all tasks registered with it, publishing events and futures.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import labelatorio.enums as enums
+
+if TYPE_CHECKING:
+    from labelatorio.client import TaskStatusHandle
+    from labelatorio.data_model import TaskStatus
+
+logger=logging.getLogger(__name__)
+
+MIN_POLLING_INTERVAL=1.0
+MAX_POLLING_INTERVAL=15.0
+
+ALL_COMPLETED="ALL_COMPLETED"
+FIRST_COMPLETED="FIRST_COMPLETED"
+FIRST_EXCEPTION="FIRST_EXCEPTION"
+
+
+def next_poll_interval(status:Optional["TaskStatus"], min_interval:float=MIN_POLLING_INTERVAL, max_interval:float=MAX_POLLING_INTERVAL)->float:
+    """
+    seconds until the next poll of the task... half of the estimated remaining time, within [min_interval, max_interval]
+    (max_interval if the progress is unknown)
+    """
+    if status is None or enums.TaskStatusStates.is_done(status.state):
+        return min_interval
+    current, total, duration = status.progress_current, status.progress_total, status.duration_sec
+    if not total or not current:
+        return max_interval
+    if not duration:
+        # progressing within the first second... short task
+        return min_interval
+    remaining = (total-current)*duration/current
+    return min(max_interval, max(min_interval, remaining/2))
+
+
+def _is_done(handle:"TaskStatusHandle")->bool:
+    return handle.current_status is not None and handle.is_finished()
+
+
+def refresh_all(handles:Iterable["TaskStatusHandle"], errors:Optional[Dict["TaskStatusHandle",Exception]]=None) -> List["TaskStatusHandle"]:
+    """
+    refreshes status of all unfinished handles, with one get_latest call per client and project
+
+    Args:
+        handles (Iterable[TaskStatusHandle]): tasks to refresh
+        errors (Dict[TaskStatusHandle,Exception], optional): if set, errors of single task refreshes are collected here instead of raised,
+            so one broken task (i.e. deleted) doesn't stop refreshing the others
+
+    Returns:
+        List[TaskStatusHandle]: handles that were refreshed
+    """
+    def refresh(handle:"TaskStatusHandle")->bool:
+        try:
+            handle.refresh_status()
+            return True
+        except Exception as ex:
+            if errors is None:
+                raise
+            errors[handle]=ex
+            return False
+
+    groups:Dict[Tuple[int,Optional[str]],List["TaskStatusHandle"]]={}
+    for handle in handles:
+        if _is_done(handle):
+            continue
+        project_id = handle.current_status.project_id if handle.current_status is not None else None
+        groups.setdefault((id(handle.client), project_id), []).append(handle)
+
+    refreshed=[]
+    for (_, project_id), group in groups.items():
+        if len(group)==1:
+            # single task... its own status is cheaper than the list
+            if refresh(group[0]):
+                refreshed.append(group[0])
+            continue
+        latest = {status.task_id:status for status in (group[0].client.tasks.get_latest(project_id) or [])}
+        for handle in group:
+            status = latest.get(handle.task_id)
+            if status is not None:
+                handle._set_status(status)
+            elif not refresh(handle):
+                # older than the latest tasks of the project... and its own status failed too
+                continue
+            refreshed.append(handle)
+    return refreshed
+
+
+def _poll_interval(handles:Iterable["TaskStatusHandle"], min_interval:float, max_interval:float)->float:
+    return min((next_poll_interval(handle.current_status, min_interval, max_interval) for handle in handles if not _is_done(handle)), default=min_interval)
+
+
+def as_completed(handles:Iterable["TaskStatusHandle"], timeout_sec:Optional[float]=None,
+        min_interval:float=MIN_POLLING_INTERVAL, max_interval:float=MAX_POLLING_INTERVAL) -> Iterator["TaskStatusHandle"]:
+    """
+    yields handles as their tasks finish (in any final state: FINISHED, ERROR, TIMEOUT, STOPPED)
+
+    Args:
+        handles (Iterable[TaskStatusHandle]): tasks to wait for
+        timeout_sec (float, optional): raises TimeoutError if all tasks don't finish in time. Defaults to None (no timeout).
+        min_interval (float, optional): shortest polling interval in seconds. Defaults to 1.
+        max_interval (float, optional): longest polling interval in seconds. Defaults to 15.
+    """
+    pending=list(dict.fromkeys(handles))
+    deadline = time.monotonic()+timeout_sec if timeout_sec is not None else None
+    while pending:
+        refresh_all(pending)
+        still_pending=[]
+        for handle in pending:
+            if _is_done(handle):
+                yield handle
+            else:
+                still_pending.append(handle)
+        pending=still_pending
+        if not pending:
+            break
+        wait = _poll_interval(pending, min_interval, max_interval)
+        if deadline is not None:
+            if time.monotonic()>=deadline:
+                raise TimeoutError(f"{len(pending)} tasks didn't finish in {timeout_sec}s")
+            wait = min(wait, max(0, deadline-time.monotonic()))
+        time.sleep(wait)
+
+
+def wait_all(handles:Iterable["TaskStatusHandle"], timeout_sec:Optional[float]=None, return_when:str=ALL_COMPLETED,
+        min_interval:float=MIN_POLLING_INTERVAL, max_interval:float=MAX_POLLING_INTERVAL,
+        on_done:Optional[Callable[["TaskStatusHandle"],None]]=None) -> Tuple[List["TaskStatusHandle"],List["TaskStatusHandle"]]:
+    """
+    waits for tasks... like concurrent.futures.wait
+
+    Args:
+        handles (Iterable[TaskStatusHandle]): tasks to wait for
+        timeout_sec (float, optional): max time to wait, unfinished tasks are returned as not done. Defaults to None (no timeout).
+        return_when (str, optional): ALL_COMPLETED, FIRST_COMPLETED or FIRST_EXCEPTION (first task that ended in other state than FINISHED). Defaults to ALL_COMPLETED.
+        min_interval (float, optional): shortest polling interval in seconds. Defaults to 1.
+        max_interval (float, optional): longest polling interval in seconds. Defaults to 15.
+        on_done (Callable[[TaskStatusHandle],None], optional): called with each handle once its task finishes
+
+    Returns:
+        Tuple[List[TaskStatusHandle],List[TaskStatusHandle]]: done and not done handles
+    """
+    if return_when not in (ALL_COMPLETED, FIRST_COMPLETED, FIRST_EXCEPTION):
+        raise ValueError(f"Invalid return_when value: {return_when}")
+    handles=list(dict.fromkeys(handles))
+    done=[]
+    try:
+        for handle in as_completed(handles, timeout_sec, min_interval, max_interval):
+            done.append(handle)
+            if on_done is not None:
+                on_done(handle)
+            if return_when==FIRST_COMPLETED:
+                break
+            if return_when==FIRST_EXCEPTION and handle.current_status.state!=enums.TaskStatusStates.FINISHED:
+                break
+    except TimeoutError:
+        pass
+    return done, [handle for handle in handles if handle not in done]
+
+
+async def async_wait_all(handles:Iterable["TaskStatusHandle"], timeout_sec:Optional[float]=None,
+        min_interval:float=MIN_POLLING_INTERVAL, max_interval:float=MAX_POLLING_INTERVAL) -> List["TaskStatusHandle"]:
+    """
+    async variant of wait_all(ALL_COMPLETED)... polling requests run in the default executor, raises asyncio.TimeoutError on timeout
+    """
+    pending=list(dict.fromkeys(handles))
+    result=list(pending)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()+timeout_sec if timeout_sec is not None else None
+    while True:
+        await loop.run_in_executor(None, refresh_all, pending)
+        pending=[handle for handle in pending if not _is_done(handle)]
+        if not pending:
+            return result
+        wait = _poll_interval(pending, min_interval, max_interval)
+        if deadline is not None:
+            if loop.time()>=deadline:
+                raise asyncio.TimeoutError(f"{len(pending)} tasks didn't finish in {timeout_sec}s")
+            wait = min(wait, max(0, deadline-loop.time()))
+        await asyncio.sleep(wait)
+
+
+STATE_CHANGED="state_changed"
+PROGRESS="progress"
+DONE="done"
+
+
+class TaskEvent(NamedTuple):
+    kind:str
+    """STATE_CHANGED, PROGRESS or DONE"""
+    handle:"TaskStatusHandle"
+    previous_status:Optional["TaskStatus"]
+
+
+class TaskWatcher:
+    """
+    Monitors registered tasks from one background thread, sharing one polling schedule (and one get_latest call per project and cycle)
+    across all of them. State changes and progress are published as TaskEvents to listeners, completion also by futures.
+
+    Args:
+        min_interval (float, optional): shortest polling interval in seconds. Defaults to 5.
+        max_interval (float, optional): longest polling interval in seconds. Defaults to 60.
+    """
+
+    def __init__(self, min_interval:float=5, max_interval:float=60) -> None:
+        self.min_interval=min_interval
+        self.max_interval=max_interval
+        self._lock=threading.Lock()
+        self._watched:Dict["TaskStatusHandle","Future"]={}
+        self._listeners:List[Callable[[TaskEvent],None]]=[]
+        self._task_listeners:Dict["TaskStatusHandle",List[Callable[[TaskEvent],None]]]={}
+        self._wakeup=threading.Event()
+        self._stopped=False
+        self._thread:Optional[threading.Thread]=None
+        self.polls=0
+        self.errors=0
+
+    def watch(self, handle:"TaskStatusHandle", listener:Optional[Callable[[TaskEvent],None]]=None) -> "Future":
+        """
+        starts watching the task
+
+        Args:
+            handle (TaskStatusHandle): task to watch
+            listener (Callable[[TaskEvent],None], optional): called with events of this task only... dropped when the task finishes, fails or is unwatched
+
+        Returns:
+            Future: resolved with the handle once the task finishes, failed if its status can't be fetched (use asyncio.wrap_future to await it)
+        """
+        with self._lock:
+            future = self._watched.get(handle)
+            if future is None:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._watched[handle]=future
+            if listener is not None:
+                self._task_listeners.setdefault(handle, []).append(listener)
+            self._stopped=False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread=threading.Thread(target=self._run, name="labelatorio-task-watcher", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return future
+
+    def unwatch(self, handle:"TaskStatusHandle"):
+        self._fail(handle, CancelledError())
+
+    def _fail(self, handle:"TaskStatusHandle", error:BaseException):
+        with self._lock:
+            future = self._watched.pop(handle, None)
+            self._task_listeners.pop(handle, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def add_listener(self, listener:Callable[[TaskEvent],None]):
+        """listener(event) is called from the watcher thread for every state change, progress update and completion"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener:Callable[[TaskEvent],None]):
+        self._listeners.remove(listener)
+
+    @property
+    def watched(self) -> List["TaskStatusHandle"]:
+        with self._lock:
+            return list(self._watched)
+
+    def stop(self, timeout:Optional[float]=None):
+        """stops the thread... watched tasks (and their listeners) stay registered and polling resumes by the next watch()"""
+        with self._lock:
+            self._stopped=True
+            thread=self._thread
+        self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def poll(self) -> float:
+        """
+        one polling cycle... refreshes all watched tasks and publishes events
+
+        Returns:
+            float: seconds until the next cycle
+        """
+        handles = self.watched
+        previous = {handle:handle.current_status for handle in handles}
+        errors={}
+        refresh_all(handles, errors)
+        self.polls+=1
+        for handle in handles:
+            if handle in errors:
+                self.errors+=1
+                logger.warning("Task watcher failed to refresh task %s: %s", handle.task_id, errors[handle])
+                self._fail(handle, errors[handle])
+            else:
+                self._publish(handle, previous[handle])
+        with self._lock:
+            pending=list(self._watched)
+        return _poll_interval(pending, self.min_interval, self.max_interval)
+
+    def _publish(self, handle:"TaskStatusHandle", previous:Optional["TaskStatus"]):
+        status = handle.current_status
+        if status is None:
+            return
+        if previous is None or previous.state!=status.state:
+            self._emit(TaskEvent(STATE_CHANGED, handle, previous))
+        elif (previous.progress_current, previous.current_subtask)!=(status.progress_current, status.current_subtask):
+            self._emit(TaskEvent(PROGRESS, handle, previous))
+        if _is_done(handle):
+            with self._lock:
+                future = self._watched.pop(handle, None)
+            self._emit(TaskEvent(DONE, handle, previous))
+            with self._lock:
+                self._task_listeners.pop(handle, None)
+            if future is not None and not future.done():
+                future.set_result(handle)
+
+    def _emit(self, event:TaskEvent):
+        with self._lock:
+            task_listeners = list(self._task_listeners.get(event.handle, ()))
+        for listener in list(self._listeners)+task_listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Task watcher listener failed")
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopped or not self._watched:
+                    self._thread=None
+                    return
+            self._wakeup.clear()
+            try:
+                wait = self.poll()
+            except Exception:
+                # i.e. API not reachable... keep watching, next cycle will try again
+                self.errors+=1
+                logger.exception("Task watcher polling failed")
+                wait = self.max_interval
+            self._wakeup.wait(wait)
@@ -0,0 +1,214 @@
+"""
+Client side rate limiting and adaptive concurrency.
+
+Throttle combines a token bucket (requests per second with burst) and an AIMD concurrency limit:
+the number of requests in flight grows by one per limit successful calls, and is cut by decrease_factor
+when the server throttles (429) or latency grows over latency_tolerance times the best observed latency of the endpoint
+(baselines are kept per endpoint, as fast and slow endpoints share the limit).
+One Throttle can be shared by several clients (i.e. Client and NodeClient), and each API area can get its own one.
+"""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+AREAS=("documents","projects","models","tasks","serving","topics")
+DEFAULT_AREA="default"
+
+
+class TokenBucket:
+    """
+    Args:
+        rate (float): tokens (requests) per second
+        burst (float, optional): bucket size... max requests sent at once after idle period. Defaults to rate.
+    """
+    def __init__(self, rate:float, burst:Optional[float]=None) -> None:
+        self.rate=rate
+        self.burst=burst or max(1.0, rate)
+        self._tokens=self.burst
+        self._updated=time.monotonic()
+        self._lock=threading.Lock()
+
+    def reserve(self)->float:
+        """
+        takes one token and returns how long the caller has to wait before it can use it
+        """
+        with self._lock:
+            now=time.monotonic()
+            self._tokens=min(self.burst, self._tokens+(now-self._updated)*self.rate)
+            self._updated=now
+            self._tokens-=1
+            return 0.0 if self._tokens>=0 else -self._tokens/self.rate
+
+    def acquire(self):
+        wait=self.reserve()
+        if wait>0:
+            time.sleep(wait)
+
+    async def async_acquire(self):
+        wait=self.reserve()
+        if wait>0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit of requests in flight
+
+    Args:
+        initial (int, optional): starting limit. Defaults to 8.
+        min_limit (int, optional): Defaults to 1.
+        max_limit (int, optional): Defaults to 64.
+        decrease_factor (float, optional): limit multiplier on overload. Defaults to 0.5.
+        latency_tolerance (float, optional): latency (smoothed) over best observed latency of the same endpoint * tolerance is considered overload. None to react only on 429. Defaults to 2.0.
+    """
+    def __init__(self, initial:int=8, min_limit:int=1, max_limit:int=64, decrease_factor:float=0.5, latency_tolerance:Optional[float]=2.0) -> None:
+        self.min_limit=min_limit
+        self.max_limit=max_limit
+        self.decrease_factor=decrease_factor
+        self.latency_tolerance=latency_tolerance
+        self._limit=float(initial)
+        self.in_flight=0
+        # endpoint -> [best, smoothed] latency
+        self._latencies:Dict[Optional[str],List[float]]={}
+        self._last_decrease=0.0
+        self._condition=threading.Condition()
+        self.decreases=0
+
+    @property
+    def limit(self)->int:
+        return max(self.min_limit, int(self._limit))
+
+    def try_acquire(self)->bool:
+        with self._condition:
+            if self.in_flight<self.limit:
+                self.in_flight+=1
+                return True
+            return False
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight>=self.limit:
+                self._condition.wait()
+            self.in_flight+=1
+
+    async def async_acquire(self):
+        # don't block the event loop... poll with short sleeps
+        delay=0.005
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay=min(delay*2, 0.1)
+
+    def release(self, latency:float, overloaded:bool=False, endpoint:Optional[str]=None):
+        with self._condition:
+            self.in_flight-=1
+            now=time.monotonic()
+            latencies=self._latencies.get(endpoint)
+            if latency>0:
+                if latencies is None:
+                    latencies=self._latencies[endpoint]=[latency, latency]
+                else:
+                    latencies[0]=min(latencies[0], latency)
+                    latencies[1]=latencies[1]*0.9+latency*0.1
+                if self.latency_tolerance and latencies[1]>latencies[0]*self.latency_tolerance:
+                    overloaded=True
+            # decrease at most once per round trip... requests already in flight report the same overload
+            if overloaded and now-self._last_decrease>(latencies[1] if latencies else 0):
+                self._limit=max(self.min_limit, self._limit*self.decrease_factor)
+                self._last_decrease=now
+                self.decreases+=1
+                # start measuring latency trend again from the new level
+                if latencies:
+                    latencies[1]=latencies[0]
+            elif not overloaded:
+                self._limit=min(self.max_limit, self._limit+1/self._limit)
+            self._condition.notify_all()
+
+
+class Throttle:
+    """
+    Rate limit and adaptive concurrency budget of an API area
+
+    Args:
+        rate (float, optional): max requests per second, None for no rate limit
+        burst (float, optional): max burst of requests for rate limit. Defaults to rate.
+        concurrency (Union[bool,int,AdaptiveConcurrency], optional): True for default adaptive limit, int for initial limit, False/None to disable. Defaults to True.
+    """
+    def __init__(self, rate:Optional[float]=None, burst:Optional[float]=None, concurrency:Union[bool,int,AdaptiveConcurrency,None]=True) -> None:
+        self.bucket=TokenBucket(rate, burst) if rate else None
+        if concurrency is True:
+            concurrency=AdaptiveConcurrency()
+        elif concurrency and isinstance(concurrency, int):
+            concurrency=AdaptiveConcurrency(initial=concurrency)
+        self.concurrency:Optional[AdaptiveConcurrency]=concurrency or None
+        self._lock=threading.Lock()
+        self.calls=0
+        self.throttled=0
+
+    def _record(self, status_code:Optional[int]):
+        with self._lock:
+            self.calls+=1
+            if status_code==429:
+                self.throttled+=1
+
+    def call(self, send:Callable[[],object], endpoint:Optional[str]=None):
+        """
+        calls send() within the rate and concurrency limit (send returns object with status_code)... endpoint selects latency baseline
+        """
+        if self.bucket is not None:
+            self.bucket.acquire()
+        if self.concurrency is None:
+            response=send()
+            self._record(response.status_code)
+            return response
+        self.concurrency.acquire()
+        start=time.perf_counter()
+        status_code=None
+        try:
+            response=send()
+            status_code=response.status_code
+            return response
+        finally:
+            self.concurrency.release(time.perf_counter()-start if status_code is not None else 0, overloaded=status_code is None or status_code in (429,503), endpoint=endpoint)
+            self._record(status_code)
+
+    async def acall(self, send:Callable[[],Awaitable], endpoint:Optional[str]=None):
+        if self.bucket is not None:
+            await self.bucket.async_acquire()
+        if self.concurrency is None:
+            response=await send()
+            self._record(response.status_code)
+            return response
+        await self.concurrency.async_acquire()
+        start=time.perf_counter()
+        status_code=None
+        try:
+            response=await send()
+            status_code=response.status_code
+            return response
+        finally:
+            self.concurrency.release(time.perf_counter()-start if status_code is not None else 0, overloaded=status_code is None or status_code in (429,503), endpoint=endpoint)
+            self._record(status_code)
+
+    def stats(self)->dict:
+        return {
+            "calls":self.calls,
+            "throttled":self.throttled,
+            "concurrency_limit":self.concurrency.limit if self.concurrency else None,
+            "in_flight":self.concurrency.in_flight if self.concurrency else None,
+        }
+
+
+def area_throttles(throttle:Union[Throttle,Dict[str,Throttle],None])->Dict[str,Throttle]:
+    """
+    normalizes client throttle setting into {area: Throttle}... single Throttle is shared by all areas,
+    dict can set the budget per area (documents, projects, models, tasks, serving, topics) with "default" for the rest
+    """
+    if throttle is None:
+        return {}
+    if isinstance(throttle, Throttle):
+        return {DEFAULT_AREA:throttle}
+    unknown=set(throttle)-set(AREAS)-{DEFAULT_AREA}
+    if unknown:
+        raise ValueError(f"Unknown throttle areas: {unknown}, supported: {AREAS+(DEFAULT_AREA,)}")
+    return dict(throttle)
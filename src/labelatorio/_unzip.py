@@ -0,0 +1,240 @@
+"""
+Zip extraction of downloaded models.
+
+extract_parallel extracts entries of a downloaded archive by several threads (each with its own ZipFile handle).
+StreamingUnzipper extracts entries while the archive is being downloaded, by parsing local file headers of the stream,
+so the archive is never written to disk. It supports stored and deflated entries (including zip64 and data descriptors
+after deflated data), other archives raise StreamingUnzipUnsupported and have to be downloaded and extracted from disk.
+"""
+import os
+import struct
+import zlib
+from typing import List, Optional
+from zipfile import ZipFile, BadZipFile
+
+_LOCAL_HEADER=0x04034b50
+_CENTRAL_HEADER=0x02014b50
+_END_OF_CENTRAL_DIR=0x06054b50
+_ZIP64_END_OF_CENTRAL_DIR=0x06064b50
+_DATA_DESCRIPTOR=0x08074b50
+_LOCAL_HEADER_STRUCT=struct.Struct("<IHHHHHIIIHH")
+
+_STORED=0
+_DEFLATED=8
+
+_FLAG_ENCRYPTED=0x1
+_FLAG_DATA_DESCRIPTOR=0x8
+_FLAG_UTF8=0x800
+
+
+class StreamingUnzipUnsupported(Exception):
+    pass
+
+
+def extract_parallel(zip_path:str, target_dir:str, max_workers:int=4) -> List[str]:
+    """
+    extracts all entries of the archive, several entries at once... returns extracted paths
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ZipFile(zip_path, "r") as zip_file:
+        members = zip_file.infolist()
+    # largest first, so one huge entry doesn't end up last
+    files = sorted((member for member in members if not member.is_dir()), key=lambda member: member.file_size, reverse=True)
+    groups = [files[i::max(1,max_workers)] for i in range(max(1,max_workers))]
+
+    def extract_group(group):
+        with ZipFile(zip_path, "r") as zip_file:
+            return [zip_file.extract(member, target_dir) for member in group]
+
+    with ZipFile(zip_path, "r") as zip_file:
+        paths = [zip_file.extract(member, target_dir) for member in members if member.is_dir()]
+    with ThreadPoolExecutor(max_workers=max(1,max_workers)) as executor:
+        for extracted in executor.map(extract_group, [group for group in groups if group]):
+            paths.extend(extracted)
+    return paths
+
+
+def _safe_path(target_dir:str, name:str) -> str:
+    # the same sanitization as ZipFile.extract... no absolute paths, drive letters or ".." components
+    name = name.replace("\\", "/")
+    parts = [part for part in name.split("/") if part not in ("", ".", "..")]
+    if parts and os.path.splitdrive(parts[0])[0]:
+        parts[0] = os.path.splitdrive(parts[0])[1] or "_"
+    return os.path.join(target_dir, *parts)
+
+
+class _Entry:
+    __slots__=("name","path","method","flags","crc","compressed_size","size","zip64","handle","remaining","decompressor","actual_crc")
+
+    def __init__(self) -> None:
+        self.handle=None
+        self.decompressor=None
+        self.actual_crc=0
+
+
+class StreamingUnzipper:
+    """
+    Extracts zip archive from chunks of its bytes fed in order... feed(chunk) for each chunk, close() at the end
+    """
+
+    def __init__(self, target_dir:str) -> None:
+        self.target_dir=target_dir
+        self.extracted:List[str]=[]
+        self.finished=False
+        self._buffer=bytearray()
+        self._entry:Optional[_Entry]=None
+        self._state="header"
+
+    def feed(self, data:bytes):
+        if self.finished:
+            return
+        self._buffer+=data
+        while not self.finished and self._step():
+            pass
+
+    def close(self):
+        if not self.finished:
+            self._close_entry()
+            raise BadZipFile("Zip stream ended unexpectedly")
+
+    def abort(self):
+        """closes the entry being written, when extraction is given up (its files are left for the caller to remove)"""
+        self._close_entry()
+
+    def _close_entry(self):
+        if self._entry is not None and self._entry.handle is not None:
+            self._entry.handle.close()
+            self._entry.handle=None
+
+    def _step(self) -> bool:
+        if self._state=="header":
+            return self._read_header()
+        if self._state=="data":
+            return self._read_data()
+        return self._read_descriptor()
+
+    def _read_header(self) -> bool:
+        if len(self._buffer)<4:
+            return False
+        signature = struct.unpack_from("<I", self._buffer)[0]
+        if signature in (_CENTRAL_HEADER, _END_OF_CENTRAL_DIR, _ZIP64_END_OF_CENTRAL_DIR):
+            # all entries were read, the rest of the archive is the central directory
+            self.finished=True
+            self._buffer=bytearray()
+            return False
+        if signature!=_LOCAL_HEADER:
+            raise BadZipFile("Bad local file header in zip stream")
+        if len(self._buffer)<_LOCAL_HEADER_STRUCT.size:
+            return False
+        (_, _, flags, method, _, _, crc, compressed_size, size, name_length, extra_length) = _LOCAL_HEADER_STRUCT.unpack_from(self._buffer)
+        header_length = _LOCAL_HEADER_STRUCT.size+name_length+extra_length
+        if len(self._buffer)<header_length:
+            return False
+        raw_name = bytes(self._buffer[_LOCAL_HEADER_STRUCT.size:_LOCAL_HEADER_STRUCT.size+name_length])
+        extra = bytes(self._buffer[_LOCAL_HEADER_STRUCT.size+name_length:header_length])
+        del self._buffer[:header_length]
+
+        entry = _Entry()
+        entry.name = raw_name.decode("utf-8" if flags & _FLAG_UTF8 else "cp437")
+        entry.flags = flags
+        entry.method = method
+        entry.crc = crc
+        entry.compressed_size = compressed_size
+        entry.size = size
+        entry.zip64 = False
+        if flags & _FLAG_ENCRYPTED:
+            raise StreamingUnzipUnsupported(f"Encrypted entry {entry.name}")
+        if method not in (_STORED, _DEFLATED):
+            raise StreamingUnzipUnsupported(f"Unsupported compression method {method} of {entry.name}")
+        self._apply_zip64_extra(entry, extra)
+        if method==_STORED and flags & _FLAG_DATA_DESCRIPTOR:
+            # size of stored data is known only from the descriptor after them
+            raise StreamingUnzipUnsupported(f"Stored entry {entry.name} without size in local header")
+
+        entry.path = _safe_path(self.target_dir, entry.name)
+        if entry.name.endswith("/"):
+            os.makedirs(entry.path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(entry.path) or ".", exist_ok=True)
+            entry.handle = open(entry.path, "wb")
+            self.extracted.append(entry.path)
+        entry.remaining = entry.compressed_size
+        if method==_DEFLATED:
+            entry.decompressor = zlib.decompressobj(-15)
+        self._entry = entry
+        self._state = "data"
+        return True
+
+    def _apply_zip64_extra(self, entry:_Entry, extra:bytes):
+        offset = 0
+        while offset+4<=len(extra):
+            header_id, data_size = struct.unpack_from("<HH", extra, offset)
+            if header_id==0x0001:
+                entry.zip64 = True
+                data = extra[offset+4:offset+4+data_size]
+                values = []
+                for position in range(0, len(data)-7, 8):
+                    values.append(struct.unpack_from("<Q", data, position)[0])
+                # fields are present only for the values set to 0xFFFFFFFF in the header, in this order
+                if entry.size==0xFFFFFFFF and values:
+                    entry.size = values.pop(0)
+                if entry.compressed_size==0xFFFFFFFF and values:
+                    entry.compressed_size = values.pop(0)
+            offset += 4+data_size
+
+    def _write(self, data:bytes):
+        entry = self._entry
+        if data:
+            entry.actual_crc = zlib.crc32(data, entry.actual_crc)
+            if entry.handle is not None:
+                entry.handle.write(data)
+
+    def _read_data(self) -> bool:
+        entry = self._entry
+        if entry.method==_STORED:
+            if entry.remaining and not self._buffer:
+                return False
+            count = min(entry.remaining, len(self._buffer))
+            self._write(bytes(self._buffer[:count]))
+            del self._buffer[:count]
+            entry.remaining -= count
+            if entry.remaining:
+                return False
+        else:
+            if not self._buffer:
+                return False
+            data = bytes(self._buffer)
+            self._buffer = bytearray()
+            self._write(entry.decompressor.decompress(data))
+            if not entry.decompressor.eof:
+                return False
+            self._write(entry.decompressor.flush())
+            self._buffer = bytearray(entry.decompressor.unused_data)
+
+        if entry.flags & _FLAG_DATA_DESCRIPTOR:
+            self._state = "descriptor"
+        else:
+            self._finish_entry(entry.crc)
+        return True
+
+    def _read_descriptor(self) -> bool:
+        size_length = 8 if self._entry.zip64 else 4
+        if len(self._buffer)<4:
+            return False
+        has_signature = struct.unpack_from("<I", self._buffer)[0]==_DATA_DESCRIPTOR
+        length = (4 if has_signature else 0)+4+2*size_length
+        if len(self._buffer)<length:
+            return False
+        crc = struct.unpack_from("<I", self._buffer, 4 if has_signature else 0)[0]
+        del self._buffer[:length]
+        self._finish_entry(crc)
+        return True
+
+    def _finish_entry(self, expected_crc:int):
+        entry = self._entry
+        self._close_entry()
+        if entry.actual_crc!=expected_crc:
+            raise BadZipFile(f"Bad CRC-32 of {entry.name}")
+        self._entry = None
+        self._state = "header"
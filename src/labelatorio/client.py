@@ -1,16 +1,33 @@
-import pandas
 import requests
 import labelatorio.data_model as data_model
 import dataclasses
 from typing import *
-from labelatorio._helpers import batchify
-import numpy as np
-from tqdm import tqdm
+from labelatorio._helpers import batchify, background_iter, run_concurrently, iter_pages
 import os
-from zipfile import ZipFile
+import sys
 import labelatorio.enums as enums
 from labelatorio.query_model import DocumentQueryFilter, Or
 import time
+from labelatorio._cache import ResponseCache
+from labelatorio._singleflight import SingleFlight, request_key
+from labelatorio._decoders import get_decoder
+from labelatorio._codec import get_codec, JSON_HEADERS
+from labelatorio._compression import Compression, ACCEPT_ENCODING
+from labelatorio._retry import RetryPolicy, NO_RETRY
+from labelatorio._throttle import Throttle, area_throttles, DEFAULT_AREA
+from labelatorio._download import Downloader, FileSpec
+from labelatorio._model_cache import ModelCache
+from labelatorio._unzip import extract_parallel, StreamingUnzipUnsupported
+from labelatorio._metrics import Metrics, CallRecord, endpoint_template
+from labelatorio._profile import Profile, operation
+
+if TYPE_CHECKING:
+    # imported lazily where used... pandas and numpy take long to import
+    import pandas
+    import numpy as np
+    from labelatorio.topic_index import TopicIndex
+    from labelatorio._tasks import TaskWatcher, TaskEvent
+    from concurrent.futures import Future
 
 
 class Client:
@@ -21,7 +38,14 @@ class Client:
 
     def __init__(self, 
             api_token: str,
-            url: str="https://api.labelator.io" 
+            url: str="https://api.labelator.io",
+            cache: Union[bool,ResponseCache]=False,
+            coalesce_requests: bool=True,
+            lazy: bool=False,
+            compress_requests: Union[bool,str,Compression]=False,
+            retry: Union[bool,RetryPolicy]=True,
+            throttle: Union[Throttle,Dict[str,Throttle],None]=None,
+            metrics: Union[bool,Metrics]=False
         ):
         """
         Initialize a Client class instance.
@@ -32,6 +56,28 @@ class Client:
             User id can be claimed allong access token on login screen
         url : str
             optional ... The URL to the Labelator.io instance
+        cache : Union[bool,ResponseCache]
+            optional ... cache GET responses of rarely changing metadata (projects.get, models.get_info, serving_nodes.get_node_settings, topics.get_topic). 
+            Pass True for default settings or ResponseCache instance to customize size and TTL per endpoint group
+        coalesce_requests : bool
+            optional ... identical GET requests running concurrently (i.e. from multiple threads) share one network request. 
+            Number of collapsed calls can be checked in client.singleflight.collapsed
+        lazy : bool
+            optional ... skip the login check (and its printout) on construction, the token is validated by the first API call instead. 
+            Useful for serverless functions and CLI tools where start-up time matters
+        compress_requests : Union[bool,str,Compression]
+            optional ... compress request bodies (document uploads, large queries) above 8kB. True for gzip, "deflate", or Compression instance for custom threshold and level. 
+            Transferred and decoded sizes (and compression ratio) of requests and responses are in client.compression.stats()
+        retry : Union[bool,RetryPolicy]
+            optional ... retry failed requests (connection errors, 429, 502, 503, 504) with exponential backoff, honouring Retry-After. 
+            Every page / batch of bulk operations is retried separately. Pass RetryPolicy instance to customize, or False to disable
+        throttle : Union[Throttle,Dict[str,Throttle]]
+            optional ... client side rate limit and adaptive concurrency limit. Single Throttle is shared by all API areas, 
+            or pass {area: Throttle} to budget areas separately (documents, projects, models, tasks, serving, topics and "default" for the rest). 
+            The same Throttle instance can be passed to NodeClient to share the budget
+        metrics : Union[bool,Metrics]
+            optional ... record latency, bytes, decode time, retries and status codes of calls per endpoint template (client.metrics.stats(), client.metrics.to_prometheus()). 
+            Pass Metrics instance with exporters (callbacks, OpenTelemetryExporter) to export every call, the same instance can be passed to NodeClient
         """
         if url is None:
             url="labelator.io/api"
@@ -49,9 +95,21 @@ class Client:
             if not url.endswith("/"):
                 url=url+"/"
             self.url=url
-        self.headers={f"authorization":f"Basic {api_token}"} 
+        self.headers={f"authorization":f"Basic {api_token}", "Accept-Encoding":ACCEPT_ENCODING} 
         self.timeout=500 
-        self._check_auth()
+        # not `cache or None`... empty ResponseCache is falsy
+        self.cache:Optional[ResponseCache]= cache if isinstance(cache, ResponseCache) else (ResponseCache() if cache else None)
+        self.singleflight:Optional[SingleFlight]= SingleFlight() if coalesce_requests else None
+        if isinstance(compress_requests, Compression):
+            self.compression=compress_requests
+        else:
+            self.compression=Compression(encoding="gzip" if compress_requests is True else (compress_requests or None))
+        self.retry_policy:RetryPolicy= RetryPolicy() if retry is True else (retry or NO_RETRY)
+        self.throttles:Dict[str,Throttle]= area_throttles(throttle)
+        self.metrics:Optional[Metrics]= (Metrics() if metrics is True else metrics) or None
+        self._auth_checked=False
+        if not lazy:
+            self._check_auth()
         self.projects=ProjectEndpointGroup(self)
         self.documents=DocumentsEndpointGroup(self)
         self.similarity_links=SimilarityLinkEndpointGroup(self)
@@ -63,7 +121,7 @@ class Client:
     def _check_auth(self):
         login_status_response= requests.get(self.url+ "login/status", headers=self.headers, timeout=self.timeout)
         if login_status_response.status_code==200:
-            payload=login_status_response.json()
+            payload=get_codec().loads(login_status_response.content)
             if "displayName" in payload and payload["displayName"]:
                 user = payload["displayName"]
             elif  "email" in payload:
@@ -76,22 +134,70 @@ class Client:
         print(f"Labelator.io client version {__version__}")
         print(f" logged in as: {user}")
         print(f" tennant_id: {payload.get('tennant_id')}")
+        self._auth_checked=True
+
+    def profile(self, *node_clients, trace_file:Optional[str]=None) -> Profile:
+        """
+        Profiles everything the client (and given NodeClients) does inside the with block:
+
+            with client.profile(node_client, trace_file="trace.json") as p:
+                client.documents.export_to_dataframe(project_id)
+            print(p.report(sort_by="download"))
+
+        Calls are split into waiting (throttling, backoff), connect, first byte, download, JSON parsing and model decode. 
+        trace_file is written in Chrome trace-event format (chrome://tracing, ui.perfetto.dev)
+        """
+        return Profile(self, *node_clients, trace_file=trace_file)
+
+    def _validate_first_response(self, status_code:int):
+        # in lazy mode the first API call validates the token instead of _check_auth
+        if status_code in (401, 403):
+            raise Exception(f"Login error: {status_code}")
+        self._auth_checked=True
 
 
 
 T = TypeVar('T')
 
 class EndpointGroup(Generic[T]):
+    _cache_group:Optional[str]=None
+    _throttle_area:str=DEFAULT_AREA
+
     def __init__(self, client: Client) -> None:
         self.client=client
 
     def _url_for_path(self, endpoint_path:str):
         return self.client.url+endpoint_path
 
+    def _send(self, method:str, request_url:str, query_params=None, body=None, extra_headers:dict=None, retry_safe:Optional[bool]=None, call:Optional[CallRecord]=None) -> requests.Response:
+        headers = {**self.client.headers, **extra_headers} if extra_headers else self.client.headers
+        data = None
+        compression = self.client.compression
+        throttles = self.client.throttles
+        throttle = (throttles.get(self._throttle_area) or throttles.get(DEFAULT_AREA)) if throttles else None
+        if body is not None:
+            data, content_encoding = compression.compress(get_codec().dumps(body))
+            headers = {**headers, **JSON_HEADERS}
+            if content_encoding:
+                headers["Content-Encoding"]=content_encoding
+        def request():
+            return requests.request(method, request_url, params=query_params,data=data, headers=headers, timeout=self.client.timeout)
+        def send_once():
+            attempt = request if call is None else (lambda: call.attempt(request, data))
+            response = throttle.call(attempt, endpoint_template(request_url[len(self.client.url):])) if throttle is not None else attempt()
+            compression.record_response(response)
+            return response
+        def send():
+            return self.client.retry_policy.call(method, send_once, retry_safe)
+
+        if method=="GET" and body is None and self.client.singleflight is not None:
+            return self.client.singleflight.do(request_key(method, request_url, query_params, headers), send)
+        return send()
+
     def _get_entity_type(self):
         return next(base.__args__[0] for base in self.__class__.__orig_bases__ if len(base.__args__)==1)
 
-    def _call_endpoint(self,method,endpoint_path,query_params=None,body=None, entityClass=T, ignore_err_status_codes=None):
+    def _call_endpoint(self,method,endpoint_path,query_params=None,body=None, entityClass=T, ignore_err_status_codes=None, use_cache=False, retry_safe:Optional[bool]=None):
         request_url = self._url_for_path(endpoint_path)
 
         if dataclasses.is_dataclass(body):
@@ -99,30 +205,52 @@ class EndpointGroup(Generic[T]):
 
         if entityClass==T:
             entityClass=self._get_entity_type()
-        if method=="GET":
-            response = requests.get(request_url, params=query_params,json=body, headers=self.client.headers, timeout=self.client.timeout)
-        elif method=="POST":
-            response =  requests.post(request_url, params=query_params,json=body, headers=self.client.headers, timeout=self.client.timeout)
-        elif method=="PUT":
-            response = requests.put(request_url, params=query_params,json=body, headers=self.client.headers, timeout=self.client.timeout)
-        elif method=="DELETE":
-            response = requests.delete(request_url, params=query_params,json=body,headers=self.client.headers, timeout=self.client.timeout)
-        elif method=="PATCH":
-            response = requests.patch(request_url, params=query_params,json=body,headers=self.client.headers, timeout=self.client.timeout)
-        
+
+        metrics = self.client.metrics
+        call = metrics.start("api", method, endpoint_path) if metrics is not None else None
+        try:
+            cache = self.client.cache
+            if cache is not None and cache.is_cached_group(self._cache_group):
+                if method=="GET" and use_cache:
+                    response = cache.fetch(self._cache_group, cache.make_key(request_url, query_params, self.client.headers.get("authorization")), 
+                        lambda extra_headers: self._send(method, request_url, query_params, body, extra_headers, retry_safe, call))
+                else:
+                    response = self._send(method, request_url, query_params, body, retry_safe=retry_safe, call=call)
+                    if method!="GET":
+                        cache.invalidate(self._cache_group)
+            else:
+                response = self._send(method, request_url, query_params, body, retry_safe=retry_safe, call=call)
+        except BaseException as ex:
+            if call is not None:
+                call.failed(ex)
+            raise
+
+        if not self.client._auth_checked:
+            self.client._validate_first_response(response.status_code)
+
+        if call is None:
+            return self._decode_response(response, entityClass, ignore_err_status_codes)
+        call.received(response)
+        with call.decoding():
+            return self._decode_response(response, entityClass, ignore_err_status_codes, call)
+
+    def _decode_response(self, response:requests.Response, entityClass, ignore_err_status_codes, call:Optional[CallRecord]=None):
         if response.status_code<300:
             if response.status_code==204:
                 return None
             if entityClass==None:
                 return
             if entityClass==dict:
-                return response.json()
+                return get_codec().loads(response.content)
             elif dataclasses.is_dataclass(entityClass):
-                data =response.json()
+                data =get_codec().loads(response.content)
+                if call is not None:
+                    call.parsed()
+                decoder = get_decoder(entityClass)
                 if isinstance(data,List):
-                    return [entityClass.from_dict(rec) for rec in data]
+                    return [decoder(rec) for rec in data]
                 else:
-                    return entityClass.from_dict(data)
+                    return decoder(data)
             else:
                 return entityClass(response.content)
         else:
@@ -133,6 +261,9 @@ class EndpointGroup(Generic[T]):
 
 
 class ProjectEndpointGroup(EndpointGroup[data_model.Project]):
+    _cache_group="projects"
+    _throttle_area="projects"
+
     def __init__(self, client: Client) -> None:
         super().__init__(client)    
 
@@ -149,7 +280,7 @@ class ProjectEndpointGroup(EndpointGroup[data_model.Project]):
         Returns:
             data_model.Project
         """
-        return self._call_endpoint("GET", f"projects/{project_id}")
+        return self._call_endpoint("GET", f"projects/{project_id}", use_cache=True)
 
     def get_stats(self,project_id:str)  -> data_model.ProjectStatistics:
         """Get project statistics (label counts)
@@ -207,6 +338,8 @@ class ProjectEndpointGroup(EndpointGroup[data_model.Project]):
 
         
 class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
+    _throttle_area="documents"
+    DELETE_BY_QUERY_SYNC_LIMIT=10000
     
     def __init__(self, client: Client) -> None:
         super().__init__(client)     
@@ -223,6 +356,49 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         """
         return self._call_endpoint("GET", f"projects/{project_id}/doc/{doc_id}")
 
+    def get_many(self, project_id:str, doc_ids:List[str], by_key:bool=False, chunk_size:int=250, max_workers:int=4) -> Tuple[List[data_model.TextDocument],List[str]]:
+        """Get many documents by their ids (or keys) at once
+        Ids are split into chunks queried by DocumentQueryFilter(id=[...]) running concurrently
+
+        Args:
+            project_id (str): Uuid of project
+            doc_ids (List[str]): list of document ids (or keys if by_key=True)
+            by_key (bool, optional): look up documents by key instead of id. If more documents share the same key, all of them are returned. Defaults to False.
+            chunk_size (int, optional): number of ids in one query. Defaults to 250.
+            max_workers (int, optional): max number of concurrent requests. Defaults to 4.
+
+        Returns:
+            Tuple[List[data_model.TextDocument],List[str]]: found documents in order of input ids, and list of ids (keys) that were not found
+        """
+        field = data_model.TextDocument.COL_KEY if by_key else data_model.TextDocument.COL_ID
+        unique_ids = list(dict.fromkeys(doc_ids))
+
+        def fetch_chunk(ids_chunk:List[str])->List[data_model.TextDocument]:
+            chunk_query = DocumentQueryFilter(**{field:ids_chunk})
+            if by_key:
+                return [doc for page in self._query_pages_by_keyset(project_id, chunk_query, page_size=chunk_size) for doc in DocumentsEndpointGroup._decode_query_results(page)]
+            docs=[]
+            for page in self._query_pages_by_keyset(project_id, chunk_query, page_size=len(ids_chunk)):
+                docs.extend(DocumentsEndpointGroup._decode_query_results(page))
+                # ids are unique... next page only if the server capped take
+                if len(docs)>=len(ids_chunk):
+                    break
+            return docs
+
+        found={}
+        for chunk_result in run_concurrently(fetch_chunk, list(batchify(unique_ids, chunk_size)), max_workers=max_workers, progress_desc="Get documents"):
+            for doc in chunk_result:
+                found.setdefault(doc[field],[]).append(doc)
+
+        result = []
+        missing = []
+        for doc_id in doc_ids:
+            if doc_id in found:
+                result.extend(found[doc_id])
+            else:
+                missing.append(doc_id)
+        return result, missing
+
     def count(self,
             project_id:str,
             topic_id:str=None, 
@@ -321,9 +497,10 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
             }, entityClass=dict)
 
         if similar_to_doc or similar_to_phrase:
-            return [data_model.ScoredDocumentResponse.from_dict(item) for item in responseData  ]
+            decoder = get_decoder(data_model.ScoredDocumentResponse)
         else:
-            return [data_model.TextDocument.from_dict(item) for item in responseData  ]
+            decoder = get_decoder(data_model.TextDocument)
+        return [decoder(item) for item in responseData  ]
 
     def query(self,
             project_id: str, 
@@ -344,10 +521,107 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         Returns:
             Union[List[data_model.TextDocument],List[data_model.ScoredDocumentResponse]]: _description_
         """
-        responseData = self._call_endpoint("POST", f"/projects/{project_id}/doc/query", body=query, query_params={"order_by":order_by, "skip":skip, "take":take},entityClass=dict)
-        
-        return [data_model.ScoredDocumentResponse.from_dict(item) if "score" in item else data_model.TextDocument.from_dict(item) for item in responseData  ]
-            
+        return DocumentsEndpointGroup._decode_query_results(self._query_raw(project_id, query, order_by, skip, take))
+
+    def _query_raw(self, project_id:str, query:Union[DocumentQueryFilter,Or, Dict], order_by:str = None, skip:int = 0, take:int=50) -> List[dict]:
+        return self._call_endpoint("POST", f"/projects/{project_id}/doc/query", body=query, query_params={"order_by":order_by, "skip":skip, "take":take},entityClass=dict, retry_safe=True)
+
+    def _decode_query_results(responseData:List[dict]) -> Union[List[data_model.TextDocument],List[data_model.ScoredDocumentResponse]]:
+        decode_scored, decode_document = get_decoder(data_model.ScoredDocumentResponse), get_decoder(data_model.TextDocument)
+        return [decode_scored(item) if "score" in item else decode_document(item) for item in responseData  ]
+
+    def query_iter(self,
+            project_id: str,
+            query:Union[DocumentQueryFilter,Or, Dict],
+            order_by:str = None,
+            page_size:int = 500,
+            prefetch:int = 2
+    ) -> Iterator[Union[data_model.TextDocument,data_model.ScoredDocumentResponse]]:
+        """Iterate over all documents matching the query, page by page, while the next pages are fetched in background
+
+        If order_by is not set (or is "_i") and the query is not a similarity search, pages are fetched by keyset pagination over _i
+        (each page continues after the last _i of previous one), otherwise by skip/take with up to `prefetch` pages requested concurrently.
+
+        Args:
+            project_id (str): Uuid of project
+            query (Union[DocumentQueryFilter,Or,Dict]): Where query to match the documents
+            order_by (str, optional): Sort by field. Defaults to None.
+            page_size (int, optional): number of documents fetched in one request. Defaults to 500.
+            prefetch (int, optional): number of pages to fetch ahead of the consumer. Defaults to 2.
+
+        Returns:
+            Iterator[Union[data_model.TextDocument,data_model.ScoredDocumentResponse]]
+        """
+        for page in self._query_pages(project_id, query, order_by, page_size, prefetch):
+            yield from DocumentsEndpointGroup._decode_query_results(page)
+
+    def query_batch(self,
+            project_id: str,
+            query:Union[DocumentQueryFilter,Or, Dict],
+            order_by:str = None,
+            page_size:int = 500,
+            prefetch:int = 2
+    ) -> data_model.DocumentBatch:
+        """Get all documents matching the query as compact DocumentBatch (uses several times less memory than list of TextDocuments)
+        Pages are fetched the same way as in query_iter. Similarity scores are not kept.
+
+        Args:
+            project_id (str): Uuid of project
+            query (Union[DocumentQueryFilter,Or,Dict]): Where query to match the documents
+            order_by (str, optional): Sort by field. Defaults to None.
+            page_size (int, optional): number of documents fetched in one request. Defaults to 500.
+            prefetch (int, optional): number of pages to fetch ahead. Defaults to 2.
+
+        Returns:
+            data_model.DocumentBatch
+        """
+        batch = data_model.DocumentBatch()
+        for page in self._query_pages(project_id, query, order_by, page_size, prefetch):
+            batch.extend(item["doc"] if "score" in item else item for item in page)
+        return batch
+
+    def _query_pages(self, project_id:str, query:Union[DocumentQueryFilter,Or, Dict], order_by:str, page_size:int, prefetch:int) -> Iterator[List[dict]]:
+        if order_by in (None, data_model.TextDocument.COL_IINDEX) and DocumentsEndpointGroup._supports_keyset(query):
+            return background_iter(self._query_pages_by_keyset(project_id, query, page_size), buffer_size=prefetch)
+        else:
+            return self._query_pages_by_offset(project_id, query, order_by, page_size, prefetch)
+
+    def _query_pages_by_keyset(self, project_id:str, query:Union[DocumentQueryFilter,Or, Dict], page_size:int):
+        last_i = None
+        largest_page = 0
+        while True:
+            page_query = DocumentsEndpointGroup._with_iindex_after(query, last_i) if last_i is not None else query
+            page = self._query_raw(project_id, page_query, order_by=data_model.TextDocument.COL_IINDEX, take=page_size)
+            if not page:
+                return
+            yield page
+            # server may cap take below page_size... only empty page, or page shorter than the previous ones, is the last one
+            if len(page)<largest_page:
+                return
+            largest_page = len(page)
+            last_i = page[-1].get(data_model.TextDocument.COL_IINDEX)
+            if last_i is None:
+                raise Exception("Unable to continue paging, documents are missing _i")
+
+    def _query_pages_by_offset(self, project_id:str, query:Union[DocumentQueryFilter,Or, Dict], order_by:str, page_size:int, prefetch:int):
+        return iter_pages(lambda skip, take: self._query_raw(project_id, query, order_by=order_by, skip=skip, take=take), page_size, max_workers=prefetch)
+
+    def _supports_keyset(query:Union[DocumentQueryFilter,Or, Dict]) -> bool:
+        branches = query["Or"] if query and "Or" in query else [query or {}]
+        if any(data_model.TextDocument.COL_IINDEX in branch for branch in branches):
+            return False
+        return not DocumentsEndpointGroup._is_similarity_query(query)
+
+    def _is_similarity_query(query:Union[DocumentQueryFilter,Or, Dict]) -> bool:
+        branches = query["Or"] if query and "Or" in query else [query or {}]
+        return any(branch.get("similar_to_doc") or branch.get("similar_to_phrase") or branch.get("similar_to_vec") is not None for branch in branches)
+
+    def _with_iindex_after(query:Union[DocumentQueryFilter,Or, Dict], after:int) -> Union[Dict,Or]:
+        condition = {">":after}
+        if query and "Or" in query:
+            return Or(*[{**branch, data_model.TextDocument.COL_IINDEX:condition} for branch in query["Or"]])
+        return {**(query or {}), data_model.TextDocument.COL_IINDEX:condition}
+
     def get_neighbours(self,project_id:str, doc_id:str, min_score:float=0.7, take:int=50) -> List[data_model.TextDocument]:
         """Get documents similar to document
 
@@ -380,9 +654,37 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         self._call_endpoint("PATCH", f"projects/{project_id}/doc/labels", entityClass=None, body={
             "doc_ids":doc_ids,
             "labels":labels
-        })
+        }, retry_safe=True)
+
+    def set_labels_bulk(self, project_id:str, doc_labels:Dict[str,List[str]], max_group_size:int=1000, max_workers:int=4)-> List[Tuple[List[str],List[str],Exception]]:
+        """Set different labels to many documents at once (annotate)
+        Documents with the same set of labels are grouped into one request, groups are sent concurrently
+
+        Args:
+            project_id (str): Uuid of project
+            doc_labels (Dict[str,List[str]]): labels to set for each document id (overrides existing labels)
+            max_group_size (int, optional): max number of document ids sent in one request. Defaults to 1000.
+            max_workers (int, optional): max number of concurrent requests. Defaults to 4.
+
+        Returns:
+            List[Tuple[List[str],List[str],Exception]]: groups that failed - tuples of (doc_ids, labels, error). Empty if all succeeded
+        """
+        groups:Dict[Tuple[str],List[str]] = {}
+        for doc_id, labels in doc_labels.items():
+            # duplicates dropped, but the order of labels is kept
+            groups.setdefault(tuple(dict.fromkeys(labels or [])), []).append(doc_id)
+
+        requests_to_send = [(list(labels), ids_batch) for labels, doc_ids in groups.items() for ids_batch in batchify(doc_ids, max_group_size)]
+
+        def send(request:Tuple[List[str],List[str]]):
+            labels, doc_ids = request
+            self.set_labels(project_id, doc_ids, labels)
 
-    def get_vectors(self, project_id, doc_ids:List[str])-> List[Dict[str,np.ndarray]]:
+        results = run_concurrently(send, requests_to_send, max_workers=max_workers, progress_desc="Set labels", return_exceptions=True)
+        return [(doc_ids, labels, error) for (labels, doc_ids), error in zip(requests_to_send, results) if isinstance(error, Exception)]
+
+    @operation("documents.get_vectors")
+    def get_vectors(self, project_id, doc_ids:List[str])-> List[Dict[str,"np.ndarray"]]:
         """get embeddings of documents in project
 
         Args:
@@ -392,6 +694,8 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         Returns:
             list of dictionaries like this: {"id":"uuid", "vector":[0.0, 0.1 ...]}
         """
+        import numpy as np
+        from tqdm import tqdm
         result=[]
         for ids_batch in tqdm(batchify(doc_ids,100), total=int(len(doc_ids)/100), desc="Get vectors", unit="batch",  delay=2):
             for result_item in self._call_endpoint("PUT", f"/projects/{project_id}/doc/export-vectors", body=ids_batch, entityClass=dict):
@@ -399,7 +703,8 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         return result
 
 
-    def add_documents(self, project_id:str, data:Union[pandas.DataFrame,List[dict]], upsert:bool=True, batch_size:int=100 )->List[dict]:
+    @operation("documents.add_documents")
+    def add_documents(self, project_id:str, data:Union["pandas.DataFrame",List[dict]], upsert:bool=True, batch_size:int=100 )->List[dict]:
         """Add documents to project
 
         Args:
@@ -412,7 +717,11 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         Returns:
             List[str]: list of ids 
         """
-        if isinstance(data, pandas.DataFrame):
+        from tqdm import tqdm
+        # if data is a DataFrame, pandas has been already imported by caller
+        pandas = sys.modules.get("pandas")
+        if pandas is not None and isinstance(data, pandas.DataFrame):
+            import numpy as np
             if "text" not in data.columns:
                 raise Exception("column named 'text' must be present in data")
             
@@ -424,7 +733,7 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
             documents=data
         
         def send(data):
-            return self._call_endpoint("POST", f"/projects/{project_id}/doc", query_params={"upsert":upsert},entityClass=dict,body=data)
+            return self._call_endpoint("POST", f"/projects/{project_id}/doc", query_params={"upsert":upsert},entityClass=dict,body=data, retry_safe=upsert)
 
 
         response_data = []
@@ -453,19 +762,55 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         self._call_endpoint("DELETE", f"/projects/{project_id}/doc/{doc_id}", entityClass=None)
 
     
+    def delete_many(self, project_id:str, doc_ids:List[str], chunk_size:int=1000, max_workers:int=4)-> None: 
+        """Delete many documents by their ids!
+        Ids are split into chunks deleted by query (DocumentQueryFilter(id=[...])) running concurrently
+
+        Args:
+            project_id (str): Uuid of project
+            doc_ids (List[str]): ids of documents to delete
+            chunk_size (int, optional): number of ids deleted in one request (max 10 000). Defaults to 1000.
+            max_workers (int, optional): max number of concurrent requests. Defaults to 4.
+        """
+        chunk_size = min(chunk_size, DocumentsEndpointGroup.DELETE_BY_QUERY_SYNC_LIMIT)
+        def delete_chunk(ids_chunk:List[str]):
+            self._delete_by_query(project_id, DocumentQueryFilter(id=ids_chunk), wait_for_completion=True)
+
+        run_concurrently(delete_chunk, list(batchify(list(dict.fromkeys(doc_ids)), chunk_size)), max_workers=max_workers, progress_desc="Delete documents")
+    
     def delete_by_query(self, project_id:str, query:Union[DocumentQueryFilter,Or], wait_for_completion=False)-> None: 
         """_Delete documents by provided query
 
         Args:
             project_id (str): Uuid of project
             query (Union[DocumentQueryFilter,Or]): query filter to match the documents to be deleted
-            wait_for_completion (bool, optional): Triggers synchronous exectuion. Limits the number of records to be deleted to 10 000 (but can be run in loop until no data remains). Defaults to False.
+            wait_for_completion (bool, optional): Triggers synchronous exectuion. Server deletes max 10 000 records in one synchronous call, so the call is repeated until no matching documents remain
+                (not supported for similarity queries, these always match some documents). Defaults to False.
 
         Returns:
             None
         """
+        if not wait_for_completion:
+            self._delete_by_query(project_id, query, wait_for_completion=False)
+            return
+        if DocumentsEndpointGroup._is_similarity_query(query):
+            raise ValueError("wait_for_completion is not supported for similarity queries")
 
-        self._call_endpoint("POST", f"/projects/{project_id}/doc/delete-by-query", body=query, query_params={"wait_for_completion":wait_for_completion}, entityClass=None)
+        def matching_ids():
+            return {doc.get(data_model.TextDocument.COL_ID) for doc in self._query_raw(project_id, query, take=100)}
+
+        from tqdm import tqdm
+        with tqdm(desc="Delete by query", unit="batch", delay=2) as progress:
+            remaining = matching_ids()
+            while remaining:
+                self._delete_by_query(project_id, query, wait_for_completion=True)
+                progress.update(1)
+                previous, remaining = remaining, matching_ids()
+                if previous<=remaining:
+                    raise Exception(f"Delete by query made no progress, {len(remaining)}+ matching documents were not deleted")
+
+    def _delete_by_query(self, project_id:str, query:Union[DocumentQueryFilter,Or], wait_for_completion:bool)-> None: 
+        self._call_endpoint("POST", f"/projects/{project_id}/doc/delete-by-query", body=query, query_params={"wait_for_completion":wait_for_completion}, entityClass=None, retry_safe=True)
 
 
     def delete_all(self, project_id:str)-> None:
@@ -476,7 +821,8 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         """
         self._call_endpoint("DELETE", f"/projects/{project_id}/doc/all", entityClass=None)
 
-    def export_to_dataframe(self, project_id:str)->pandas.DataFrame:
+    @operation("documents.export_to_dataframe")
+    def export_to_dataframe(self, project_id:str)->"pandas.DataFrame":
         """Export all documents into pandas dataframe
 
         Args:
@@ -486,6 +832,8 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
            DataFrame
         """
         
+        import pandas
+        from tqdm import tqdm
         total_count = self.count(project_id)
 
         all_documnents=[]
@@ -508,6 +856,7 @@ class DocumentsEndpointGroup(EndpointGroup[data_model.TextDocument]):
         
 
 class SimilarityLinkEndpointGroup(EndpointGroup[Tuple[dict,dict]]):
+    _throttle_area="documents"
     def query(self,
             project_id: str, 
             link_type:str,
@@ -541,30 +890,89 @@ class SimilarityLinkEndpointGroup(EndpointGroup[Tuple[dict,dict]]):
                     "skip":skip, 
                     "take":take, 
                     "select": ",".join(select) if select else None},
-                entityClass=dict
+                entityClass=dict,
+                retry_safe=True
                 )
             for rec in responseData:
                 yield tuple(rec) 
        
         if fetch_all:
-            result = []
-            page=1
-            page_size=500
+            links = self.query_iter(project_id, link_type, select, query, deduplicate=False)
+            if select and data_model.TextDocument.COL_ID not in select:
+                # query_iter selects the id as well, keep the shape of what was asked for
+                return [tuple({key:value for key, value in item.items() if key!=data_model.TextDocument.COL_ID} for item in link) for link in links]
+            return list(links)
+        else:
+            return list(fetch_data())
 
-            while True:
-                previous_len=len(result)
-                for item in self.query(project_id,link_type, select, query, fetch_all=False, skip=(page-1)*page_size, take=page_size):
-                    result.append(item)
+    def query_iter(self,
+            project_id: str, 
+            link_type:str,
+            select:Optional[List[str]]=None,
+            query:Union[DocumentQueryFilter,Or,None]=None,
+            page_size:int=500,
+            max_workers:int=4,
+            deduplicate:bool=True
+    ) -> Iterator[Tuple[dict,dict]]:
+        """stream all similarity links matching the query, fetching pages concurrently
 
-                if len(result)==previous_len: #if not more data was fetched
-                    return result
-                else:
-                    page=page+1
+        Args:
+            project_id (str): Uuid of project
+            link_type (str): positive|negative
+            select (str): list of fields to select (id is always selected)
+            query (Union[DocumentQueryFilter,Or,None], optional): query over the left side (source of the link)
+            page_size (int, optional): links per request. Defaults to 500.
+            max_workers (int, optional): pages fetched concurrently ahead of consumption. Defaults to 4.
+            deduplicate (bool, optional): return each link once, dropping the mirrored (right, left) duplicate. Defaults to True.
 
-        else:
-            return list(fetch_data())
+        Returns:
+            Iterator[Tuple[dict,dict]]: tuples of two items (left, right side of the link)
+        """
+        if select and data_model.TextDocument.COL_ID not in select:
+            select=[*select, data_model.TextDocument.COL_ID]
+
+        def fetch_page(skip:int, take:int):
+            return self.query(project_id, link_type, select, query, fetch_all=False, skip=skip, take=take)
+
+        # sorted id pairs, so the mirrored link has the same one
+        seen = set()
+        for page in iter_pages(fetch_page, page_size, max_workers=max_workers):
+            for left, right in page:
+                if deduplicate:
+                    left_id, right_id = left[data_model.TextDocument.COL_ID], right[data_model.TextDocument.COL_ID]
+                    pair = (left_id, right_id) if left_id<=right_id else (right_id, left_id)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                yield left, right
+
+    def query_graph(self,
+            project_id: str, 
+            link_type:str,
+            query:Union[DocumentQueryFilter,Or,None]=None,
+            page_size:int=500,
+            max_workers:int=4
+    ) -> data_model.SimilarityGraph:
+        """fetch similarity links as a graph over document indices... use graph.edges() for numpy edge array, graph.csr() or graph.to_scipy() for adjacency matrix
+
+        Args:
+            project_id (str): Uuid of project
+            link_type (str): positive|negative
+            query (Union[DocumentQueryFilter,Or,None], optional): query over the left side (source of the link)
+            page_size (int, optional): links per request. Defaults to 500.
+            max_workers (int, optional): pages fetched concurrently. Defaults to 4.
+
+        Returns:
+            data_model.SimilarityGraph: deduplicated links, graph.doc_ids maps indices to document ids
+        """
+        return data_model.SimilarityGraph.from_links(
+            self.query_iter(project_id, link_type, select=[data_model.TextDocument.COL_ID], query=query, page_size=page_size, max_workers=max_workers)
+        )
 
 class ModelsEndpointGroup(EndpointGroup[data_model.ModelInfo]):
+    _cache_group="models"
+    _throttle_area="models"
+
     def __init__(self, client: Client) -> None:
         super().__init__(client)     
 
@@ -586,7 +994,7 @@ class ModelsEndpointGroup(EndpointGroup[data_model.ModelInfo]):
                 query={"project_id":project_id}
             else:
                 query=None
-            return self._call_endpoint("GET", f"models/info/{model_name}", query_params=query)
+            return self._call_endpoint("GET", f"models/info/{model_name}", query_params=query, use_cache=True)
         else:
             raise Exception("if project_id is not set, model_name must be in this pattern: '{project_name}/{model_name}'")
 
@@ -611,31 +1019,57 @@ class ModelsEndpointGroup(EndpointGroup[data_model.ModelInfo]):
         """
         return self._call_endpoint("GET", f"projects/{project_id}/models")
 
-    def download(self,project_id:str, model_name_or_id:str, target_path:str=None, unzip=True):
+    def download(self,project_id:str, model_name_or_id:str, target_path:str=None, unzip=True, max_workers:int=4, progress:bool=True, cache:Union[bool,ModelCache]=False, stream_unzip:bool=False)->str:
+        """Download model files... files (and parts of large files) are downloaded in parallel, interrupted download continues where it stopped
+
+        Args:
+            project_id (str): Uuid of project
+            model_name_or_id (str): Model name or Uuid
+            target_path (str, optional): directory to download to (ignored if cache is used). Defaults to current working directory.
+            unzip (bool, optional): extract downloaded zip files (and remove them). Defaults to True.
+            max_workers (int, optional): parallel requests. Defaults to 4.
+            progress (bool, optional): show download progress (bytes of all files). Defaults to True.
+            cache (Union[bool,ModelCache], optional): download into local model cache shared by processes on this machine (True for default location and size),
+                and if the model (the same id and created_at) is already there, just return its path. Defaults to False.
+            stream_unzip (bool, optional): extract zip files while they are downloaded, without storing the archive (needs no scratch space, but can't resume). 
+                Archives that can't be extracted from stream are downloaded and extracted from disk. Defaults to False.
+
+        Returns:
+            str: target path (directory of the model in cache, if cache is used)
+        """
+        if cache:
+            model_cache = ModelCache() if cache is True else cache
+            model_info = self.get_info(model_name_or_id, project_id)
+            return model_cache.get_or_install(model_info.id, model_info.created_at, 
+                lambda directory: self.download(project_id, model_info.id, directory, unzip=unzip, max_workers=max_workers, progress=progress, stream_unzip=stream_unzip))
+
         if not target_path:
             target_path= os.getcwd()
         file_urls = self._call_endpoint("GET", f"/projects/{project_id}/models/download-urls",query_params={"model_name_or_id":model_name_or_id}, entityClass=dict)
         if not file_urls:
             raise Exception("There seams to be no files for this model!")
-        for fileUrl in file_urls:
-            response = requests.get(fileUrl["url"], stream=True)
-            (path,file_name) = os.path.split(fileUrl["file"])
-            path = os.path.join(target_path,path)
-            if not os.path.exists(path):
-                os.makedirs(path)
-            
-            file_path=os.path.join(target_path, fileUrl["file"])
-            with open(file_path, "wb") as handle:
-                for data in tqdm(response.iter_content(chunk_size=1024*1024),unit="MB",desc=fileUrl["file"]):
-                    handle.write(data)
-            
-            if unzip and file_path.lower().endswith(".zip"):
-               
-                with ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(target_path)
-                os.remove(file_path)
-
-
+        files = [FileSpec(fileUrl["url"], os.path.join(target_path, fileUrl["file"]), size=fileUrl.get("size"), md5=fileUrl.get("md5"), sha256=fileUrl.get("sha256")) 
+                    for fileUrl in file_urls]
+        downloader = Downloader(max_workers=max_workers, retry_policy=self.client.retry_policy, progress=progress)
+        if unzip and stream_unzip:
+            streamed = []
+            for file in files:
+                if file.path.lower().endswith(".zip"):
+                    try:
+                        downloader.stream_extract(file, target_path, desc=os.path.basename(file.path))
+                        streamed.append(file)
+                    except StreamingUnzipUnsupported:
+                        pass
+            files = [file for file in files if file not in streamed]
+        if files:
+            downloader.download(files, desc=model_name_or_id)
+
+        if unzip:
+            for file in files:
+                if file.path.lower().endswith(".zip"):
+                    extract_parallel(file.path, target_path, max_workers=max_workers)
+                    os.remove(file.path)
+        return target_path
                 
     def apply_predictions(self, project_id:str,model_name_or_id:str)-> "TaskStatusHandle": 
         """Apply predictions from model
@@ -643,7 +1077,8 @@ class ModelsEndpointGroup(EndpointGroup[data_model.ModelInfo]):
             project_id (str): Uuid of project
             model_name_or_id (str): Model Uuid
         """
-        return TaskStatusHandle(self._call_endpoint("PUT", f"/projects/{project_id}/models/{model_name_or_id}/apply-predict", entityClass=dict), self.client)
+        # starts a task... not repeated after timeout or 502/504 (PUT is retried by default), it could start the task twice
+        return TaskStatusHandle(self._call_endpoint("PUT", f"/projects/{project_id}/models/{model_name_or_id}/apply-predict", entityClass=dict, retry_safe=False), self.client)
 
     def apply_embeddings(self, project_id:str,model_name_or_id:str)-> "TaskStatusHandle": 
         """Regenerate embeddings and reindex by new model
@@ -652,7 +1087,7 @@ class ModelsEndpointGroup(EndpointGroup[data_model.ModelInfo]):
             project_id (str): Uuid of project
              model_name_or_id (str): Model Uuid
         """
-        return TaskStatusHandle(self._call_endpoint("PUT", f"/projects/{project_id}/models/{model_name_or_id}/apply-embeddings", entityClass=dict), self.client)
+        return TaskStatusHandle(self._call_endpoint("PUT", f"/projects/{project_id}/models/{model_name_or_id}/apply-embeddings", entityClass=dict, retry_safe=False), self.client)
 
 
 
@@ -663,10 +1098,15 @@ class ModelsEndpointGroup(EndpointGroup[data_model.ModelInfo]):
             project_id (str): Uuid of project
             model_training_request (data_model.ModelTrainingRequest): Training settings
         """
-        return TaskStatusHandle(self._call_endpoint("PUT", f"/projects/{project_id}/models/train", body=model_training_request.to_dict(), entityClass=dict), self.client)
+        return TaskStatusHandle(self._call_endpoint("PUT", f"/projects/{project_id}/models/train", body=model_training_request.to_dict(), entityClass=dict, retry_safe=False), self.client)
 
 
 class TaskEndpointGroup(EndpointGroup[data_model.TaskStatus]):
+    _throttle_area="tasks"
+
+    def __init__(self, client: Client) -> None:
+        super().__init__(client)
+        self._watcher:Optional["TaskWatcher"]=None
 
     def get_latest(self, project_id:Optional[str]=None)-> List[data_model.TaskStatus]: 
         return self._call_endpoint("GET", f"/projects/tasks", query_params={"project_id":project_id} if project_id else None)
@@ -674,7 +1114,56 @@ class TaskEndpointGroup(EndpointGroup[data_model.TaskStatus]):
     def get_task_status(self, task_id:str)-> data_model.TaskStatus: 
         return self._call_endpoint("GET", f"/projects/tasks/{task_id}")
 
+    def wait_all(self, handles:Iterable["TaskStatusHandle"], timeout_sec:Optional[float]=None, return_when:str="ALL_COMPLETED",
+            on_done:Optional[Callable[["TaskStatusHandle"],None]]=None) -> Tuple[List["TaskStatusHandle"],List["TaskStatusHandle"]]:
+        """
+        Waits for many tasks at once, refreshing statuses of each project's tasks by one get_latest call per polling cycle
+
+        Args:
+            handles (Iterable[TaskStatusHandle]): tasks to wait for (i.e. results of apply_predictions, train, topics.regenerate)
+            timeout_sec (float, optional): max time to wait. Defaults to None (no timeout).
+            return_when (str, optional): ALL_COMPLETED, FIRST_COMPLETED or FIRST_EXCEPTION. Defaults to ALL_COMPLETED.
+            on_done (Callable[[TaskStatusHandle],None], optional): called with each handle once its task finishes
+
+        Returns:
+            Tuple[List[TaskStatusHandle],List[TaskStatusHandle]]: done and not done handles
+        """
+        from labelatorio._tasks import wait_all
+        return wait_all(handles, timeout_sec=timeout_sec, return_when=return_when, on_done=on_done)
+
+    def as_completed(self, handles:Iterable["TaskStatusHandle"], timeout_sec:Optional[float]=None) -> Iterator["TaskStatusHandle"]:
+        """
+        Yields handles as their tasks finish (raises TimeoutError if not all of them finish in timeout_sec)
+        """
+        from labelatorio._tasks import as_completed
+        return as_completed(handles, timeout_sec=timeout_sec)
+
+    @property
+    def watcher(self) -> "TaskWatcher":
+        """
+        Background watcher of this client's tasks (created on first use)... all watched tasks share one polling schedule
+        """
+        if self._watcher is None:
+            from labelatorio._tasks import TaskWatcher
+            self._watcher=TaskWatcher()
+        return self._watcher
+
+    def watch(self, handle:"TaskStatusHandle", listener:Optional[Callable[["TaskEvent"],None]]=None) -> "Future":
+        """
+        Registers the task with the background watcher
+
+        Args:
+            handle (TaskStatusHandle): task to watch (i.e. result of apply_predictions, apply_embeddings, train, topics.regenerate)
+            listener (Callable[[TaskEvent],None], optional): called (from the watcher thread) with state change, progress and done events of this task, until it finishes or is unwatched
+
+        Returns:
+            Future: resolved with the handle once the task finishes (asyncio.wrap_future(future) to await it)
+        """
+        return self.watcher.watch(handle, listener)
+
 class ServingNodesEndpointGroup(EndpointGroup[data_model.NodeInfo]):
+    _cache_group="serving_nodes"
+    _throttle_area="serving"
 
     def get_nodes(self)-> List[data_model.NodeInfo]: 
         """Returns list of serving nodes
@@ -726,30 +1215,39 @@ class ServingNodesEndpointGroup(EndpointGroup[data_model.NodeInfo]):
         return self._call_endpoint("POST", f"/serving/nodes/{node_name}/stop", entityClass=dict)
 
     def get_node_settings(self, node_name:str)-> data_model.NodeSettings: 
-        return self._call_endpoint("GET", f"/serving/nodes-settings/{node_name}", entityClass=data_model.NodeSettings)
+        return self._call_endpoint("GET", f"/serving/nodes-settings/{node_name}", entityClass=data_model.NodeSettings, use_cache=True)
 
     def update_node_settings(self, node_name:str, settings:data_model.NodeSettings) ->data_model.NodeSettings: 
         return self._call_endpoint("PUT", f"/serving/nodes-settings/{node_name}", body=settings, entityClass=data_model.NodeSettings)
 
 
 class TopicsEndpointGroup(EndpointGroup[data_model.Topic]):
-    def get_all(self, project_id)-> List[data_model.Topic]: 
-        results=[]
-        page_size=500
-        page=0
-        while True:
-            subresults = self._call_endpoint("GET", f"/projects/{project_id}/topic/search", query_params={"skip":page_size*page,"take":page_size})
-            results+=subresults
-            page+=1
-            if not subresults:
-                break
-        return results
+    _cache_group="topics"
+    _throttle_area="topics"
+
+    def get_all(self, project_id, page_size:int=500, max_workers:int=4)-> List[data_model.Topic]: 
+        def fetch_page(skip:int, take:int):
+            return self._call_endpoint("GET", f"/projects/{project_id}/topic/search", query_params={"skip":skip,"take":take})
+        return [topic for page in iter_pages(fetch_page, page_size, max_workers=max_workers) for topic in page]
+
+    def get_index(self, project_id, metric:str="cosine")-> "TopicIndex": 
+        """Fetch all topics and stack their centroids into TopicIndex, for assigning embeddings to topics locally
+
+        Args:
+            project_id (str): Uuid of project
+            metric (str, optional): "cosine" or "euclidean". Defaults to "cosine".
+
+        Returns:
+            TopicIndex: index over topics with centroids
+        """
+        from labelatorio.topic_index import TopicIndex
+        return TopicIndex(self.get_all(project_id), metric=metric)
 
     def regenerate(self, project_id)-> "TaskStatusHandle": 
         return TaskStatusHandle(self._call_endpoint("POST", f"/projects/{project_id}/topic/regenerate", entityClass=dict), self.client)
 
     def get_topic(self, project_id, topic_id)-> data_model.Topic: 
-        return self._call_endpoint("GET", f"/projects/{project_id}/topic/{topic_id}")
+        return self._call_endpoint("GET", f"/projects/{project_id}/topic/{topic_id}", use_cache=True)
     
     def get_topic_stats(self, project_id, topic_id)-> dict: 
         return self._call_endpoint("GET", f"/projects/{project_id}/topic/{topic_id}/stats", entityClass=dict)
@@ -765,8 +1263,10 @@ class TaskStatusHandle:
         self.task_id=task_id if isinstance(task_id,str) else task_id["task_id"]
         self.client= client
         self.current_status:data_model.TaskStatus =None
+        self._done_callbacks:List[Callable[["TaskStatusHandle"],None]]=[]
 
     def __str__(self):
+        from tqdm import tqdm
         if self.current_status:
             return f"{self.current_status.task_name} "+tqdm.format_meter(self.current_status.progress_current or 0, self.current_status.progress_total or 0, elapsed=self.current_status.duration_sec or 0) + f" [{self.current_status.state}]" +(f" >> Current subtask: {self.current_status.current_subtask}" if self.current_status.current_subtask else "" + (f"task_id: {self.task_id}") )
         else:
@@ -775,6 +1275,12 @@ class TaskStatusHandle:
     def __repr__(self) -> str:
         return str(self)
 
+    def __await__(self):
+        """
+        await handle... waits until the task finishes, polling adaptively (requests run in the default executor)
+        """
+        return self.async_wait_until_finished().__await__()
+
     def wait_until_finished(self, polling_interval_sec:int = 15, timeout_sec:int = 60*60*6,  print_progress:bool=True):
         wait_itterator = self._get_wait_until_finished_polling_generator(polling_interval_sec,timeout_sec)
         last_print_len=0
@@ -788,24 +1294,48 @@ class TaskStatusHandle:
         if print_progress:
             print('\r'+str(self), end=(" "*(last_print_len-len(print_out))), flush=True)
 
+    async def async_wait_until_finished(self, polling_interval_sec:int = 15, timeout_sec:int = 60*60*6) -> "TaskStatusHandle":
+        from labelatorio._tasks import async_wait_all
+        await async_wait_all([self], timeout_sec=timeout_sec, max_interval=polling_interval_sec)
+        return self
+
+    def watch(self, listener:Optional[Callable[["TaskEvent"],None]]=None) -> "Future":
+        """
+        Registers the task with the client's background watcher (see client.tasks.watch)... returns future resolved with this handle once the task finishes
+        """
+        return self.client.tasks.watch(self, listener)
+
     def refresh_status(self):
-        self.current_status = self.client.tasks.get_task_status(self.task_id)
+        self._set_status(self.client.tasks.get_task_status(self.task_id))
         return self
     
     def is_finished(self):
         return enums.TaskStatusStates.is_done(self.current_status.state)
 
+    def add_done_callback(self, callback:Callable[["TaskStatusHandle"],None]):
+        """
+        callback(handle) is called once the task finishes (when its final status is fetched, by any wait or refresh)... immediately if it already has finished
+        """
+        if self.current_status is not None and self.is_finished():
+            callback(self)
+        else:
+            self._done_callbacks.append(callback)
+
+    def _set_status(self, status:data_model.TaskStatus):
+        self.current_status=status
+        if self._done_callbacks and status is not None and self.is_finished():
+            callbacks, self._done_callbacks = self._done_callbacks, []
+            for callback in callbacks:
+                callback(self)
+
     def _get_wait_until_finished_polling_generator(self, polling_interval_sec:int, timeout_sec:int):
-        
+        from labelatorio._tasks import next_poll_interval
+
+        # polling_interval_sec is the longest interval, tasks close to completion are polled sooner
         polling_interval_sec = polling_interval_sec if polling_interval_sec>0 else 15
-        for _it in range(int((timeout_sec+polling_interval_sec)/polling_interval_sec)):
-            if not self.refresh_status().is_finished():
-                yield self
-                time.sleep(polling_interval_sec)
-            else:
-                break
+        deadline = time.monotonic()+timeout_sec
+        while not self.refresh_status().is_finished() and time.monotonic()<deadline:
+            yield self
+            time.sleep(min(next_poll_interval(self.current_status, max_interval=polling_interval_sec), max(0,deadline-time.monotonic())))
             
         return self
-
-
-
@@ -1,6 +1,5 @@
 
 from datetime import datetime, timezone
-from dateutil import parser
 from typing import *
 from dataclasses_json import dataclass_json, config
 from dataclasses import  dataclass, field
@@ -8,10 +7,19 @@ from marshmallow import fields
 import uuid
 import labelatorio.enums as enums
 from collections.abc import Sequence 
+from array import array
+if TYPE_CHECKING:
+    import numpy as np
 
 from dataclasses import dataclass, field
 
 
+def _parse_datetime(value:str) -> datetime:
+    # dateutil is imported on first use
+    from dateutil import parser
+    return parser.parse(value)
+
+
 @dataclass_json
 @dataclass
 class TextDocument:
@@ -62,6 +70,241 @@ class TextDocument:
             ]
 
 
+_NAN=float("nan")
+
+
+class DocumentBatch(Sequence):
+    """
+    Compact column-wise container of many TextDocuments.
+
+    Instead of object with its own __dict__, lists and dicts per document, values are kept in columns:
+    label lists are shared (interned) among documents with the same labels, predicted_label_scores and _i are stored in typed arrays
+    (missing _i as -1, missing score as NaN).
+    Accessing an item (batch[i], iteration) creates a TextDocument from the columns on the fly...
+    it is a snapshot, changes made to it are not written back to the batch.
+
+    Columns can be accessed by name like in dataframe: batch["text"]
+    """
+
+    def __init__(self) -> None:
+        self._ids:List[str]=[]
+        self._keys:List[Optional[str]]=[]
+        self._texts:List[str]=[]
+        self._labels:List[Optional[Tuple[str,...]]]=[]
+        self._predicted_labels:List[Optional[Tuple[str,...]]]=[]
+        self._context_data:List[Optional[Dict[str,str]]]=[]
+        self._iindex = array("q")
+        # predicted_label_scores in CSR like layout: scores of document i are at _score_offsets[i]:_score_offsets[i+1]
+        self._score_label_names:List[str]=[]
+        self._score_label_idx:Dict[str,int]={}
+        self._score_labels = array("I")
+        self._score_values = array("d")
+        self._score_offsets = array("Q",[0])
+        self._has_scores = bytearray()
+        self._interned:Dict[Tuple[str,...],Tuple[str,...]]={}
+
+    @classmethod
+    def from_records(cls, records:Iterable[Union[dict,TextDocument]]) -> "DocumentBatch":
+        """
+        creates batch from TextDocuments or dicts (i.e. as returned by API)
+        """
+        batch = cls()
+        batch.extend(records)
+        return batch
+
+    def _intern(self, values:Optional[List[str]]) -> Optional[Tuple[str,...]]:
+        if values is None:
+            return None
+        values = tuple(values)
+        return self._interned.setdefault(values, values)
+
+    def append(self, record:Union[dict,TextDocument]) -> None:
+        get = record.get if isinstance(record, dict) else (lambda field, default=None: getattr(record, field, default))
+        self._ids.append(get(TextDocument.COL_ID))
+        self._keys.append(get(TextDocument.COL_KEY))
+        self._texts.append(get(TextDocument.COL_TEXT))
+        self._labels.append(self._intern(get(TextDocument.COL_LABELS)))
+        self._predicted_labels.append(self._intern(get(TextDocument.COL_PREDICTED_LABELS)))
+        self._context_data.append(get(TextDocument.COL_CONTEXT_DATA))
+        iindex = get(TextDocument.COL_IINDEX)
+        self._iindex.append(-1 if iindex is None else int(iindex))
+
+        scores = get(TextDocument.COL_PREDICTED_LABEL_SCORES)
+        self._has_scores.append(scores is not None)
+        if scores:
+            for label, score in scores.items():
+                label_idx = self._score_label_idx.get(label)
+                if label_idx is None:
+                    label_idx = self._score_label_idx[label] = len(self._score_label_names)
+                    self._score_label_names.append(label)
+                self._score_labels.append(label_idx)
+                # NaN stands for missing score, like -1 in _iindex
+                self._score_values.append(_NAN if score is None else score)
+        self._score_offsets.append(len(self._score_values))
+
+    def extend(self, records:Iterable[Union[dict,TextDocument]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _predicted_label_scores(self, i:int) -> Optional[Dict[str,float]]:
+        if not self._has_scores[i]:
+            return None
+        start, end = self._score_offsets[i], self._score_offsets[i+1]
+        names = self._score_label_names
+        return {names[label_idx]:(None if score!=score else score) for label_idx, score in zip(self._score_labels[start:end], self._score_values[start:end])}
+
+    def _document(self, i:int) -> TextDocument:
+        labels = self._labels[i]
+        predicted_labels = self._predicted_labels[i]
+        context_data = self._context_data[i]
+        iindex = self._iindex[i]
+        return TextDocument(
+            id=self._ids[i],
+            key=self._keys[i],
+            text=self._texts[i],
+            labels=list(labels) if labels is not None else None,
+            predicted_labels=list(predicted_labels) if predicted_labels is not None else None,
+            predicted_label_scores=self._predicted_label_scores(i),
+            context_data=dict(context_data) if context_data is not None else None,
+            _i=iindex if iindex>=0 else None,
+        )
+
+    def __getitem__(self, index:Union[int,slice,str]):
+        if isinstance(index, str):
+            return self.column(index)
+        if isinstance(index, slice):
+            return DocumentBatch.from_records(self._document(i) for i in range(*index.indices(len(self))))
+        if index<0:
+            index+=len(self)
+        if not 0<=index<len(self):
+            raise IndexError("DocumentBatch index out of range")
+        return self._document(index)
+
+    def __iter__(self) -> Iterator[TextDocument]:
+        for i in range(len(self)):
+            yield self._document(i)
+
+    def column(self, name:str) -> list:
+        """
+        values of one field for all documents
+        """
+        if name==TextDocument.COL_ID:
+            return list(self._ids)
+        elif name==TextDocument.COL_KEY:
+            return list(self._keys)
+        elif name==TextDocument.COL_TEXT:
+            return list(self._texts)
+        elif name==TextDocument.COL_LABELS:
+            return [list(val) if val is not None else None for val in self._labels]
+        elif name==TextDocument.COL_PREDICTED_LABELS:
+            return [list(val) if val is not None else None for val in self._predicted_labels]
+        elif name==TextDocument.COL_PREDICTED_LABEL_SCORES:
+            return [self._predicted_label_scores(i) for i in range(len(self))]
+        elif name==TextDocument.COL_CONTEXT_DATA:
+            return list(self._context_data)
+        elif name==TextDocument.COL_IINDEX:
+            return [val if val>=0 else None for val in self._iindex]
+        raise KeyError(name)
+
+    def keys(self) -> List[str]:
+        return [
+            TextDocument.COL_ID,
+            TextDocument.COL_KEY,
+            TextDocument.COL_TEXT,
+            TextDocument.COL_LABELS,
+            TextDocument.COL_PREDICTED_LABELS,
+            TextDocument.COL_PREDICTED_LABEL_SCORES,
+            TextDocument.COL_CONTEXT_DATA,
+            TextDocument.COL_IINDEX
+            ]
+
+    def to_dataframe(self):
+        """
+        converts the batch into pandas DataFrame indexed by _i (the same layout as export_to_dataframe, but context_data are kept in one column)
+        """
+        import pandas
+        return pandas.DataFrame({name:self.column(name) for name in self.keys()}).set_index(TextDocument.COL_IINDEX)
+
+
+class SimilarityGraph:
+    """
+    Similarity links as an edge list over document indices (position of the document id in doc_ids).
+
+    Edges are kept in typed arrays, numpy views (edges, csr) are created on demand, so the graph can be passed
+    to connected components or other graph algorithms (i.e. scipy.sparse.csgraph) without per-link python objects.
+    Each link is expected once (as returned by similarity_links.query_iter with deduplicate=True), CSR is symmetrized.
+    """
+
+    def __init__(self) -> None:
+        self.doc_ids:List[str]=[]
+        self._index:Dict[str,int]={}
+        self._sources = array("i")
+        self._targets = array("i")
+
+    @classmethod
+    def from_links(cls, links:Iterable[Tuple[dict,dict]]) -> "SimilarityGraph":
+        graph = cls()
+        for left, right in links:
+            graph.add_link(left[TextDocument.COL_ID], right[TextDocument.COL_ID])
+        return graph
+
+    def _node(self, doc_id:str) -> int:
+        index = self._index.get(doc_id)
+        if index is None:
+            index = self._index[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+        return index
+
+    def add_link(self, left_id:str, right_id:str):
+        self._sources.append(self._node(left_id))
+        self._targets.append(self._node(right_id))
+
+    def index_of(self, doc_id:str) -> Optional[int]:
+        return self._index.get(doc_id)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.doc_ids)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def edges(self) -> "np.ndarray":
+        """
+        int32 array of shape (n_links, 2) with document indices of both sides of the links
+        """
+        import numpy as np
+        return np.stack([np.frombuffer(self._sources, dtype=np.int32), np.frombuffer(self._targets, dtype=np.int32)], axis=1)
+
+    def csr(self, symmetric:bool=True) -> Tuple["np.ndarray","np.ndarray"]:
+        """
+        adjacency in CSR layout: neighbours of document i are indices[indptr[i]:indptr[i+1]]
+
+        Returns:
+            Tuple[np.ndarray,np.ndarray]: indptr, indices (both int32)
+        """
+        import numpy as np
+        edges = self.edges()
+        rows, cols = edges[:,0], edges[:,1]
+        if symmetric:
+            rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+        order = np.argsort(rows, kind="stable")
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=self.num_nodes))]).astype(np.int32)
+        return indptr, cols[order]
+
+    def to_scipy(self, symmetric:bool=True):
+        """
+        scipy.sparse.csr_matrix adjacency (requires scipy)
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        indptr, indices = self.csr(symmetric)
+        return csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(self.num_nodes, self.num_nodes))
+
+
 @dataclass_json
 @dataclass
 class ScoredDocumentResponse:
@@ -178,7 +421,7 @@ class ModelInfo:
     created_at:datetime =field(
         metadata=config(
             encoder=datetime.isoformat,
-            decoder=parser.parse,
+            decoder=_parse_datetime,
             mm_field=fields.DateTime(format='iso')
         )
     )
@@ -349,7 +592,7 @@ class NodeInfo:
         default=None,
         metadata=config(
             encoder=lambda val: datetime.isoformat(val) if val else None,
-            decoder=lambda isoString: parser.parse(isoString) if isoString else None,
+            decoder=lambda isoString: _parse_datetime(isoString) if isoString else None,
             mm_field=fields.DateTime(format='iso')
         )
     )
@@ -357,7 +600,7 @@ class NodeInfo:
         default=None,
         metadata=config(
             encoder=lambda val: datetime.isoformat(val) if val else None,
-            decoder=lambda isoString: parser.parse(isoString) if isoString else None,
+            decoder=lambda isoString: _parse_datetime(isoString) if isoString else None,
             mm_field=fields.DateTime(format='iso')
         )
     )
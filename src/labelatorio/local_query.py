@@ -0,0 +1,188 @@
+from typing import Callable, Dict, List, Union, Any
+import numpy as np
+import pandas
+from labelatorio.query_model import DocumentQueryFilter, Or
+from labelatorio.data_model import TextDocument
+
+
+NULL_VALUE="null"
+NOT_PREFIX="!"
+
+# fields holding list of values... scalar condition on them means "contains"
+LIST_FIELDS=[
+    TextDocument.COL_LABELS,
+    TextDocument.COL_PREDICTED_LABELS,
+    "false_positives",
+    "false_negatives",
+]
+
+# similarity conditions can't be evaluated without embeddings index
+SIMILARITY_FIELDS=["similar_to_phrase","similar_to_doc","similar_to_vec","min_score"]
+
+_RANGE_OPERATORS={
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+
+def compile_query(query:Union[DocumentQueryFilter,Or,Dict]) -> Callable[[pandas.DataFrame],np.ndarray]:
+    """
+    compiles the query into function that evaluates it over dataframe (as returned by export_to_dataframe) into boolean mask...
+
+    Supported conditions (the same as on server):
+     - "value"               - field equals value (or contains the value for list fields like labels)
+     - "!value"              - negation of above
+     - "null" / "!null"      - field is (not) set... empty lists are considered as null
+     - ["a","b"]             - field is one of values (or contains any of the values for list fields)
+     - {">":1,"<=":5}        - range condition
+     - predicted_label_scores={"label":0.8} - score of predicted label is at least 0.8 (or range condition as value)
+     - context_data={"field":"value"} - condition on context data field (or column of the same name in exported data)
+
+    Branches of Or are evaluated as alternatives, conditions within one filter must all match.
+    """
+    if query and "Or" in query:
+        branches = [compile_query(branch) for branch in query["Or"]]
+        def evaluate_or(data:pandas.DataFrame)->np.ndarray:
+            mask = np.zeros(len(data), dtype=bool)
+            for branch in branches:
+                mask |= branch(data)
+            return mask
+        return evaluate_or
+
+    conditions = []
+    for field, condition in (query or {}).items():
+        if condition is None:
+            continue
+        if field in SIMILARITY_FIELDS:
+            raise ValueError(f"Similarity condition '{field}' can't be evaluated locally")
+        elif field==TextDocument.COL_PREDICTED_LABEL_SCORES:
+            for label, score_condition in condition.items():
+                conditions.append(_compile_label_score_condition(label, score_condition))
+        elif field==TextDocument.COL_CONTEXT_DATA:
+            for context_field, context_condition in condition.items():
+                conditions.append(_compile_field_condition(context_field, context_condition, from_context_data=True))
+        else:
+            conditions.append(_compile_field_condition(field, condition))
+
+    def evaluate_and(data:pandas.DataFrame)->np.ndarray:
+        mask = np.ones(len(data), dtype=bool)
+        for condition in conditions:
+            mask &= condition(data)
+        return mask
+    return evaluate_and
+
+
+def evaluate_query(query:Union[DocumentQueryFilter,Or,Dict], data:Any) -> np.ndarray:
+    """
+    evaluates the query over dataframe (or pyarrow Table) and returns boolean mask of matching rows
+    """
+    return compile_query(query)(_to_dataframe(data))
+
+
+def filter_dataframe(data:Any, query:Union[DocumentQueryFilter,Or,Dict]) -> pandas.DataFrame:
+    """
+    returns rows of dataframe (or pyarrow Table) matching the query
+    """
+    data = _to_dataframe(data)
+    return data[compile_query(query)(data)]
+
+
+def _to_dataframe(data:Any) -> pandas.DataFrame:
+    if isinstance(data, pandas.DataFrame):
+        return data
+    if hasattr(data, "to_pandas"):
+        # pyarrow Table / RecordBatch
+        return data.to_pandas()
+    if isinstance(data, list):
+        return pandas.DataFrame([dict(rec) if not isinstance(rec, dict) else rec for rec in data])
+    raise TypeError(f"Unsupported data type: {type(data)}")
+
+
+def _get_column(data:pandas.DataFrame, field:str, from_context_data:bool=False) -> pandas.Series:
+    if field in data.columns:
+        return data[field].reset_index(drop=True)
+    if field==TextDocument.COL_IINDEX and data.index.name==TextDocument.COL_IINDEX:
+        return data.index.to_series().reset_index(drop=True)
+    if from_context_data and TextDocument.COL_CONTEXT_DATA in data.columns:
+        return data[TextDocument.COL_CONTEXT_DATA].map(lambda ctx: ctx.get(field) if isinstance(ctx, dict) else None).reset_index(drop=True)
+    return pandas.Series([None]*len(data), dtype=object)
+
+
+def _is_null(column:pandas.Series, is_list_field:bool) -> np.ndarray:
+    if is_list_field:
+        return column.map(_is_empty).to_numpy(dtype=bool)
+    return column.isna().to_numpy()
+
+
+def _is_empty(val) -> bool:
+    if val is None or (isinstance(val, float) and np.isnan(val)):
+        return True
+    if isinstance(val, (list, tuple, np.ndarray)):
+        return len(val)==0
+    return False
+
+
+def _contains_any(column:pandas.Series, values:List) -> np.ndarray:
+    exploded = column.explode()
+    hits = exploded.isin(values)
+    return hits.groupby(level=0).any().reindex(column.index, fill_value=False).to_numpy(dtype=bool)
+
+
+def _compile_field_condition(field:str, condition:Any, from_context_data:bool=False) -> Callable[[pandas.DataFrame],np.ndarray]:
+    is_list_field = field in LIST_FIELDS
+
+    if isinstance(condition, dict):
+        return _compile_range_condition(field, condition, from_context_data)
+
+    negate = False
+    if isinstance(condition, str) and condition.startswith(NOT_PREFIX):
+        negate = True
+        condition = condition[len(NOT_PREFIX):]
+
+    if condition==NULL_VALUE:
+        def evaluate(data:pandas.DataFrame)->np.ndarray:
+            return _is_null(_get_column(data, field, from_context_data), is_list_field)
+    else:
+        values = list(condition) if isinstance(condition, (list, tuple, set)) else [condition]
+        def evaluate(data:pandas.DataFrame)->np.ndarray:
+            column = _get_column(data, field, from_context_data)
+            if is_list_field:
+                return _contains_any(column, values)
+            return column.isin(values).to_numpy(dtype=bool)
+
+    if negate:
+        return lambda data: ~evaluate(data)
+    return evaluate
+
+
+def _compile_range_condition(field:str, condition:Dict[str,Any], from_context_data:bool=False) -> Callable[[pandas.DataFrame],np.ndarray]:
+    for operator in condition:
+        if operator not in _RANGE_OPERATORS:
+            raise ValueError(f"Unsupported range operator '{operator}' for field '{field}'")
+
+    def evaluate(data:pandas.DataFrame)->np.ndarray:
+        column = _get_column(data, field, from_context_data)
+        return _evaluate_range(column, condition)
+    return evaluate
+
+
+def _evaluate_range(column:pandas.Series, condition:Dict[str,Any]) -> np.ndarray:
+    not_null = column.notna().to_numpy()
+    values = column.to_numpy()
+    mask = not_null.copy()
+    for operator, bound in condition.items():
+        with np.errstate(invalid="ignore"):
+            mask[not_null] &= _RANGE_OPERATORS[operator](values[not_null], bound).astype(bool)
+    return mask
+
+
+def _compile_label_score_condition(label:str, condition:Union[float,Dict[str,float]]) -> Callable[[pandas.DataFrame],np.ndarray]:
+    if not isinstance(condition, dict):
+        condition={">=":condition}
+
+    def evaluate(data:pandas.DataFrame)->np.ndarray:
+        scores = _get_column(data, TextDocument.COL_PREDICTED_LABEL_SCORES).map(lambda val: val.get(label) if isinstance(val, dict) else None)
+        return _evaluate_range(scores.astype(float), condition)
+    return evaluate
@@ -3,8 +3,26 @@ from typing import Dict, List, Union, Optional
 from pydantic import BaseModel, root_validator
 import requests
 import logging
-import aiohttp
-import json
+import threading
+import time
+from contextlib import nullcontext
+from ._codec import get_codec, JSON_HEADERS
+from ._singleflight import SingleFlight, AsyncSingleFlight, request_key
+from ._retry import RetryPolicy, NO_RETRY
+from ._throttle import Throttle
+from ._circuit import CircuitBreaker, CircuitOpenError
+from ._metrics import Metrics, CallRecord
+from ._profile import Profile, operation
+
+# shared by all NodeClient instances, so i.e. many clients created at once check the node only once
+_singleflight = SingleFlight()
+_async_singleflight = AsyncSingleFlight()
+
+# one circuit breaker per node url, shared by all NodeClients calling the node
+_circuit_breakers:Dict[str,CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+MANUAL_HANDLING="manual"
 
 class PredictionRequestRecord(BaseModel):
     text:str
@@ -75,14 +93,48 @@ class Answer(BaseModel):
 
 
 
+class _AsyncResponse:
+    """
+    body and status of aiohttp response (read before the session is closed)
+    """
+    def __init__(self, status_code:int, reason:str, headers, content:bytes) -> None:
+        self.status_code=status_code
+        self.reason=reason
+        self.headers=headers
+        self.content=content
+
+
 class NodeClient:
     def __init__(self, 
             access_token: str = None,
             url: str = None,
             tennant_id:str = None,
             node_name:str = None,
-            timeout:int = 240
+            timeout:int = 240,
+            lazy:bool = False,
+            retry:Union[bool,RetryPolicy] = True,
+            throttle:Optional[Throttle] = None,
+            circuit_breaker:Union[bool,CircuitBreaker] = True,
+            fallback:Union["NodeClient",str,None] = None,
+            metrics:Union[bool,Metrics] = False
         ):
+        """
+        Args:
+            access_token (str, optional): node access token (api key)
+            url (str, optional): url of the node. If not set, tennant_id + node_name must be set
+            tennant_id (str, optional): tennant id of managed node
+            node_name (str, optional): name of managed node
+            timeout (int, optional): request timeout in seconds. Defaults to 240.
+            lazy (bool, optional): don't check the node availability on construction (blocking request), but on first call. Defaults to False.
+            retry (Union[bool,RetryPolicy], optional): retry calls the node didn't process (failed connect, 429, 503) with backoff... timed out calls are not repeated. Defaults to True.
+            throttle (Throttle, optional): rate and adaptive concurrency limit, can be shared with other NodeClients or with Client ("serving" area). Defaults to None.
+            circuit_breaker (Union[bool,CircuitBreaker], optional): fail fast (CircuitOpenError) after consecutive failures of the node instead of waiting for timeouts. 
+                True for default breaker shared by all clients of the node, CircuitBreaker instance to customize, False to disable. Defaults to True.
+            fallback (Union[NodeClient,str], optional): what to do while the circuit is open... alternate NodeClient to call instead, 
+                or "manual" to return predictions/answers with handling="manual" (embeddings still raise). Defaults to None (raise CircuitOpenError).
+            metrics (Union[bool,Metrics], optional): record latency, bytes, decode time, retries and status codes of calls (in self.metrics). 
+                Pass Client's Metrics instance to collect both in one place. Defaults to False.
+        """
 
         if not url:
             if not node_name or not tennant_id :
@@ -91,12 +143,137 @@ class NodeClient:
                 url = f"https://api.labelator.io/nodes/{tennant_id}/{node_name}"
         
 
-        if not requests.get(url, timeout=timeout).status_code==200:
-            raise Exception(f"Unable to contact node at {url}")
         self.url=url.rstrip("/")
         self.headers={"access_token": access_token}
         self.timeout=timeout
+        self.retry_policy:RetryPolicy= RetryPolicy() if retry is True else (retry or NO_RETRY)
+        self.throttle=throttle
+        if circuit_breaker is True:
+            circuit_breaker = self._shared_circuit_breaker()
+        self.circuit_breaker:Optional[CircuitBreaker]=circuit_breaker or None
+        if fallback is not None and fallback!=MANUAL_HANDLING and not isinstance(fallback, NodeClient):
+            raise ValueError(f"fallback is expected to be NodeClient or \"{MANUAL_HANDLING}\"")
+        self.fallback=fallback
+        self.metrics:Optional[Metrics]= (Metrics() if metrics is True else metrics) or None
+        self._available=False
+        if not lazy:
+            self._ensure_available()
+
+    def _ensure_available(self):
+        if not self._available:
+            if not self.is_available():
+                raise Exception(f"Unable to contact node at {self.url}")
+            self._available=True
+
+    async def _aensure_available(self):
+        if not self._available:
+            if not await self.ais_available():
+                raise Exception(f"Unable to contact node at {self.url}")
+            self._available=True
+
+    def _shared_circuit_breaker(self)->CircuitBreaker:
+        with _circuit_breakers_lock:
+            breaker = _circuit_breakers.get(self.url)
+            if breaker is None:
+                url = self.url
+                def probe():
+                    return requests.get(url, timeout=10).status_code==200
+                breaker = _circuit_breakers[url] = CircuitBreaker(probe=probe, name=url)
+            return breaker
+
+    def _fallback_for(self, error:CircuitOpenError)->Optional["NodeClient"]:
+        """alternate node to call while the circuit is open, None for manual handling... raises the error if there is no fallback"""
+        if self.fallback is None:
+            raise error
+        if isinstance(self.fallback, NodeClient):
+            return self.fallback
+        return None
+
+    def _post(self, path:str, payload=None, params:dict=None)->requests.Response:
+        call = self.metrics.start("node", "POST", path) if self.metrics is not None else None
+        data = get_codec().dumps(payload) if payload is not None else None
+        headers = {**self.headers, **JSON_HEADERS} if payload is not None else self.headers
+        def request():
+            return requests.post(f"{self.url}{path}", data=data, headers=headers, params=params, timeout=self.timeout)
+        def send():
+            attempt = request if call is None else (lambda: call.attempt(request, data))
+            return self.throttle.call(attempt, path) if self.throttle is not None else attempt()
+        try:
+            # predictions can write review records and a timed out call may still be running on the node... 
+            # so node calls are retried only if the node surely didn't process them (failed connect, 429, 503)
+            # every attempt goes through the breaker, so it opens (and stops the retries) without waiting for all attempts to fail
+            if self.circuit_breaker is None:
+                response = self.retry_policy.call("POST", send)
+            else:
+                response = self.retry_policy.call("POST", lambda: self.circuit_breaker.call(send))
+        except BaseException as ex:
+            if call is not None:
+                call.failed(ex)
+            raise
+        return _received(response, call)
+
+    async def _apost(self, path:str, payload=None, params:dict=None)->_AsyncResponse:
+        import aiohttp
+        call = self.metrics.start("node", "POST", path) if self.metrics is not None else None
+        data = get_codec().dumps(payload) if payload is not None else None
+        headers = {**self.headers, **JSON_HEADERS} if payload is not None else self.headers
+        async with aiohttp.ClientSession() as session:
+            async def request():
+                start = time.perf_counter()
+                async with session.post(f"{self.url}{path}", data=data, headers=headers, params=params, timeout=self.timeout) as response:
+                    headers_received = time.perf_counter()
+                    result = _AsyncResponse(response.status, response.reason, response.headers, await response.read())
+                if call is not None:
+                    # connect time is not separated from waiting for the first byte here
+                    call.add_attempt(data, 0.0, headers_received-start, time.perf_counter()-headers_received)
+                return result
+            async def send():
+                return await (self.throttle.acall(request, path) if self.throttle is not None else request())
+            try:
+                if self.circuit_breaker is None:
+                    response = await self.retry_policy.acall("POST", send)
+                else:
+                    response = await self.retry_policy.acall("POST", lambda: self.circuit_breaker.acall(send))
+            except BaseException as ex:
+                if call is not None:
+                    call.failed(ex)
+                raise
+            return _received(response, call)
+
+    def is_available(self)->bool:
+        """Check whether the node responds (identical concurrent checks share one request)"""
+        response = _singleflight.do(request_key("GET", self.url, None, None), lambda: requests.get(self.url, timeout=self.timeout))
+        return response.status_code==200
+
+    async def ais_available(self)->bool:
+        """Async variant of is_available"""
+        import aiohttp
+        async def fetch_status():
+            async with aiohttp.ClientSession() as session:
+                async with session.get(self.url, timeout=self.timeout) as response:
+                    return response.status
+
+        return await _async_singleflight.do(request_key("GET", self.url, None, None), fetch_status)==200
+
+    @staticmethod
+    def coalescing_stats()->dict:
+        """Number of calls and collapsed calls of coalesced requests (shared by all NodeClients)"""
+        return {"sync":_singleflight.stats(), "async":_async_singleflight.stats()}
+
+    def profile(self, trace_file:Optional[str]=None) -> Profile:
+        """Profiles calls of this client inside the with block (see Client.profile)"""
+        return Profile(self, trace_file=trace_file)
+
+    def stats(self)->dict:
+        """State of circuit breaker, retries and throttling of this client (and call metrics, if enabled)"""
+        return {
+            "circuit_breaker":self.circuit_breaker.stats() if self.circuit_breaker else None,
+            "retry":self.retry_policy.stats(),
+            "throttle":self.throttle.stats() if self.throttle else None,
+            "metrics":self.metrics.stats() if self.metrics else None,
+        }
     
+    @operation("node.predict")
     def predict(
             self,
             query:Union[str, PredictionRequestRecord, List[str], List[PredictionRequestRecord]] , 
@@ -104,26 +281,32 @@ class NodeClient:
             explain=False,
             test=False
         )->PredictResponse:
+        self._ensure_available()
         if isinstance(query,str) or isinstance(query,PredictionRequestRecord):
             query=[query]
         
-        query_url = f"{self.url }/predict" 
-        response = requests.post(
-                query_url,
-                json={"texts":[req.dict() if isinstance(req,PredictionRequestRecord) else req  for req in query]}, 
-                headers=self.headers,
-                params={k:v for k,v in {"explain":explain, "text":test, "model_name":model}.items() if v},
-                timeout= self.timeout,
-            )
+        try:
+            response = self._post(
+                    "/predict",
+                    {"texts":[req.dict() if isinstance(req,PredictionRequestRecord) else req  for req in query]}, 
+                    params={k:v for k,v in {"explain":explain, "text":test, "model_name":model}.items() if v},
+                )
+        except CircuitOpenError as ex:
+            alternate = self._fallback_for(ex)
+            if alternate is not None:
+                return alternate.predict(query, model=model, explain=explain, test=test)
+            return _manual_predict_response(query)
 
         if response.status_code==200:
-            return PredictResponse(**response.json())
+            with _decoding(response):
+                return PredictResponse(**_loads(response))
         else:
             raise Exception(f"Unexpected response: {response.status_code}: {response.reason}")
     
     
 
 
+    @operation("node.apredict")
     async def apredict(
             self,
             query: Union[str, PredictionRequestRecord, List[str], List[PredictionRequestRecord]],
@@ -131,23 +314,28 @@ class NodeClient:
             explain=False,
             test=False
     ) -> PredictResponse:
+        await self._aensure_available()
         if isinstance(query, str) or isinstance(query, PredictionRequestRecord):
             query = [query]
 
-        query_url = f"{self.url}/predict"
         params = {k: v for k, v in {"explain": explain, "text": test, "model_name": model}.items() if v}
         json_payload = {"texts": [req.dict() if isinstance(req, PredictionRequestRecord) else req for req in query]}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(query_url, json=json_payload, headers=self.headers, params=params,
-                                    timeout=self.timeout) as response:
-                if response.status == 200:
-                    response_text = await response.text()
-                    data = json.loads(response_text)
-                    return PredictResponse(**data)
-                else:
-                    raise Exception(f"Unexpected response: {response.status}: {response.reason}")
+        try:
+            response = await self._apost("/predict", json_payload, params=params)
+        except CircuitOpenError as ex:
+            alternate = self._fallback_for(ex)
+            if alternate is not None:
+                return await alternate.apredict(query, model=model, explain=explain, test=test)
+            return _manual_predict_response(query)
+        if response.status_code == 200:
+            with _decoding(response):
+                data = _loads(response)
+                return PredictResponse(**data)
+        else:
+            raise Exception(f"Unexpected response: {response.status_code}: {response.reason}")
 
+    @operation("node.get_answers")
     def get_answers(
             self,
             query:Union[str, AskQuestionRecord, List[str], List[AskQuestionRecord]] , 
@@ -158,6 +346,7 @@ class NodeClient:
             additional_instructions:Optional[str]=None
         )->Union[List[Answer],Answer]:
 
+        self._ensure_available()
         return_first=False
         if not isinstance(query,list):
             query=[query]
@@ -169,55 +358,94 @@ class NodeClient:
         if additional_instructions:
             payload["additional_instructions"]=additional_instructions
         
-        query_url =  f"{self.url }/get-answer"
-        response = requests.post(
-                query_url,
-                json=payload, 
-                headers=self.headers,
-                params={k:v for k,v in {"explain":explain, "test":test,"top_k":top_k,  "model_name":model}.items() if v},
-                timeout= self.timeout,
-            )
+        try:
+            response = self._post(
+                    "/get-answer",
+                    payload, 
+                    params={k:v for k,v in {"explain":explain, "test":test,"top_k":top_k,  "model_name":model}.items() if v},
+                )
+        except CircuitOpenError as ex:
+            alternate = self._fallback_for(ex)
+            if alternate is not None:
+                result = alternate.get_answers(query, top_k=top_k, model=model, explain=explain, test=test, additional_instructions=additional_instructions)
+            else:
+                result = [Answer(predicted=None, handling=MANUAL_HANDLING, key=getattr(req,"key",None)) for req in query]
+            return result[0] if return_first else result
 
         if response.status_code==200:
-            predictions = response.json().get("predictions")
-            result = [Answer(**ans_result)for ans_result in predictions]
+            with _decoding(response):
+                predictions = _loads(response).get("predictions")
+                result = [Answer(**ans_result)for ans_result in predictions]
             if return_first:
                 return result[0]
             else:
                 return result
         else:
-            raise Exception(f"Unexpected response: {response.status_code}: {response.reason}", response.json() if response.headers.get("content-type")=="application/json" else None)
+            raise Exception(f"Unexpected response: {response.status_code}: {response.reason}", _loads(response) if response.headers.get("content-type")=="application/json" else None)
 
+    @operation("node.get_embeddings")
     def get_embeddings(
             self,
             texts:Union[str,List[str]], 
             model=None
         )->Union[List[float],List[List[float]]]:
-        query_url = f"{self.url }/embeddings" 
-        response = requests.post(
-                query_url,
-                json={"texts":texts}, 
-                headers=self.headers,
-                params={ "model_name":model} if model else None,
-                timeout= self.timeout,
-            )
+        self._ensure_available()
+        try:
+            response = self._post(
+                    "/embeddings",
+                    {"texts":texts}, 
+                    params={ "model_name":model} if model else None,
+                )
+        except CircuitOpenError as ex:
+            alternate = self._fallback_for(ex)
+            if alternate is None:
+                # there is no manual handling of embeddings
+                raise
+            return alternate.get_embeddings(texts, model=model)
 
         if response.status_code==200:
-            return response.json().get("embeddings")
+            with _decoding(response):
+                return _loads(response).get("embeddings")
         else:
             raise Exception(f"Unexpected response: {response.status_code}: {response.reason}")
 
     def force_refresh(
             self
         )->None:
-        
-        response = requests.post(
-                f"{self.url}/refresh",
-                headers=self.headers,
-                timeout= self.timeout,
-            )
+        self._ensure_available()
+        response = self._post("/refresh")
 
         if response.status_code==200:
-            return
+            with _decoding(response):
+                return
         else:
-            raise Exception(f"Unexpected response: {response.status_code}: {response.reason}")
\ No newline at end of file
+            raise Exception(f"Unexpected response: {response.status_code}: {response.reason}")
+
+
+def _received(response, call:Optional[CallRecord]):
+    if call is not None:
+        call.received(response)
+        if response.status_code==200:
+            # finished after the response is decoded, see _decoding
+            response._metrics_call=call
+        else:
+            call.finish()
+    return response
+
+
+def _loads(response):
+    # JSON parsing, timed separately from model construction
+    data = get_codec().loads(response.content)
+    call = getattr(response, "_metrics_call", None)
+    if call is not None:
+        call.parsed()
+    return data
+
+
+def _decoding(response):
+    call = getattr(response, "_metrics_call", None)
+    return call.decoding() if call is not None else nullcontext()
+
+
+def _manual_predict_response(query:list)->PredictResponse:
+    return PredictResponse(predictions=[PredictedItem(predicted=None, handling=MANUAL_HANDLING, key=getattr(req,"key",None)) for req in query])
@@ -0,0 +1,102 @@
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from labelatorio.data_model import Topic
+
+METRICS=("cosine","euclidean")
+
+
+class TopicIndex:
+    """
+    Topic centroids stacked in one float32 matrix, for assigning new embeddings (i.e. from NodeClient.get_embeddings)
+    to the nearest topics locally, in vectorized batches.
+
+    Topics without centroid are skipped.
+    """
+
+    def __init__(self, topics:List[Topic], metric:str="cosine") -> None:
+        """
+        Args:
+            topics (List[Topic]): topics with centroids (i.e. client.topics.get_all)
+            metric (str, optional): "cosine" (scores are similarities, higher is closer) or "euclidean" (scores are distances, lower is closer). Defaults to "cosine".
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric {metric}, supported: {METRICS}")
+        self.metric=metric
+        self.topics:List[Topic]=[topic for topic in topics if topic.centroid]
+        self.topic_ids:List[str]=[topic.topic_id for topic in self.topics]
+        if self.topics:
+            self.centroids=np.asarray([topic.centroid for topic in self.topics], dtype=np.float32)
+        else:
+            self.centroids=np.empty((0,0), dtype=np.float32)
+
+        if metric=="cosine":
+            self._matrix=_normalize(self.centroids)
+        else:
+            self._matrix=self.centroids
+            self._squared_norms=np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.topics)
+
+    def _scores(self, embeddings:np.ndarray) -> np.ndarray:
+        if self.metric=="cosine":
+            return _normalize(embeddings) @ self._matrix.T
+        squared = np.einsum("ij,ij->i", embeddings, embeddings)[:,None] - 2*(embeddings @ self._matrix.T) + self._squared_norms[None,:]
+        return np.sqrt(np.maximum(squared, 0, out=squared), out=squared)
+
+    def assign(self, embeddings:Union[List[List[float]],np.ndarray], top_k:int=1, batch_size:int=4096) -> Tuple[np.ndarray,np.ndarray]:
+        """
+        finds top_k nearest topics of each embedding
+
+        Args:
+            embeddings (Union[List[List[float]],np.ndarray]): embeddings of shape (n, dim), or single embedding
+            top_k (int, optional): number of nearest topics. Defaults to 1.
+            batch_size (int, optional): embeddings scored at once (limits size of the score matrix). Defaults to 4096.
+
+        Returns:
+            Tuple[np.ndarray,np.ndarray]: topic positions (index into topics / topic_ids) and scores, both of shape (n, top_k), nearest first
+        """
+        if not self.topics:
+            raise ValueError("Index has no topics with centroids")
+        embeddings=np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim==1:
+            embeddings=embeddings[None,:]
+        if embeddings.shape[1]!=self.centroids.shape[1]:
+            raise ValueError(f"Embedding dimension {embeddings.shape[1]} doesn't match centroid dimension {self.centroids.shape[1]}")
+
+        top_k=min(top_k, len(self.topics))
+        indices=np.empty((len(embeddings), top_k), dtype=np.int64)
+        scores=np.empty((len(embeddings), top_k), dtype=np.float32)
+        # similarity is maximized, distance minimized... rank by "closeness"
+        sign = -1 if self.metric=="cosine" else 1
+        for start in range(0, len(embeddings), batch_size):
+            batch_scores=self._scores(embeddings[start:start+batch_size])
+            closeness=batch_scores*sign
+            if top_k<len(self.topics):
+                candidates=np.argpartition(closeness, top_k-1, axis=1)[:,:top_k]
+            else:
+                candidates=np.broadcast_to(np.arange(len(self.topics)), closeness.shape)
+            order=np.argsort(np.take_along_axis(closeness, candidates, axis=1), axis=1, kind="stable")
+            batch_indices=np.take_along_axis(candidates, order, axis=1)
+            indices[start:start+batch_size]=batch_indices
+            scores[start:start+batch_size]=np.take_along_axis(batch_scores, batch_indices, axis=1)
+        return indices, scores
+
+    def nearest_topics(self, embeddings:Union[List[List[float]],np.ndarray], min_score:Optional[float]=None) -> List[Optional[Topic]]:
+        """
+        nearest topic of each embedding... None if the score is worse than min_score (similarity below, or distance above it)
+        """
+        indices, scores=self.assign(embeddings, top_k=1)
+        result=[]
+        for index, score in zip(indices[:,0], scores[:,0]):
+            if min_score is not None and (score<min_score if self.metric=="cosine" else score>min_score):
+                result.append(None)
+            else:
+                result.append(self.topics[index])
+        return result
+
+
+def _normalize(matrix:np.ndarray) -> np.ndarray:
+    norms=np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms==0]=1
+    return matrix/norms
@@ -0,0 +1,36 @@
+import json
+from benchmarks.fake_server import FakeConfig, FakeLabelatorioServer, FakeServingNode, PROJECT_ID
+from benchmarks.suite import run, format_results, main
+import labelatorio
+
+
+def test_suite_runs_with_injected_errors():
+    config = FakeConfig(documents=300, vector_dim=8, error_rate=0.05, task_duration=0)
+    results = run(["export.query_iter", "import.add_documents", "predict.batch_16", "tasks.wait_all"], config, repeat=1, warmup=0)
+    assert results["results"]["export.query_iter"]["items"]==300
+    assert results["results"]["import.add_documents"]["items"]==300
+    assert results["results"]["predict.batch_16"]["items"]==1000
+    assert results["results"]["tasks.wait_all"]["items"]==20
+    assert "tasks.wait_all" in format_results(results, baseline=results)
+
+
+def test_fake_servers_endpoints():
+    with FakeLabelatorioServer(FakeConfig(documents=120, vector_dim=4, topics=7)) as api, FakeServingNode(FakeConfig(vector_dim=4)) as node:
+        client = labelatorio.Client("token", url=api.url, lazy=True)
+        assert client.documents.count(PROJECT_ID)==120
+        assert len(client.documents.export_to_dataframe(PROJECT_ID))==120
+        assert len(client.topics.get_all(PROJECT_ID, page_size=5))==7
+        assert [len(item["vector"]) for item in client.documents.get_vectors(PROJECT_ID, ["a","b"])]==[4,4]
+        assert len(client.similarity_links.query(PROJECT_ID, "SIMILAR", take=10))==240
+
+        node_client = labelatorio.NodeClient("token", url=node.url)
+        assert len(node_client.predict(["a","b"]).predictions)==2
+        assert len(node_client.get_embeddings("text"))==4
+
+
+def test_saved_results_compare(tmp_path, capsys):
+    saved = tmp_path/"results.json"
+    main(["--only", "decode", "--documents", "100", "--repeat", "1", "--warmup", "0", "--save", str(saved)])
+    main(["--only", "decode", "--documents", "100", "--repeat", "1", "--warmup", "0", "--compare", str(saved)])
+    assert "decode.documents" in json.loads(saved.read_text())["results"]
+    assert "warning" not in capsys.readouterr().out, "same configuration should be comparable"
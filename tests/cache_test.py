@@ -0,0 +1,59 @@
+from labelatorio._cache import ResponseCache
+from tests.fakes import FakeResponse
+
+
+def test_cache_hit_and_revalidation():
+    cache = ResponseCache(ttl_sec={"projects":60})
+    sent = []
+    def send(extra_headers):
+        sent.append(extra_headers)
+        return FakeResponse(304) if extra_headers else FakeResponse(200, {"id":"1"}, headers={"ETag":"v1"})
+
+    key = cache.make_key("projects/1", None)
+    assert cache.fetch("projects", key, send).json()=={"id":"1"}
+    assert cache.fetch("projects", key, send).json()=={"id":"1"}
+    assert len(sent)==1, "second call should be served from cache"
+
+    cache._entries[key].expires_at=0
+    assert cache.fetch("projects", key, send).json()=={"id":"1"}
+    assert sent[-1]=={"If-None-Match":"v1"}, "expired entry should be revalidated by etag"
+    assert cache.revalidated==1
+
+
+def test_cache_invalidation_and_lru():
+    cache = ResponseCache(max_entries=2)
+    send = lambda extra_headers: FakeResponse(200, {})
+    for i in range(3):
+        cache.fetch("projects", cache.make_key(f"projects/{i}", None), send)
+    assert len(cache)==2, "least recently used entry should be evicted"
+
+    cache.fetch("models", cache.make_key("models/info/x", {"project_id":"1"}), send)
+    cache.invalidate("projects")
+    assert len(cache)==1, "only entries of invalidated group should be dropped"
+
+
+def test_cache_key_per_token():
+    cache = ResponseCache()
+    assert cache.make_key("projects/1", None, "Basic a")!=cache.make_key("projects/1", None, "Basic b")
+    assert cache.make_key("projects/1", None, "Basic a")==cache.make_key("projects/1", None, "Basic a")
+
+
+def test_only_metadata_endpoints_cached(monkeypatch):
+    from labelatorio import Client
+    from labelatorio.client import EndpointGroup
+    sent = []
+    def send(self, method, request_url, *args, **kwargs):
+        sent.append(request_url)
+        model = {"id":"m1", "project_id":"p1", "model_name":"m1", "task_type":None, "created_at":"2022-01-01T00:00:00"}
+        return FakeResponse(200, [model] if request_url.endswith("/models") else model)
+    monkeypatch.setattr(EndpointGroup, "_send", send)
+
+    cache = ResponseCache()
+    client = Client("a", url="http://localhost:1", lazy=True, cache=cache)
+    other_tenant = Client("b", url="http://localhost:1", lazy=True, cache=cache)
+    for _ in range(2):
+        client.models.get_info("m1", project_id="p1")
+        client.models.get_all("p1")
+    other_tenant.models.get_info("m1", project_id="p1")
+    assert sent.count("http://localhost:1/models/info/m1")==2, "get_info should be cached per token"
+    assert sent.count("http://localhost:1/projects/p1/models")==2, "volatile get_all shouldn't be cached"
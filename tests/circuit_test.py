@@ -0,0 +1,76 @@
+import pytest
+from labelatorio._circuit import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from labelatorio.serving import NodeClient
+from tests.fakes import FakeResponse
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    breaker.call(lambda: FakeResponse(500))
+    breaker.call(lambda: FakeResponse(404))
+    assert breaker.state==CLOSED, "4xx should not count as node failure"
+    breaker.call(lambda: FakeResponse(502))
+    breaker.call(lambda: FakeResponse(503))
+    assert breaker.state==OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: FakeResponse(200))
+    assert breaker.stats()["rejected"]==1
+
+
+def test_half_open_probe():
+    probes=[]
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0, probe=lambda: probes.append(1) or len(probes)>1)
+    breaker.record_failure()
+    assert breaker.state==HALF_OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: FakeResponse(200))
+    assert breaker.call(lambda: FakeResponse(200)).status_code==200, "successful probe should let the call through"
+    assert breaker.state==CLOSED
+
+
+def test_node_client_manual_fallback():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    client = NodeClient("token", url="http://localhost:1", lazy=True, retry=False, circuit_breaker=breaker, fallback="manual")
+    client._available=True
+    breaker.record_failure()
+
+    response = client.predict(["text", "other text"])
+    assert [item.handling for item in response.predictions]==["manual","manual"]
+    assert client.stats()["circuit_breaker"]["state"]==OPEN
+
+    with pytest.raises(CircuitOpenError):
+        client.get_embeddings("text")
+
+
+def test_each_node_call_attempt_counts(monkeypatch):
+    import requests
+    from labelatorio._retry import RetryPolicy
+    calls=[]
+    def post(*args, **kwargs):
+        calls.append(1)
+        return FakeResponse(503)
+    monkeypatch.setattr(requests, "post", post)
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    client = NodeClient("token", url="http://localhost:1", lazy=True, retry=RetryPolicy(max_retries=5, backoff_base=0), circuit_breaker=breaker, fallback="manual")
+    client._available=True
+
+    assert client.predict("text").predictions[0].handling=="manual"
+    assert len(calls)==2, "retries should stop once the circuit opens"
+    assert breaker.state==OPEN
+
+
+def test_cancelled_call_is_not_node_failure():
+    import asyncio
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    async def send():
+        await asyncio.sleep(10)
+    async def cancel():
+        task = asyncio.ensure_future(breaker.acall(send))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(cancel())
+    assert breaker.state==CLOSED and breaker.consecutive_failures==0
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from labelatorio._codec import StdlibJsonCodec, OrjsonCodec
+
+
+def _codecs():
+    codecs = [StdlibJsonCodec()]
+    try:
+        codecs.append(OrjsonCodec())
+    except ImportError:
+        pass
+    return codecs
+
+
+@pytest.mark.parametrize("codec", _codecs(), ids=lambda codec: codec.name)
+def test_codec_roundtrip_with_numpy(codec):
+    payload = {"similar_to_vec":np.array([0.5,1.5], dtype=np.float32), "key":np.int64(3), "id":["a","b"], "text":"ěščř"}
+    decoded = codec.loads(codec.dumps(payload))
+    assert decoded=={"similar_to_vec":[0.5,1.5], "key":3, "id":["a","b"], "text":"ěščř"}
+    assert isinstance(codec.dumps({}), bytes)
+
+
+def test_incomplete_codec_fails_on_creation():
+    from labelatorio._codec import JsonCodec
+    class DumpsOnly(JsonCodec):
+        def dumps(self, obj):
+            return b"{}"
+    with pytest.raises(TypeError):
+        DumpsOnly()
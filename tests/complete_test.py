@@ -49,6 +49,8 @@ def test_complete_scenario():
     client.documents.set_labels(project_id,ids[:10],["A"])
     client.documents.set_labels(project_id,ids[10:20],["B"])
     client.documents.set_labels(project_id,ids[20:30],["C"])
+    failed = client.documents.set_labels_bulk(project_id, {doc_id:["A"] if i<10 else ["B"] for i,doc_id in enumerate(ids[:20])}, max_group_size=3)
+    assert not failed, f"bulk labeling failed for: {failed}"
     
     data_df = client.documents.export_to_dataframe(project_id=project_id)
     assert len(data_df)==len(ids), "Size of exported DF doesnt match what we've imported"
@@ -62,6 +64,11 @@ def test_complete_scenario():
     client.documents.exclude(project_id, [ids[-1]])
 
     client.documents.delete(project_id, ids[-2])
+    client.documents.delete_many(project_id, ids[-5:-3], chunk_size=1)
+
+    fetched, missing = client.documents.get_many(project_id, ids[:5]+[ids[-2]], chunk_size=2)
+    assert [doc.id for doc in fetched]==ids[:5], "documents should be returned in order of requested ids"
+    assert missing==[ids[-2]], "deleted document should be reported as missing"
 
 
     found = client.documents.search(project_id, key="1")[0]
@@ -71,6 +78,9 @@ def test_complete_scenario():
     found = client.documents.query(project_id, query=DocumentQueryFilter(key="1").Or(DocumentQueryFilter(key="2")))
     assert len(found)==2, f"two records queried, but got {len(found)}"
 
+    iterated = list(client.documents.query_iter(project_id, query=DocumentQueryFilter(labels="!null"), page_size=7))
+    assert len(iterated)==30, f"30 labeled records should be iterated, but got {len(iterated)}"
+
     client.documents.delete_by_query(project_id, {"id":ids[10:20]})
     
     found = client.documents.search(project_id, false_positives="ClassA")
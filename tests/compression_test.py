@@ -0,0 +1,49 @@
+import gzip
+import json
+import zlib
+from labelatorio._compression import Compression
+
+
+class _FakeRaw:
+    def __init__(self, received:int):
+        self.received=received
+
+    def tell(self):
+        return self.received
+
+
+class _FakeResponse:
+    def __init__(self, content:bytes, received:int):
+        self.content=content
+        self.raw=_FakeRaw(received)
+
+
+def test_compress_above_threshold():
+    compression = Compression(min_size=1024)
+    body = json.dumps([{"text":"some repeating text of a document"}]*200).encode("utf-8")
+
+    data, encoding = compression.compress(body)
+    assert encoding=="gzip"
+    assert gzip.decompress(data)==body, "compressed body should decompress to original"
+
+    small, encoding = compression.compress(b'{"id":"1"}')
+    assert encoding is None and small==b'{"id":"1"}', "small bodies should be sent uncompressed"
+
+    stats = compression.stats()
+    assert stats["requests_compressed"]==1
+    assert stats["request_ratio"]>5
+
+
+def test_deflate_and_disabled():
+    body = b"x"*10000
+    data, encoding = Compression("deflate", min_size=0).compress(body)
+    assert encoding=="deflate" and zlib.decompress(data)==body
+
+    data, encoding = Compression(None).compress(body)
+    assert encoding is None and data is body, "disabled compression should not touch the body"
+
+
+def test_response_ratio():
+    compression = Compression()
+    compression.record_response(_FakeResponse(b"x"*1000, 100))
+    assert compression.response_ratio==10.0
@@ -0,0 +1,80 @@
+import warnings
+from labelatorio import data_model
+from labelatorio._decoders import decode, get_decoder
+
+
+_TEST_RECORDS = {
+    data_model.TextDocument:[
+        {"id":"a","key":"1","text":"first","labels":["A"],"predicted_labels":["A","B"],"predicted_label_scores":{"A":1,"B":0.25},"context_data":{"c":"x"},"_i":3},
+        {"id":"b","key":None,"text":"second","unknown_field":1},
+        {"id":"c","key":12,"text":"third","labels":None,"_i":"4"},
+    ],
+    data_model.ScoredDocumentResponse:[
+        {"score":1,"doc":{"id":"a","key":"1","text":"first","labels":["A"]}},
+    ],
+    data_model.Topic:[
+        {"topic_id":"t","topic_name":"name","topic_keywords":[{"word":"w","score":0.5}],"representative_samples":[{"id":"a","key":"1","text":"first"}],"size":3,"centroid":[0.1,1,-2.5]},
+        {"topic_id":"t2","topic_name":"other"},
+    ],
+    data_model.TaskStatus:[
+        {"task_id":"t","task_name":"train","state":"RUNNING","progress_current":3,"progress_total":10,"start_time":"2023-01-02T03:04:05","timestamp":None,"duration_sec":12},
+        {"task_id":"t2"},
+    ],
+    data_model.ModelInfo:[
+        {"id":"m","project_id":"p","model_name":"model","task_type":None,"created_at":"2023-01-02T03:04:05.123Z","train_params":{"learning_rate":"0.1","split":80},"metrics":{"f1":0.9}},
+        {"id":"m2","project_id":"p","model_name":"other","task_type":"NER","created_at":"2023-01-02T03:04:05","train_params":{"labels_filter":["A"]},"is_ready":False},
+        {"id":None,"project_id":"p","model_name":"pending","task_type":None,"created_at":"2023-01-02T03:04:05","train_params":None,"metrics":None},
+    ],
+    data_model.Project:[
+        {"id":"p","name":"project","task_type":"MultiLabelTextClassification","tennant_id":"t","labels":["A","B"],"data_import_state":"DONE",
+            "statistics":{"total_count":10,"labeled_count":"3"},"label_settings":{"A":{"label":"A","color":"red","keywords":["a"]},"B":{}}},
+        {"id":None,"name":"new","statistics":None,"label_settings":None},
+    ],
+    data_model.ProjectInfo:[
+        {"id":"p","name":"project","task_type":"NER","labels":["A"],"tennant_id":"t","labeled_count":1,"total_count":"5"},
+        {"id":"p2","name":"empty","labels":[],"tennant_id":"t","labeled_count":None,"total_count":None},
+    ],
+    data_model.NodeSettings:[
+        {"default_model":"m","models":[{"project_id":"p","model_name":"m","task_type":"NER","routing":[
+                {"rule_type":"similarity","handling":"manual","anchors":["a"],"similarity_range":{"max":1,"min":0.5}},
+                {"rule_type":"prediction","handling":"model-auto","prediction_score_range":None,"predicted_labels":["A"]}]}],
+            "authorization":{"enable_public_access":True,"oidc":{"issuer":"i","client_id":"c","audience":None,"base_authorization_server_uri":None,"signature_cache_ttl":"60"}}},
+        {"models":None,"authorization":None},
+        {},
+    ],
+    data_model.NodeInfo:[
+        {"node_name":"n","deployment_type":"managed","status":"READY","last_heartbeat":"2023-01-02T03:04:05+00:00","created_at":None},
+        {"node_name":"n2","deployment_type":"self-hosted","host_url":"http://localhost"},
+    ],
+}
+
+
+def test_decoders_match_from_dict():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for cls, records in _TEST_RECORDS.items():
+            for rec in records:
+                expected = cls.from_dict(rec)
+                decoded = get_decoder(cls)(rec)
+                assert type(decoded) is cls
+                assert repr(decoded)==repr(expected), f"{cls.__name__} decoded differently:\n{decoded}\n!=\n{expected}"
+            assert decode(cls, records)==[cls.from_dict(rec) for rec in records]
+
+
+def test_decoded_collections_are_copies():
+    rec = {"id":"a","key":"1","text":"first","labels":["A"]}
+    doc = get_decoder(data_model.TextDocument)(rec)
+    doc.labels.append("B")
+    assert rec["labels"]==["A"], "decoded object should not share mutable data with source dict"
+
+
+def test_response_classes_are_covered():
+    import dataclasses
+    from labelatorio.client import EndpointGroup
+    # entity types of endpoint groups, and classes decoded by explicit entityClass
+    response_classes = {data_model.ScoredDocumentResponse, data_model.ProjectInfo, data_model.NodeSettings}
+    for group in EndpointGroup.__subclasses__():
+        entity = group.__new__(group)._get_entity_type()
+        if dataclasses.is_dataclass(entity):
+            response_classes.add(entity)
+    assert response_classes<=set(_TEST_RECORDS), f"missing equivalence cases: {response_classes-set(_TEST_RECORDS)}"
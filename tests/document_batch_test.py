@@ -0,0 +1,37 @@
+from labelatorio.data_model import DocumentBatch, TextDocument
+
+
+_RECORDS = [
+    {"id":"a","key":"1","text":"first","labels":["A"],"predicted_labels":["A"],"predicted_label_scores":{"A":0.9,"B":0.1},"context_data":{"c":"x"},"_i":0},
+    {"id":"b","key":None,"text":"second","labels":["A"],"predicted_label_scores":{},"_i":1},
+    {"id":"c","key":"3","text":"third"},
+]
+
+
+def test_batch_items_equal_documents():
+    batch = DocumentBatch.from_records(_RECORDS)
+    expected = [TextDocument.from_dict(rec) for rec in _RECORDS]
+    assert len(batch)==3
+    assert list(batch)==expected
+    assert batch[-1]==expected[-1]
+    assert list(batch[1:])==expected[1:]
+    assert DocumentBatch.from_records(expected)[0]==expected[0], "batch can be created from TextDocuments as well"
+
+
+def test_mapping_style_access():
+    batch = DocumentBatch.from_records(_RECORDS)
+    assert batch[0]["labels"]==["A"] and "text" in batch[0]
+    assert batch["key"]==["1",None,"3"]
+    assert batch["_i"]==[0,1,None]
+    assert batch._labels[0] is batch._labels[1], "identical label lists should be shared"
+
+    doc = batch[0]
+    doc.labels.append("B")
+    assert batch[0].labels==["A"], "items are snapshots"
+
+
+def test_missing_score():
+    record = {"id":"a","key":"1","text":"first","predicted_label_scores":{"A":None,"B":0.5}}
+    batch = DocumentBatch.from_records([record])
+    assert batch[0]==TextDocument(id="a", key="1", text="first", predicted_label_scores={"A":None,"B":0.5})
+    assert batch["predicted_label_scores"]==[{"A":None,"B":0.5}]
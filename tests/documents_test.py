@@ -0,0 +1,100 @@
+import pytest
+from benchmarks.fake_server import FakeConfig, FakeLabelatorioServer, PROJECT_ID
+from labelatorio import Client, DocumentQueryFilter
+
+_QUERY="projects/([^/]+)/doc/query$"
+
+
+@pytest.fixture
+def api():
+    with FakeLabelatorioServer(FakeConfig(documents=250, vector_dim=4)) as server:
+        yield server
+
+
+def _client(api:FakeLabelatorioServer)->Client:
+    return Client("token", url=api.url, lazy=True)
+
+
+def test_query_iter_keyset_paging(api):
+    docs = list(_client(api).documents.query_iter(PROJECT_ID, {}, page_size=100))
+    assert [doc._i for doc in docs]==list(range(250))
+    assert api.requests[_QUERY]==3, "page shorter than the previous ones should end paging"
+
+
+def test_query_iter_keyset_paging_capped_take(api):
+    api.config.max_take=40
+    docs = list(_client(api).documents.query_iter(PROJECT_ID, {}, page_size=100))
+    assert len(docs)==250, "pages capped by server shouldn't end paging"
+    assert api.requests[_QUERY]==7
+
+
+def test_query_iter_single_short_page(api):
+    api.config.documents=30
+    assert len(list(_client(api).documents.query_iter(PROJECT_ID, {}, page_size=100)))==30
+    assert api.requests[_QUERY]==2, "first short page may be capped, empty page ends paging"
+
+
+def test_get_many_batches_ids(api):
+    ids = [api.document_id(i) for i in range(0, 250, 7)]
+    found, missing = _client(api).documents.get_many(PROJECT_ID, ids+["unknown"]+ids[:3], chunk_size=10)
+    assert [doc.id for doc in found]==ids+ids[:3], "documents should come in order of input ids"
+    assert missing==["unknown"]
+    assert api.requests[_QUERY]==5, "37 unique ids should be fetched in 4 chunks, chunk with unknown id ends by empty page"
+
+
+def test_get_many_capped_take(api):
+    api.config.max_take=40
+    ids = [api.document_id(i) for i in range(250)]
+    found, missing = _client(api).documents.get_many(PROJECT_ID, ids, chunk_size=100)
+    assert [doc.id for doc in found]==ids and missing==[], "ids past the server cap shouldn't be reported missing"
+
+
+def test_get_many_by_key(api):
+    found, missing = _client(api).documents.get_many(PROJECT_ID, ["key-3", "key-1", "nope"], by_key=True)
+    assert [doc.key for doc in found]==["key-3", "key-1"]
+    assert missing==["nope"]
+
+
+def test_set_labels_bulk_keeps_label_order(api):
+    failed = _client(api).documents.set_labels_bulk(PROJECT_ID, {"a":["B","A","B"], "b":["B","A"], "c":["A"], "d":[]}, max_group_size=1)
+    assert failed==[]
+    assert api.labels=={"a":["B","A"], "b":["B","A"], "c":["A"], "d":[]}
+    assert api.requests["projects/([^/]+)/doc/labels$"]==4
+
+
+def test_delete_by_query_repeats_past_sync_limit(api):
+    api.config.delete_sync_limit=100
+    client = _client(api)
+    client.documents.delete_by_query(PROJECT_ID, DocumentQueryFilter(key=[f"key-{i}" for i in range(0, 250, 2)]+["key-7"]), wait_for_completion=True)
+    assert api.requests["projects/([^/]+)/doc/delete-by-query$"]==2
+    assert client.documents.count(PROJECT_ID)==124
+
+
+def test_delete_by_query_without_progress_ends(api):
+    client = _client(api)
+    client.documents._delete_by_query = lambda *args, **kwargs: None
+    with pytest.raises(Exception, match="no progress"):
+        client.documents.delete_by_query(PROJECT_ID, DocumentQueryFilter(key=["key-1"]), wait_for_completion=True)
+    with pytest.raises(ValueError):
+        client.documents.delete_by_query(PROJECT_ID, DocumentQueryFilter(similar_to_doc=api.document_id(1)), wait_for_completion=True)
+
+
+def test_delete_many_chunks(api):
+    client = _client(api)
+    client.documents.delete_many(PROJECT_ID, [api.document_id(i) for i in range(30)], chunk_size=10)
+    assert api.requests["projects/([^/]+)/doc/delete-by-query$"]==3
+    assert [doc._i for doc in client.documents.query_iter(PROJECT_ID, {})][:2]==[30, 31]
+
+
+def test_links_fetch_all_capped_take(api):
+    api.config.max_take=40
+    links = _client(api).similarity_links.query(PROJECT_ID, "positive", select=["key"])
+    assert len(links)==500, "pages capped by server shouldn't end paging"
+    assert links[0]==({"key":"key-0"}, {"key":links[0][1]["key"]}), "only selected fields should be returned"
+    assert [left["key"] for left, _ in links[:4]]==["key-0", "key-0", "key-1", "key-1"]
+
+
+def test_topics_get_all_capped_take(api):
+    api.config.max_take=15
+    topics = _client(api).topics.get_all(PROJECT_ID, page_size=20)
+    assert [topic.topic_id for topic in topics]==[f"topic-{i}" for i in range(50)], "pages capped by server shouldn't end paging"
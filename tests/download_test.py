@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+from labelatorio._download import Downloader, DownloadError, FileSpec
+
+PART_SIZE = 256*1024
+CONTENT = os.urandom(PART_SIZE*3+1000)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    requested_ranges = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        if range_header:
+            start, end = range_header.replace("bytes=","").split("-")
+            start, end = int(start), min(int(end), len(CONTENT)-1)
+            _RangeHandler.requested_ranges.append((start, end))
+            body = CONTENT[start:end+1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+        else:
+            body = CONTENT
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def file_url():
+    server = ThreadingHTTPServer(("localhost", 0), _RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _RangeHandler.requested_ranges = []
+    yield f"http://localhost:{server.server_port}/model.bin"
+    server.shutdown()
+
+
+def test_parallel_download_with_checksum(file_url, tmp_path):
+    path = str(tmp_path/"model.bin")
+    Downloader(part_size=PART_SIZE, progress=False).download([FileSpec(file_url, path, sha256=hashlib.sha256(CONTENT).hexdigest())])
+    with open(path, "rb") as downloaded:
+        assert downloaded.read()==CONTENT
+    assert len(_RangeHandler.requested_ranges)==1+4, "probe and 4 parts should be requested"
+    assert not os.path.exists(path+".part") and not os.path.exists(path+".part.json")
+
+
+def test_resume(file_url, tmp_path):
+    path = str(tmp_path/"model.bin")
+    with open(path+".part", "wb") as part_file:
+        part_file.write(CONTENT[:PART_SIZE+100])
+        part_file.truncate(len(CONTENT))
+    with open(path+".part.json", "wt") as state_file:
+        json.dump({"size":len(CONTENT), "etag":'"v1"', "part_size":PART_SIZE, "done":{"0":PART_SIZE, str(PART_SIZE):100}}, state_file)
+
+    Downloader(part_size=PART_SIZE, progress=False).download([FileSpec(file_url, path)])
+    with open(path, "rb") as downloaded:
+        assert downloaded.read()==CONTENT
+    starts = sorted(start for start, _ in _RangeHandler.requested_ranges[1:])
+    assert starts==[PART_SIZE+100, PART_SIZE*2, PART_SIZE*3], "completed bytes should not be downloaded again"
+
+
+def test_checksum_mismatch(file_url, tmp_path):
+    path = str(tmp_path/"model.bin")
+    with pytest.raises(DownloadError):
+        Downloader(part_size=PART_SIZE, progress=False).download([FileSpec(file_url, path, md5="0"*32)])
+    assert not os.path.exists(path) and not os.path.exists(path+".part")
+
+
+def test_stream_extract_leaves_nothing_on_checksum_mismatch(file_url, tmp_path, monkeypatch):
+    import io
+    import sys
+    import zipfile
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("weights/model.bin", os.urandom(100000))
+        zip_file.writestr("config.json", b"{}")
+    monkeypatch.setattr(sys.modules[__name__], "CONTENT", archive.getvalue())
+    target_dir = tmp_path/"model"
+    target_dir.mkdir()
+
+    with pytest.raises(DownloadError):
+        Downloader(progress=False).stream_extract(FileSpec(file_url, str(tmp_path/"model.zip"), md5="0"*32), str(target_dir))
+    assert os.listdir(tmp_path)==["model"] and not os.listdir(target_dir), "unverified entries should be removed"
+
+    spec = FileSpec(file_url, str(tmp_path/"model.zip"), sha256=hashlib.sha256(archive.getvalue()).hexdigest())
+    extracted = Downloader(progress=False).stream_extract(spec, str(target_dir))
+    assert sorted(os.path.relpath(path, target_dir) for path in extracted)==["config.json", os.path.join("weights", "model.bin")]
+    assert os.listdir(tmp_path)==["model"]
@@ -0,0 +1,13 @@
+import json
+
+
+class FakeResponse:
+    """ stands in for requests.Response... status, body and headers only """
+    def __init__(self, status_code:int, payload=None, headers:dict=None, content:bytes=None):
+        self.status_code=status_code
+        self.content=content if content is not None else json.dumps(payload).encode() if payload is not None else b""
+        self.text=self.content.decode()
+        self.headers=headers or {}
+
+    def json(self):
+        return json.loads(self.content)
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from labelatorio import DocumentQueryFilter
+from labelatorio.local_query import evaluate_query, filter_dataframe
+
+
+def _test_data():
+    return pd.DataFrame({
+        "_i":[0,1,2,3],
+        "id":["a","b","c","d"],
+        "key":["1","2","3","4"],
+        "text":["first","second","third","fourth"],
+        "labels":[["A"],["A","B"],[],None],
+        "predicted_labels":[["A"],["B"],["B"],None],
+        "predicted_label_scores":[{"A":0.9},{"B":0.6},{"B":0.95},None],
+        "my_context_field":["x","y",None,"x"],
+    }).set_index("_i")
+
+
+def test_field_conditions():
+    df = _test_data()
+    assert list(evaluate_query(DocumentQueryFilter(key="2"), df))==[False,True,False,False], "equality"
+    assert list(evaluate_query(DocumentQueryFilter(key="!2"), df))==[True,False,True,True], "negation"
+    assert list(evaluate_query(DocumentQueryFilter(id=["a","d"]), df))==[True,False,False,True], "list membership"
+    assert list(evaluate_query(DocumentQueryFilter(labels="B"), df))==[False,True,False,False], "list field contains"
+    assert list(evaluate_query(DocumentQueryFilter(labels="null"), df))==[False,False,True,True], "empty list is null"
+    assert list(evaluate_query(DocumentQueryFilter(labels="!null"), df))==[True,True,False,False], "not null"
+    assert list(evaluate_query(DocumentQueryFilter(_i={">":0,"<=":2}), df))==[False,True,True,False], "range over _i"
+    assert list(evaluate_query(DocumentQueryFilter(context_data={"my_context_field":"x"}), df))==[True,False,False,True], "context data"
+
+
+def test_label_scores_and_or():
+    df = _test_data()
+    assert list(evaluate_query(DocumentQueryFilter(predicted_label_scores={"B":0.9}), df))==[False,False,True,False], "score threshold"
+    query = DocumentQueryFilter(predicted_labels="A").Or(DocumentQueryFilter(predicted_labels="B", labels="null"))
+    assert list(filter_dataframe(df, query)["id"])==["a","c"], "or of and conditions"
+
+
+def test_arrow_table():
+    pyarrow = pytest.importorskip("pyarrow")
+    table = pyarrow.Table.from_pandas(_test_data().reset_index())
+    assert list(evaluate_query(DocumentQueryFilter(key=["3","4"], text="!fourth"), table))==[False,False,True,False]
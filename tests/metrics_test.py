@@ -0,0 +1,66 @@
+import pytest
+import requests
+from labelatorio import Client
+from labelatorio._metrics import Metrics, Histogram, endpoint_template
+from labelatorio._retry import RetryPolicy
+from tests.fakes import FakeResponse
+
+
+def test_endpoint_template():
+    assert endpoint_template("/projects/1234/doc/search")=="projects/{project_id}/doc/search"
+    assert endpoint_template("projects/search")=="projects/search"
+    assert endpoint_template("/projects/tasks/abc")=="projects/tasks/{task_id}"
+    assert endpoint_template("/projects/p1/doc/similar/links/SIMILAR/query")=="projects/{project_id}/doc/similar/links/{link_type}/query"
+    assert endpoint_template("/projects/p1/models/my-model/apply-predict")=="projects/{project_id}/models/{model}/apply-predict"
+    assert endpoint_template("/projects/p1/models/download-urls")=="projects/{project_id}/models/download-urls"
+    assert endpoint_template("/serving/nodes/node-1/start")=="serving/nodes/{node_name}/start"
+    assert endpoint_template("models/info/my-model")=="models/info/{model}"
+    assert endpoint_template("models/info/my-project/my-model")=="models/info/{project}/{model}"
+
+
+def test_histogram_quantiles():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.count==5 and histogram.sum==16.5
+    assert 1<=histogram.quantile(0.5)<=2
+    assert histogram.quantile(1.0)==4, "values above the last bound are reported as the last bound"
+
+
+def test_client_records_calls(monkeypatch):
+    responses=[FakeResponse(503), FakeResponse(200, {"id":"p1","name":"project"}), FakeResponse(404, {})]
+    monkeypatch.setattr(requests, "request", lambda *args, **kwargs: responses.pop(0))
+    exported=[]
+    metrics = Metrics(exporters=[exported.append])
+    client = Client("token", url="http://localhost:1", lazy=True, retry=RetryPolicy(backoff_base=0), metrics=metrics)
+
+    assert client.projects._call_endpoint("GET", "projects/p1", entityClass=dict)["name"]=="project"
+    with pytest.raises(Exception):
+        client.projects._call_endpoint("GET", "projects/p2", entityClass=dict)
+
+    stats = metrics.stats()["api GET projects/{project_id}"]
+    assert stats["calls"]==2 and stats["retries"]==1 and stats["errors"]==1
+    assert stats["status_codes"]=={200:1, 404:1}
+    assert stats["response_bytes"]>0
+    assert [call.attempts for call in exported]==[2, 1]
+    assert all(call.decode_time>=0 for call in exported)
+
+    text = metrics.to_prometheus()
+    assert 'labelatorio_request_duration_seconds_count{service="api",method="GET",endpoint="projects/{project_id}"} 2' in text
+    assert 'labelatorio_responses_total{service="api",method="GET",endpoint="projects/{project_id}",status="404"} 1' in text
+
+
+def test_disabled_by_default():
+    client = Client("token", url="http://localhost:1", lazy=True)
+    assert client.metrics is None
+
+
+def test_node_client_records_decode(monkeypatch):
+    from labelatorio.serving import NodeClient
+    monkeypatch.setattr(requests, "post", lambda *args, **kwargs: FakeResponse(200, {"embeddings":[[0.1, 0.2]]}))
+    client = NodeClient("token", url="http://localhost:1", lazy=True, circuit_breaker=False, metrics=True)
+    client._available=True
+
+    assert client.get_embeddings(["text"])==[[0.1, 0.2]]
+    stats = client.stats()["metrics"]["node POST embeddings"]
+    assert stats["calls"]==1 and stats["decode"]["count"]==1 and stats["request_bytes"]>0
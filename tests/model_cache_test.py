@@ -0,0 +1,69 @@
+import hashlib
+import os
+import threading
+from labelatorio._model_cache import ModelCache
+
+
+def _writer(files:dict, calls:list=None):
+    def populate(directory):
+        if calls is not None:
+            calls.append(directory)
+        for name, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+            with open(os.path.join(directory, name), "wb") as handle:
+                handle.write(content)
+    return populate
+
+
+def test_hit_and_content_dedupe(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    calls=[]
+    shared = os.urandom(10000)
+    path = cache.get_or_install("model-1", "2023-01-01T00:00:00", _writer({"weights.bin":os.urandom(5000), "tokenizer/vocab.txt":shared}, calls))
+    assert cache.get_or_install("model-1", "2023-01-01T00:00:00", _writer({}, calls))==path
+    assert len(calls)==1, "cached model should not be downloaded again"
+
+    other = cache.get_or_install("model-1", "2023-02-01T00:00:00", _writer({"tokenizer/vocab.txt":shared}))
+    assert other!=path, "retrained model should get new entry"
+    assert os.path.samefile(os.path.join(path, "tokenizer/vocab.txt"), os.path.join(other, "tokenizer/vocab.txt")), "same content should be stored once"
+    assert cache.size()==15000
+    assert not os.listdir(cache.tmp_dir)
+
+
+def test_lru_eviction(tmp_path):
+    cache = ModelCache(str(tmp_path), max_size_bytes=2500)
+    first = cache.get_or_install("a", None, _writer({"w":os.urandom(1000)}))
+    second = cache.get_or_install("b", None, _writer({"w":os.urandom(1000)}))
+    cache.get("a", None)
+    cache.get_or_install("c", None, _writer({"w":os.urandom(1000)}))
+    assert os.path.exists(first) and not os.path.exists(second), "least recently used model should be evicted"
+    assert cache.size()<=2500
+
+
+def test_concurrent_install(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    calls=[]
+    results=[]
+    def install():
+        results.append(cache.get_or_install("model", None, _writer({"w":b"x"*100}, calls)))
+    threads=[threading.Thread(target=install) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls)==1 and len(set(results))==1
+
+
+def test_blobs_kept_without_hard_links(tmp_path, monkeypatch):
+    def no_link(*args):
+        raise OSError("hard links not supported")
+    monkeypatch.setattr(os, "link", no_link)
+    cache = ModelCache(str(tmp_path))
+    shared = os.urandom(1000)
+    cache.get_or_install("a", None, _writer({"w":os.urandom(1000), "vocab":shared}))
+    other = cache.get_or_install("b", None, _writer({"vocab":shared}))
+    assert len(os.listdir(cache.blobs_dir))==2
+
+    cache.evict("a", None)
+    assert os.listdir(cache.blobs_dir)==[hashlib.sha256(shared).hexdigest()], "blob of the remaining model should be kept"
+    assert cache.get("b", None)==other
@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from labelatorio import Client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_PUT(self):
+        ids = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps([{"id":doc_id, "vector":[0.5]*8} for doc_id in ids]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("localhost", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_profile_get_vectors(server_url, tmp_path):
+    client = Client("token", url=server_url, lazy=True)
+    trace_path = tmp_path/"trace.json"
+    with client.profile(trace_file=str(trace_path)) as profile:
+        vectors = client.documents.get_vectors("p1", [f"doc{i}" for i in range(250)])
+    assert len(vectors)==250
+    assert client.metrics is None, "profile should restore disabled metrics"
+
+    rows = profile.rows()
+    assert [row["name"] for row in rows]==["api PUT projects/{project_id}/doc/export-vectors"]
+    row = rows[0]
+    assert row["calls"]==3 and row["errors"]==0
+    assert row["connect"]>0, "each request opens new connection"
+    assert row["total"]>=row["connect"]+row["ttfb"]+row["download"]
+    assert [record.name for record in profile.operations]==["documents.get_vectors"]
+    assert "documents.get_vectors" in profile.report(sort_by="connect")
+
+    trace = json.loads(trace_path.read_text())
+    categories = {event["cat"] for event in trace["traceEvents"]}
+    assert {"operation", "api", "phase"}<=categories
+
+
+def test_report_rejects_unknown_column():
+    client = Client("token", url="http://localhost:1", lazy=True)
+    with client.profile() as profile:
+        pass
+    with pytest.raises(ValueError):
+        profile.report(sort_by="nonsense")
+
+
+def test_profile_shared_metrics(server_url):
+    from labelatorio import NodeClient
+    from labelatorio._metrics import Metrics
+    from labelatorio._profile import Profile
+    metrics = Metrics()
+    client = Client("token", url=server_url, lazy=True, metrics=metrics)
+    node_client = NodeClient("token", url=server_url, lazy=True, metrics=metrics)
+    with Profile(client, node_client) as profile:
+        client.documents.get_vectors("p1", ["doc1"])
+    assert len(profile.calls)==1, "call recorded by shared Metrics should be exported once"
+    assert metrics.exporters==[]
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import requests
+from labelatorio._retry import RetryPolicy, RetryBudget, parse_retry_after
+from tests.fakes import FakeResponse
+
+
+def _sequence(*results):
+    results=list(results)
+    calls=[]
+    def send():
+        calls.append(1)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return send, calls
+
+
+def test_retry_until_success():
+    policy = RetryPolicy(backoff_base=0)
+    send, calls = _sequence(FakeResponse(502), requests.exceptions.ConnectionError(), FakeResponse(200))
+    assert policy.call("GET", send).status_code==200
+    assert len(calls)==3 and policy.retries==2
+
+
+def test_post_retried_only_when_not_processed():
+    policy = RetryPolicy(backoff_base=0)
+    send, calls = _sequence(FakeResponse(502), FakeResponse(200))
+    assert policy.call("POST", send).status_code==502, "POST should not be repeated after 502"
+
+    send, calls = _sequence(FakeResponse(429, headers={"Retry-After":"0"}), FakeResponse(200))
+    assert policy.call("POST", send).status_code==200, "POST should be repeated after 429"
+
+    send, calls = _sequence(FakeResponse(502), FakeResponse(200))
+    assert policy.call("POST", send, retry_safe=True).status_code==200, "retry_safe POST should be repeated"
+
+
+def test_max_retries_and_budget():
+    policy = RetryPolicy(max_retries=2, backoff_base=0)
+    send, calls = _sequence(*[FakeResponse(503)]*5)
+    assert policy.call("GET", send).status_code==503
+    assert len(calls)==3
+
+    policy = RetryPolicy(backoff_base=0, budget=RetryBudget(ratio=0, initial_tokens=1))
+    send, calls = _sequence(*[FakeResponse(503)]*5)
+    policy.call("GET", send)
+    assert len(calls)==2 and policy.budget_exhausted==1, "retries should stop when budget is exhausted"
+
+
+def test_retry_after():
+    assert parse_retry_after("3")==3
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT")==0, "date in the past means no wait"
+    assert parse_retry_after("nonsense") is None
+    policy = RetryPolicy(max_retry_after=10)
+    assert policy.delay(0, 429, {"Retry-After":"60"}) is None, "too long Retry-After should not be waited for"
+
+
+def test_async_retry():
+    policy = RetryPolicy(backoff_base=0)
+    results=[FakeResponse(504), FakeResponse(200)]
+    async def send():
+        return results.pop(0)
+    assert asyncio.run(policy.acall("GET", send)).status_code==200
+
+
+def test_task_start_and_node_calls_not_retried_after_timeout(monkeypatch):
+    from labelatorio import Client, NodeClient
+    calls=[]
+    def timeout(*args, **kwargs):
+        calls.append(1)
+        raise requests.exceptions.ReadTimeout()
+    monkeypatch.setattr(requests, "request", timeout)
+    monkeypatch.setattr(requests, "post", timeout)
+
+    client = Client("token", url="http://localhost:1", lazy=True, retry=RetryPolicy(backoff_base=0))
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.models.apply_predictions("p", "m")
+    assert len(calls)==1, "task could be started twice"
+
+    node_client = NodeClient("token", url="http://localhost:1", lazy=True, retry=RetryPolicy(backoff_base=0), circuit_breaker=False)
+    node_client._available=True
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        node_client.predict("text")
+    assert len(calls)==2, "timed out node call should not be repeated"
@@ -0,0 +1,36 @@
+from labelatorio.client import SimilarityLinkEndpointGroup
+from labelatorio.data_model import SimilarityGraph
+
+
+def _links_endpoint(links):
+    endpoint = SimilarityLinkEndpointGroup(client=None)
+    def query(project_id, link_type, select=None, query=None, fetch_all=True, skip=0, take=50):
+        return links[skip:skip+take]
+    endpoint.query = query
+    return endpoint
+
+
+def test_query_iter_drops_mirrored_links():
+    links = [({"id":"a"},{"id":"b"}), ({"id":"b"},{"id":"a"}), ({"id":"a"},{"id":"c"}), ({"id":"c"},{"id":"a"}), ({"id":"b"},{"id":"c"})]
+    endpoint = _links_endpoint(links)
+
+    result = list(endpoint.query_iter("project", "positive", page_size=2))
+    assert [(left["id"], right["id"]) for left, right in result]==[("a","b"),("a","c"),("b","c")]
+    assert len(list(endpoint.query_iter("project", "positive", page_size=2, deduplicate=False)))==5
+
+
+def test_graph_arrays():
+    graph = SimilarityGraph.from_links([({"id":"a"},{"id":"b"}), ({"id":"b"},{"id":"c"}), ({"id":"d"},{"id":"a"})])
+    assert graph.doc_ids==["a","b","c","d"]
+    assert graph.edges().tolist()==[[0,1],[1,2],[3,0]]
+
+    indptr, indices = graph.csr()
+    neighbours = {graph.doc_ids[i]:sorted(graph.doc_ids[j] for j in indices[indptr[i]:indptr[i+1]]) for i in range(graph.num_nodes)}
+    assert neighbours=={"a":["b","d"], "b":["a","c"], "c":["b"], "d":["a"]}, "csr should be symmetric"
+
+
+def test_empty_graph():
+    graph = SimilarityGraph()
+    assert graph.edges().shape==(0,2)
+    indptr, indices = graph.csr()
+    assert indptr.tolist()==[0] and len(indices)==0
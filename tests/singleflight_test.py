@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from labelatorio._singleflight import SingleFlight, AsyncSingleFlight
+
+
+def test_concurrent_calls_are_collapsed():
+    singleflight = SingleFlight()
+    executed = []
+    def slow_call():
+        executed.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(singleflight.do("key", slow_call))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results==["result"]*10
+    assert len(executed)==1, f"call should be executed once, but was executed {len(executed)} times"
+    assert singleflight.collapsed==9
+
+
+def test_async_concurrent_calls_are_collapsed():
+    singleflight = AsyncSingleFlight()
+    executed = []
+    async def slow_call():
+        executed.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*[singleflight.do("key", slow_call) for _ in range(10)])
+
+    assert asyncio.run(run())==["result"]*10
+    assert len(executed)==1 and singleflight.collapsed==9
+
+
+def test_async_cancelled_leader_doesnt_cancel_followers():
+    singleflight = AsyncSingleFlight()
+    executed = []
+    async def slow_call():
+        executed.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def run():
+        leader = asyncio.ensure_future(singleflight.do("key", slow_call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(singleflight.do("key", slow_call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+
+        alone = asyncio.ensure_future(singleflight.do("other", slow_call))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0)
+        return result, singleflight._calls
+
+    result, calls = asyncio.run(run())
+    assert result=="result" and len(executed)==2
+    assert not calls, "call without callers should be cancelled"
+
+
+def test_node_client_coalescing_stats():
+    from labelatorio.serving import NodeClient
+    client = NodeClient("token", url="http://localhost:1", lazy=True)
+    stats = client.coalescing_stats()
+    assert set(stats)=={"sync", "async"}
+    assert stats==NodeClient.coalescing_stats()
@@ -0,0 +1,131 @@
+import asyncio
+from labelatorio.client import TaskStatusHandle
+from labelatorio.data_model import TaskStatus
+from labelatorio._tasks import wait_all, as_completed, next_poll_interval, FIRST_COMPLETED
+
+
+class _FakeTasks:
+    """ each task finishes after given number of polls """
+    def __init__(self, polls_to_finish:dict):
+        self.polls_to_finish=dict(polls_to_finish)
+        self.latest_calls=0
+        self.status_calls=0
+
+    def _status(self, task_id):
+        self.polls_to_finish[task_id]-=1
+        state = "FINISHED" if self.polls_to_finish[task_id]<=0 else "RUNNING"
+        return TaskStatus(task_id=task_id, state=state, project_id="project", progress_current=9, progress_total=10, duration_sec=9)
+
+    def get_latest(self, project_id=None):
+        self.latest_calls+=1
+        return [self._status(task_id) for task_id in self.polls_to_finish]
+
+    def get_task_status(self, task_id):
+        self.status_calls+=1
+        return self._status(task_id)
+
+
+class _FakeClient:
+    def __init__(self, polls_to_finish:dict):
+        self.tasks=_FakeTasks(polls_to_finish)
+
+
+def test_next_poll_interval():
+    assert next_poll_interval(TaskStatus(task_id="t", state="RUNNING"), 1, 15)==15, "unknown progress should poll rarely"
+    assert next_poll_interval(TaskStatus(task_id="t", state="RUNNING", progress_current=1, progress_total=100, duration_sec=60), 1, 15)==15
+    assert next_poll_interval(TaskStatus(task_id="t", state="RUNNING", progress_current=99, progress_total=100, duration_sec=99), 1, 15)==1, "task close to completion should be polled soon"
+
+
+def test_wait_all_uses_one_request_per_cycle():
+    client = _FakeClient({"a":1, "b":3, "c":3})
+    handles = [TaskStatusHandle(task_id, client) for task_id in ("a","b","c")]
+    finished=[]
+    handles[1].add_done_callback(finished.append)
+
+    done, not_done = wait_all(handles, min_interval=0, max_interval=0)
+    assert set(done)==set(handles) and not not_done
+    assert finished==[handles[1]]
+    # first cycle (unknown projects) and subsequent cycles (one project) by get_latest
+    assert client.tasks.latest_calls==3 and client.tasks.status_calls==0
+
+
+def test_as_completed_order_and_first_completed():
+    client = _FakeClient({"slow":3, "fast":1})
+    handles = [TaskStatusHandle("slow", client), TaskStatusHandle("fast", client)]
+    assert [handle.task_id for handle in as_completed(handles, min_interval=0, max_interval=0)]==["fast","slow"]
+
+    client = _FakeClient({"slow":3, "fast":1})
+    handles = [TaskStatusHandle("slow", client), TaskStatusHandle("fast", client)]
+    done, not_done = wait_all(handles, return_when=FIRST_COMPLETED, min_interval=0, max_interval=0)
+    assert [handle.task_id for handle in done]==["fast"] and [handle.task_id for handle in not_done]==["slow"]
+
+
+def test_await_handle():
+    client = _FakeClient({"a":2})
+    handle = TaskStatusHandle("a", client)
+
+    async def run():
+        return await handle.async_wait_until_finished(polling_interval_sec=0)
+
+    assert asyncio.run(run()).current_status.state=="FINISHED"
+    assert client.tasks.status_calls==2
+
+
+def test_watcher_events_and_futures():
+    from labelatorio._tasks import TaskWatcher, STATE_CHANGED, PROGRESS, DONE
+    client = _FakeClient({"a":1, "b":2})
+    watcher = TaskWatcher(min_interval=0, max_interval=0)
+    events=[]
+    watcher.add_listener(lambda event: events.append((event.kind, event.handle.task_id)))
+    handles = [TaskStatusHandle(task_id, client) for task_id in ("a","b")]
+    futures = [watcher.watch(handle) for handle in handles]
+
+    assert [future.result(timeout=5) for future in futures]==handles
+    watcher.stop(timeout=5)
+    assert ("done","a") in events and ("done","b") in events
+    assert events.index((STATE_CHANGED,"b"))<events.index((DONE,"b"))
+    assert not watcher.watched
+    assert PROGRESS not in [kind for kind, _ in events], "progress didn't change in fake statuses"
+
+
+class _BrokenTasks(_FakeTasks):
+    """ task "broken" is missing in latest tasks and its status can't be fetched """
+    def get_latest(self, project_id=None):
+        self.latest_calls+=1
+        return [self._status(task_id) for task_id in self.polls_to_finish if task_id!="broken"]
+
+    def get_task_status(self, task_id):
+        if task_id=="broken":
+            raise KeyError(task_id)
+        return super().get_task_status(task_id)
+
+
+def test_watcher_fails_only_broken_task():
+    import pytest
+    from labelatorio._tasks import TaskWatcher
+    client = _FakeClient({})
+    client.tasks = _BrokenTasks({"a":2, "b":3, "broken":1})
+    watcher = TaskWatcher(min_interval=0, max_interval=0)
+    handles = [TaskStatusHandle(task_id, client) for task_id in ("a","b","broken")]
+    futures = [watcher.watch(handle) for handle in handles]
+
+    assert [future.result(timeout=5) for future in futures[:2]]==handles[:2]
+    with pytest.raises(KeyError):
+        futures[2].result(timeout=5)
+    watcher.stop(timeout=5)
+    assert not watcher.watched and watcher.errors==1
+
+
+def test_task_listener_dropped():
+    from labelatorio._tasks import TaskWatcher, DONE
+    client = _FakeClient({"a":1, "b":100})
+    watcher = TaskWatcher(min_interval=0, max_interval=0)
+    events=[]
+    handle_a, handle_b = TaskStatusHandle("a", client), TaskStatusHandle("b", client)
+    future_a = watcher.watch(handle_a, lambda event: events.append((event.kind, event.handle.task_id)))
+    watcher.watch(handle_b, lambda event: events.append((event.kind, event.handle.task_id)))
+    watcher.unwatch(handle_b)
+    assert future_a.result(timeout=5) is handle_a
+    watcher.stop(timeout=5)
+    assert (DONE, "a") in events and (DONE, "b") not in events
+    assert not watcher._task_listeners, "listeners of finished and unwatched tasks should be dropped"
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+import pytest
+from labelatorio._throttle import AdaptiveConcurrency, Throttle, TokenBucket, area_throttles
+from tests.fakes import FakeResponse
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=100, burst=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.perf_counter()-start>=0.09, "10 requests over burst should take at least 0.1s at 100 req/s"
+
+
+def test_aimd_limit():
+    concurrency = AdaptiveConcurrency(initial=4, latency_tolerance=None)
+    for _ in range(40):
+        concurrency.acquire()
+        concurrency.release(0.01)
+    assert concurrency.limit>4, "limit should grow on success"
+
+    grown = concurrency.limit
+    concurrency.acquire()
+    concurrency.release(0.01, overloaded=True)
+    assert concurrency.limit==grown//2, "limit should be halved on overload"
+
+
+def test_throttle_limits_in_flight():
+    throttle = Throttle(concurrency=AdaptiveConcurrency(initial=2, max_limit=2))
+    in_flight=[]
+    max_in_flight=[]
+    lock = threading.Lock()
+    def send():
+        with lock:
+            in_flight.append(1)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.pop()
+        return FakeResponse(200)
+
+    threads = [threading.Thread(target=throttle.call, args=(send,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_in_flight)<=2
+    assert throttle.stats()["calls"]==8
+
+
+def test_throttled_response_decreases_limit():
+    throttle = Throttle(concurrency=AdaptiveConcurrency(initial=8, latency_tolerance=None))
+    async def send():
+        return FakeResponse(429)
+    asyncio.run(throttle.acall(send))
+    assert throttle.concurrency.limit==4
+    assert throttle.throttled==1
+
+
+def test_area_throttles():
+    shared = Throttle()
+    assert area_throttles(shared)=={"default":shared}
+    with pytest.raises(ValueError):
+        area_throttles({"unknown":shared})
+
+
+def test_latency_baseline_per_endpoint():
+    concurrency = AdaptiveConcurrency(initial=8)
+    for _ in range(50):
+        for endpoint, latency in (("doc/count", 0.01), ("doc/export-vectors", 0.5)):
+            concurrency.acquire()
+            concurrency.release(latency, endpoint=endpoint)
+    assert concurrency.decreases==0, "slow endpoint should not look like overload of the fast one"
+
+    for _ in range(20):
+        concurrency.acquire()
+        concurrency.release(0.1, endpoint="doc/count")
+    assert concurrency.decreases>0, "growing latency of the endpoint is overload"
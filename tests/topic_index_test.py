@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from labelatorio.data_model import Topic
+from labelatorio.topic_index import TopicIndex
+
+
+TOPICS = [
+    Topic(topic_id="x", topic_name="x axis", centroid=[1.0, 0.0]),
+    Topic(topic_id="y", topic_name="y axis", centroid=[0.0, 1.0]),
+    Topic(topic_id="diag", topic_name="diagonal", centroid=[1.0, 1.0]),
+    Topic(topic_id="empty", topic_name="without centroid"),
+]
+
+
+def test_cosine_assignment():
+    index = TopicIndex(TOPICS)
+    assert len(index)==3, "topics without centroid should be skipped"
+    assert index.centroids.dtype==np.float32
+
+    indices, scores = index.assign([[10, 1], [0, 3], [2, 2.1]], top_k=2, batch_size=2)
+    assert [index.topic_ids[i] for i in indices[:,0]]==["x","y","diag"]
+    assert indices[2,1]==1, "second nearest of (2, 2.1) should be y"
+    assert np.all(scores[:,0]>=scores[:,1]), "similarities should be sorted from the nearest"
+
+    assert [t.topic_id for t in index.nearest_topics(np.array([3.0, 0.1]))]==["x"]
+    assert index.nearest_topics([[-1.0, -1.0]], min_score=0.5)==[None]
+
+
+def test_euclidean_assignment():
+    index = TopicIndex(TOPICS, metric="euclidean")
+    indices, scores = index.assign([[0.9, 0.9], [0.0, 0.2]], top_k=3)
+    assert [index.topic_ids[i] for i in indices[:,0]]==["diag","y"]
+    assert np.allclose(scores[1], [0.8, np.sqrt(1.04), np.sqrt(1+0.64)], atol=1e-5)
+
+    with pytest.raises(ValueError):
+        index.assign([[1.0, 2.0, 3.0]])
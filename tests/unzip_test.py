@@ -0,0 +1,76 @@
+import io
+import os
+import zipfile
+import pytest
+from labelatorio._unzip import StreamingUnzipper, StreamingUnzipUnsupported, extract_parallel
+
+FILES = {
+    "config.json": b'{"labels":["A","B"]}',
+    "weights/model.bin": os.urandom(200000),
+    "weights/vocab.txt": b"token\n"*5000,
+    "empty.txt": b"",
+}
+
+
+class _Unseekable(io.RawIOBase):
+    """output stream without seek... zipfile writes data descriptors after entries"""
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def _archive(compression=zipfile.ZIP_DEFLATED, seekable=True) -> bytes:
+    output = io.BytesIO() if seekable else _Unseekable()
+    with zipfile.ZipFile(output, "w", compression=compression) as archive:
+        archive.writestr("weights/", b"")
+        for name, content in FILES.items():
+            archive.writestr(name, content)
+    return output.getvalue() if seekable else output.buffer.getvalue()
+
+
+def _stream(data:bytes, target_dir:str, chunk_size:int=777):
+    unzipper = StreamingUnzipper(target_dir)
+    for start in range(0, len(data), chunk_size):
+        unzipper.feed(data[start:start+chunk_size])
+    unzipper.close()
+    return unzipper
+
+
+def _assert_extracted(target_dir):
+    for name, content in FILES.items():
+        with open(os.path.join(target_dir, name), "rb") as extracted:
+            assert extracted.read()==content, f"{name} should be extracted"
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_streaming_unzip(tmp_path, compression):
+    unzipper = _stream(_archive(compression), str(tmp_path))
+    assert len(unzipper.extracted)==len(FILES)
+    _assert_extracted(str(tmp_path))
+
+
+def test_streaming_unzip_data_descriptors(tmp_path):
+    _stream(_archive(seekable=False), str(tmp_path))
+    _assert_extracted(str(tmp_path))
+
+    with pytest.raises(StreamingUnzipUnsupported):
+        _stream(_archive(zipfile.ZIP_STORED, seekable=False), str(tmp_path/"stored"))
+
+
+def test_truncated_stream(tmp_path):
+    data = _archive()
+    with pytest.raises(zipfile.BadZipFile):
+        _stream(data[:len(data)//2], str(tmp_path))
+
+
+def test_extract_parallel(tmp_path):
+    zip_path = str(tmp_path/"model.zip")
+    with open(zip_path, "wb") as archive:
+        archive.write(_archive())
+    extract_parallel(zip_path, str(tmp_path/"out"), max_workers=3)
+    _assert_extracted(str(tmp_path/"out"))